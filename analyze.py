@@ -0,0 +1,176 @@
+'''
+Regenerates result1.txt from a stored crawl, without crawling again.
+
+    python analyze.py [--config_file config.ini] [--store content_store]
+        [--warc crawl.warc.gz ...] [--processes 4] [--output result1.txt]
+
+Pages come from the content store a crawl with CONTENT_STORE_MODE = record
+left behind (CONTENT_STORE of the config file unless --store is given, see
+utils/content_store.py), or from WARC files (needs warcio).
+
+Map: a pool of processes reads the pages (straight from the store's
+segments, nothing big goes through this process) and runs
+scraper.analyze_page on each: parsing, tokenize, word count and
+fingerprint. Reduce: this process takes the results in the order the crawl
+fetched the pages and merges them with scraper.record_page, like the
+crawler does, so urls seen before, pages outside the word limits and near
+duplicates of an earlier page are dropped the same way before the word
+counts, the longest page and the subdomains are added up.
+
+A change to tokenize, the stopwords, the word limits or the simhash
+threshold can then be checked in the time it takes to parse the corpus.
+robots.txt rules and the trap detector already decided what was fetched and
+are not applied again; the robots.txt files in the store are skipped. The
+store of a sharded crawl is read one shard after the other.
+'''
+import os
+import time
+from argparse import ArgumentParser
+from configparser import ConfigParser
+from multiprocessing import Pool
+from urllib.parse import urlparse, urldefrag
+
+import scraper
+from utils import get_logger
+from utils.config import Config
+from utils.canonical import canonicalize, set_strip_params
+from utils.content_store import ContentStore
+from utils.word_stats import make_word_stats
+
+try:
+    from warcio.archiveiterator import ArchiveIterator
+except ImportError: # only --warc needs it
+    ArchiveIterator = None
+
+# html parser backend of the map processes, set by init_process
+html_backend = "stream"
+# directory -> ContentStore, each map process opens its own
+stores = dict()
+
+
+def init_process(strip_params, backend):
+    global html_backend
+    set_strip_params(strip_params)
+    html_backend = backend
+
+
+def store_directories(path):
+    # the store in path, or the shard0, shard1, ... stores of a sharded crawl
+    if os.path.exists(os.path.join(path, "index.log")):
+        return [path]
+    shards = [name for name in os.listdir(path) if name.startswith("shard") and name[5:].isdigit()]
+    return [os.path.join(path, name) for name in sorted(shards, key=lambda name: int(name[5:]))]
+
+
+def stored_pages(directories):
+    # (directory, segment, offset, length) of every stored response, in the order they were fetched
+    for directory in directories:
+        store = ContentStore(directory)
+        for key, segment, offset, length in store.entries():
+            yield directory, segment, offset, length
+        store.close()
+
+
+def warc_pages(paths):
+    # (url, final url, status, body) of every response record
+    if ArchiveIterator is None:
+        raise ImportError("Reading WARC files needs warcio: python -m pip install warcio")
+    for path in paths:
+        with open(path, "rb") as stream:
+            for record in ArchiveIterator(stream):
+                if record.rec_type != "response" or record.http_headers is None:
+                    continue
+                url = record.rec_headers.get_header("WARC-Target-URI")
+                yield url, url, int(record.http_headers.get_statuscode()), record.content_stream().read()
+
+
+def read_page(entry):
+    directory, segment, offset, length = entry
+    store = stores.get(directory)
+    if store is None:
+        store = stores[directory] = ContentStore(directory)
+    resp = store.read(segment, offset, length)
+    if resp.raw_response is None:
+        return None
+    return resp.url, resp.raw_response.url, resp.status, resp.raw_response.content
+
+
+def analyze_stored(entry):
+    return analyze(read_page(entry))
+
+
+def analyze(page):
+    # map: (url, final url, PageAnalysis) of a page, None for the ones
+    # extract_next_links turns away before looking at them
+    if page is None:
+        return None
+    url, final_url, status, content = page
+    if urlparse(url).path == "/robots.txt":
+        # fetched by the robots.txt cache, not crawled
+        return None
+    url = final_url or url
+    # the checks of is_valid that only look at the url, is_visited is up to the reduce step
+    if scraper.url_filter.check(urldefrag(url)[0])[0] is not None:
+        return None
+    if status < scraper.GOOD_RESP[0] or status > scraper.GOOD_RESP[-1]:
+        return None
+    final_url = canonicalize(urldefrag(url)[0])
+    analysis = scraper.analyze_page(url, final_url, content, html_backend)
+    # the outlinks are not followed, no need to send them back
+    return url, final_url, analysis._replace(links=None)
+
+
+def main(config_file, store, warcs, processes, output, chunksize=16):
+    cparser = ConfigParser()
+    cparser.read(config_file)
+    config = Config(cparser)
+    logger = get_logger("ANALYZE")
+
+    init_process(config.url_strip_params, config.html_parser)
+    scraper.state.words = make_word_stats(config.word_stats, config.word_stats_capacity)
+    scraper.results_file = output
+    if warcs:
+        pages, map_function = warc_pages(warcs), analyze
+    else:
+        pages, map_function = stored_pages(store_directories(store or config.content_store)), analyze_stored
+
+    start = time.perf_counter()
+    pool = None
+    if processes > 0:
+        pool = Pool(processes, initializer=init_process, initargs=(config.url_strip_params, config.html_parser))
+        # imap hands the results back in order, the reduce step sees the pages as the crawl did
+        results = pool.imap(map_function, pages, chunksize)
+    else:
+        results = map(map_function, pages)
+    count = 0
+    for result in results:
+        count += 1
+        if result is None:
+            continue
+        url, final_url, analysis = result
+        # a redirect to a page already kept
+        if not scraper.is_valid(url):
+            continue
+        scraper.record_page(final_url, analysis)
+    if pool is not None:
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+
+    scraper.write_results()
+    scraper.state.close()
+    logger.info(
+        f"Analyzed {count} responses in {elapsed:.1f} s ({count / max(elapsed, 1e-9):.1f} per second) "
+        f"with {processes} processes, {scraper.state.unique_pages} unique pages, report in {output}.")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--config_file", type=str, default="config.ini")
+    parser.add_argument("--store", type=str, default=None, help="content store, CONTENT_STORE by default")
+    parser.add_argument("--warc", type=str, nargs="+", default=None, help="WARC files to read instead")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="0 analyzes in this process")
+    parser.add_argument("--output", type=str, default="result1.txt")
+    parser.add_argument("--chunksize", type=int, default=16, help="pages handed to a process at a time")
+    args = parser.parse_args()
+    main(args.config_file, args.store, args.warc, args.processes, args.output, args.chunksize)
@@ -0,0 +1,70 @@
+'''
+How many fetches canonical urls save on a recorded crawl: the urls found
+in out.txt, valid.txt and Logs/Worker.log (or the files given) are
+deduplicated the old way (trailing "/" stripped, urlhash of the rest as
+is) and through utils.canonical, and the difference is what the frontier
+would no longer fetch. Also the time canonicalize takes per url. Run from
+the repository root:
+
+    python -m benchmarks.bench_canonical [files...]
+'''
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from hashlib import sha256
+from urllib.parse import urlparse, urldefrag
+
+from utils import get_urlhash
+from utils.canonical import canonicalize
+
+URL_RE = re.compile(r"https?://[^\s,|<>\"']+", re.IGNORECASE)
+EXAMPLES = 10
+
+
+def old_urlhash(url):
+    # utils.normalize and utils.get_urlhash before utils.canonical
+    if url.endswith("/"):
+        url = url.rstrip("/")
+    parsed = urlparse(url)
+    return sha256(
+        f"{parsed.netloc}/{parsed.path}/{parsed.params}/"
+        f"{parsed.query}/{parsed.fragment}".encode("utf-8")).hexdigest()
+
+
+def load_urls(paths):
+    urls = list()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", errors="replace") as found:
+                urls.extend(urldefrag(url)[0] for url in URL_RE.findall(found.read()))
+    return urls
+
+
+def main(paths):
+    urls = load_urls(paths or ["out.txt", "valid.txt", os.path.join("Logs", "Worker.log")])
+    if not urls:
+        print("no urls found")
+        return
+    old_keys = set(old_urlhash(url) for url in urls)
+
+    start = time.perf_counter()
+    canonical = [canonicalize(url) for url in urls]
+    elapsed = time.perf_counter() - start
+    groups = defaultdict(set)
+    for url, canonical_url in zip(urls, canonical):
+        groups[get_urlhash(canonical_url)].add(url)
+
+    saved = len(old_keys) - len(groups)
+    print(f"{len(urls)} urls recorded")
+    print(f"{len(old_keys)} fetches deduplicating the old way, {len(groups)} with canonical urls: "
+          f"{saved} saved ({saved / len(old_keys):.1%})")
+    print(f"canonicalize: {elapsed / len(urls) * 1e6:.2f} us per url")
+    merged = [sorted(group) for group in groups.values() if len(set(old_urlhash(url) for url in group)) > 1]
+    for group in sorted(merged, key=lambda group: (-len(group), len(group[0])))[:EXAMPLES]:
+        print("  one fetch for: " + ", ".join(url if len(url) < 90 else url[:87] + "..." for url in group))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
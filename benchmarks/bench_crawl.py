@@ -0,0 +1,164 @@
+'''
+End to end crawl of benchmarks/synthetic_site.py: the stand-in cache server
+runs in its own process, the Crawler (frontier, workers, scraper) in this
+one with the settings of config.ini apart from the ones below. Reports
+pages/sec, latency percentiles of every stage and the peak RSS of the
+crawler process. Run from the repository root:
+
+    python -m benchmarks.bench_crawl [--threads 8] [--engine threads] [--hosts 8]
+        [--pages 200] [--latency 0.005] [--politeness 0] [--config_file config.ini]
+
+Stages are timed by wrapping the functions the workers call, so their times
+overlap (scraper includes analyze_page and record_page). analyze_page is
+only timed with ANALYZERS = 0, it runs in other processes otherwise.
+'''
+import os
+import time
+import tempfile
+import resource
+import multiprocessing
+from argparse import ArgumentParser
+from collections import defaultdict
+from configparser import ConfigParser
+from functools import wraps
+
+from benchmarks.cache_server import serve
+from benchmarks.synthetic_site import SyntheticSite
+
+
+def run_server(conn, hosts, pages, latency):
+    server = serve(site=SyntheticSite(hosts, pages), latency=latency)
+    conn.send(server.server_address)
+    # serve until the benchmark says it is done
+    conn.recv()
+    server.shutdown()
+
+
+class StageTimes(object):
+    def __init__(self):
+        self.samples = defaultdict(list) # stage -> seconds per call, list.append is thread safe
+
+    def wrap(self, stage, function):
+        samples = self.samples[stage]
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+    def wrap_async(self, stage, function):
+        samples = self.samples[stage]
+        @wraps(function)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+    def report(self):
+        lines = [f"{'stage':>26} {'calls':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            samples = sorted(samples)
+            percentile = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+            lines.append(f"{stage:>26} {len(samples):>8} {percentile(0.5):9.3f} {percentile(0.9):9.3f} "
+                         f"{percentile(0.99):9.3f} {samples[-1] * 1000:9.3f}")
+        return "\n".join(lines)
+
+
+def make_config(args, directory, seeds):
+    from utils.config import Config
+
+    cparser = ConfigParser()
+    cparser.read(args.config_file)
+    cparser["CRAWLER"]["SEEDURL"] = ",".join(seeds)
+    cparser["CRAWLER"]["POLITENESS"] = str(args.politeness)
+    local = cparser["LOCAL PROPERTIES"]
+    local["THREADCOUNT"] = str(args.threads)
+    local["ENGINE"] = args.engine
+    local["SAVE"] = os.path.join(directory, "frontier.shelve")
+    local["REPORT_INTERVAL"] = "0"
+    local["ROBOTS_CACHE"] = ""
+    return Config(cparser)
+
+
+def instrument(times, config):
+    # wraps the stages in place, the workers look them up through their modules
+    import scraper
+    from crawler import worker
+    from crawler.frontier import Frontier
+    from utils.async_download import CacheClient
+
+    worker.download = times.wrap("download", worker.download)
+    CacheClient.download = times.wrap_async("download (async)", CacheClient.download)
+    Frontier.get_tbd_url = times.wrap("frontier.get_tbd_url", Frontier.get_tbd_url)
+    Frontier.poll_tbd_url = times.wrap("frontier.poll_tbd_url", Frontier.poll_tbd_url)
+    Frontier.add_url = times.wrap("frontier.add_url", Frontier.add_url)
+    Frontier.mark_url_complete = times.wrap("frontier.mark_url_complete", Frontier.mark_url_complete)
+    scraper.scraper = times.wrap("scraper", scraper.scraper)
+    if config.analyzers == 0:
+        scraper.analyze_page = times.wrap("scraper.analyze_page", scraper.analyze_page)
+    scraper.record_page = times.wrap("scraper.record_page", scraper.record_page)
+
+
+def main(args):
+    context = multiprocessing.get_context("spawn")
+    conn, server_conn = context.Pipe()
+    server = context.Process(target=run_server, args=(server_conn, args.hosts, args.pages, args.latency))
+    server.start()
+    cache_server = conn.recv()
+
+    # the crawler writes its save file, logs and result1.txt into the working directory
+    config_file = os.path.abspath(args.config_file)
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    args.config_file = config_file
+    config = make_config(args, directory, SyntheticSite(args.hosts, args.pages).seeds())
+    config.cache_server = cache_server
+
+    import scraper
+    from crawler import Crawler
+    from crawler.frontier import Frontier
+    from crawler.priority_frontier import PriorityFrontier
+    from crawler.async_worker import AsyncWorker
+
+    times = StageTimes()
+    instrument(times, config)
+    start = time.perf_counter()
+    frontier_factory = PriorityFrontier if config.frontier == "priority" else Frontier
+    if config.engine == "async":
+        crawler = Crawler(config, True, frontier_factory=frontier_factory, worker_factory=AsyncWorker)
+    else:
+        crawler = Crawler(config, True, frontier_factory=frontier_factory)
+    crawler.start()
+    elapsed = time.perf_counter() - start
+    conn.send("done")
+    server.join()
+
+    fetches = len(times.samples["download"]) + len(times.samples["download (async)"])
+    print(f"{args.hosts} hosts x {args.pages} pages, {args.threads} threads ({args.engine}), "
+          f"latency {args.latency * 1000:.0f} ms, politeness {args.politeness} s")
+    print(f"{fetches} pages fetched in {elapsed:.1f} s: {fetches / elapsed:.1f} pages/sec")
+    print(f"{scraper.state.unique_pages} unique pages kept, "
+          f"{sum(scraper.bad_url_count.values())} urls turned away as traps")
+    print(times.report())
+    # ru_maxrss is in kilobytes on Linux
+    print(f"peak RSS of the crawler process: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--engine", type=str, default="threads")
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=200, help="pages per host")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the server adds to every request")
+    parser.add_argument("--politeness", type=float, default=0)
+    parser.add_argument("--config_file", type=str, default="config.ini")
+    main(parser.parse_args())
@@ -0,0 +1,56 @@
+'''
+Per-request latency of utils.download against the local stand-in cache
+server: a fresh connection per request (the old requests.get) against the
+pooled keep-alive session. Run from the repository root:
+
+    python -m benchmarks.bench_download
+'''
+import time
+from types import SimpleNamespace
+
+import cbor
+import requests
+
+from benchmarks.cache_server import serve
+from utils import download as download_module
+from utils.download import download
+from utils.response import Response
+
+REQUESTS = 500
+
+
+def download_without_pool(url, config):
+    # what utils.download did before the pooled session
+    host, port = config.cache_server
+    resp = requests.get(
+        f"http://{host}:{port}/",
+        params=[("q", f"{url}"), ("u", f"{config.user_agent}")])
+    return Response(cbor.loads(resp.content))
+
+
+def measure(fetch, config):
+    latencies = list()
+    for i in range(REQUESTS):
+        start = time.perf_counter()
+        resp = fetch(f"https://www.ics.uci.edu/bench/{i}", config)
+        latencies.append(time.perf_counter() - start)
+        assert resp.status == 200
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    server = serve()
+    config = SimpleNamespace(
+        cache_server=server.server_address, user_agent="IR US23 bench",
+        threads_count=1, connect_timeout=5, read_timeout=30, retries=3, retry_backoff=0.5,
+        content_store_mode="off")
+    for name, fetch in (("new connection", download_without_pool), ("pooled session", download)):
+        download_module.session = None
+        p50, p99 = measure(fetch, config)
+        print(f"{name:>15}: p50 {p50 * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
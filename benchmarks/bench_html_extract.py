@@ -0,0 +1,51 @@
+'''
+Throughput and peak memory per page of the utils.html_extract backends.
+Uses the synthetic pages of bench_scraper_threads, or every file in a
+directory of saved pages if one is given. Run from the repository root:
+
+    python -m benchmarks.bench_html_extract [pages_dir]
+'''
+import os
+import sys
+import time
+import tracemalloc
+
+from utils.html_extract import extract, BACKENDS
+from benchmarks.bench_scraper_threads import make_pages
+
+
+def load_corpus(path):
+    if not path:
+        return [resp.raw_response.content for _, resp in make_pages(200)]
+    corpus = list()
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as page:
+            corpus.append(page.read())
+    return corpus
+
+
+def main(path=None):
+    corpus = load_corpus(path)
+    size = sum(len(page) for page in corpus)
+    print(f"{len(corpus)} pages, {size / len(corpus) / 1000:.1f} KB per page")
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        for page in corpus:
+            extract(page, backend)
+        elapsed = time.perf_counter() - start
+
+        # peak traced allocation while parsing a single page, averaged
+        peaks = 0
+        tracemalloc.start()
+        for page in corpus:
+            tracemalloc.reset_peak()
+            extract(page, backend)
+            peaks += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{backend:>7}: {len(corpus) / elapsed:8.1f} pages/sec, "
+              f"{size / elapsed / 1e6:6.2f} MB/sec, "
+              f"peak {peaks / len(corpus) / 1000:8.1f} KB per page")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,78 @@
+'''
+utils.robots against the local stand-in cache server: every host's
+robots.txt is fetched once through it, then checks are compared with
+urllib.robotparser on the same rules, for the answers and for the time per
+check. Run from the repository root:
+
+    python -m benchmarks.bench_robots
+'''
+import time
+import random
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from benchmarks.cache_server import serve, default_page
+from utils.robots import RobotsCache, fetch_through_cache
+
+HOSTS = ["www.ics.uci.edu", "wics.ics.uci.edu", "www.stat.uci.edu", "gitlab.ics.uci.edu", "swiki.ics.uci.edu"]
+ROBOTS = {
+    "www.ics.uci.edu": "User-agent: *\nDisallow: /people\nDisallow: /happening\nAllow: /people/faculty\n",
+    "wics.ics.uci.edu": "User-agent: *\nDisallow: /wp-admin/\nAllow: /wp-admin/admin-ajax.php\nCrawl-delay: 2\n",
+    "gitlab.ics.uci.edu": "User-agent: *\nDisallow: /\n\nUser-agent: IR US23\nDisallow: /search\nDisallow: /api\n",
+    "swiki.ics.uci.edu": "User-agent: *\nDisallow: /doku.php?do=\nDisallow: /lib/\nCrawl-delay: 1\n",
+}
+PATHS = ["/", "/people", "/people/faculty", "/happening/news", "/wp-admin/", "/wp-admin/admin-ajax.php",
+         "/search?q=x", "/api/v4", "/doku.php?do=edit", "/doku.php?id=start", "/lib/x.css", "/about"]
+USER_AGENT = "IR US23 bench"
+CHECKS = 20000
+
+
+def site(url):
+    parsed = urlparse(url)
+    if parsed.path == "/robots.txt":
+        if parsed.hostname in ROBOTS:
+            return 200, ROBOTS[parsed.hostname].encode("utf-8")
+        return 404, b"not found"
+    return default_page(url)
+
+
+def main():
+    server = serve(site=site)
+    config = SimpleNamespace(
+        cache_server=server.server_address, user_agent=USER_AGENT,
+        threads_count=1, connect_timeout=5, read_timeout=30, retries=3, retry_backoff=0.5,
+        content_store_mode="off")
+    fetched = list()
+    fetch = fetch_through_cache(config)
+    robots = RobotsCache(lambda url: fetched.append(url) or fetch(url), USER_AGENT)
+
+    parsers = dict()
+    for host in HOSTS:
+        parser = RobotFileParser()
+        parser.parse(ROBOTS.get(host, "").splitlines())
+        parsers[host] = parser
+
+    rng = random.Random(0)
+    urls = [f"https://{rng.choice(HOSTS)}{rng.choice(PATHS)}" for _ in range(CHECKS)]
+    start = time.perf_counter()
+    ours = [robots.can_fetch(url) for url in urls]
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    theirs = [parsers[urlparse(url).hostname].can_fetch(USER_AGENT, url) for url in urls]
+    elapsed_robotparser = time.perf_counter() - start
+
+    print(f"robots.txt fetched {len(fetched)} times for {len(HOSTS)} hosts")
+    print(f"same answer as urllib.robotparser for {sum(a == b for a, b in zip(ours, theirs))} of {CHECKS} urls")
+    # urllib.robotparser applies the first matching rule, RFC 9309 the longest one
+    for url in sorted(set(url for url, a, b in zip(urls, ours, theirs) if a != b)):
+        print(f"  differs on {url}: {'allowed' if robots.can_fetch(url) else 'disallowed'} here")
+    for host in HOSTS:
+        print(f"  {host}: Crawl-delay {robots.crawl_delay('https://' + host + '/')}")
+    print(f"utils.robots: {elapsed / CHECKS * 1e6:.2f} us per check (first fetches included), "
+          f"urllib.robotparser: {elapsed_robotparser / CHECKS * 1e6:.2f} us per check")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+'''
+Pages/sec through scraper.scraper with 1 to THREADCOUNT threads on synthetic
+pages, no network involved. Run from the repository root:
+
+    python -m benchmarks.bench_scraper_threads [config.ini]
+'''
+import os
+import sys
+import random
+import tempfile
+import time
+from configparser import ConfigParser
+from threading import Thread
+from types import SimpleNamespace
+
+import scraper
+from utils.crawl_state import CrawlState
+
+PAGES = 400
+
+
+def make_pages(count, seed=121):
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+                  for _ in range(20000)]
+    pages = list()
+    for i in range(count):
+        url = f"https://www.ics.uci.edu/bench/page{i}"
+        words = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(300, 3000)))
+        links = "".join(f'<a href="/bench/page{rng.randrange(count * 4)}">link</a>' for _ in range(40))
+        html = f"<html><body><p>{words}</p>{links}</body></html>".encode("utf-8")
+        raw = SimpleNamespace(url=url, content=html)
+        pages.append((url, SimpleNamespace(url=url, status=200, error=None, raw_response=raw)))
+    return pages
+
+
+def run(pages, threads_count):
+    scraper.state = CrawlState()
+    next_page = iter(pages)
+
+    def work():
+        for url, resp in next_page:
+            scraper.scraper(url, resp)
+
+    workers = [Thread(target=work) for _ in range(threads_count)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(pages) / (time.perf_counter() - start)
+
+
+def main(config_file):
+    cparser = ConfigParser()
+    cparser.read(config_file)
+    max_threads = int(cparser["LOCAL PROPERTIES"]["THREADCOUNT"])
+
+    pages = make_pages(PAGES)
+    # scraper writes valid.txt and result1.txt into the working directory
+    os.chdir(tempfile.mkdtemp())
+    threads_count = 1
+    while True:
+        print(f"{threads_count:>3} threads: {run(pages, threads_count):8.1f} pages/sec")
+        if threads_count >= max_threads:
+            break
+        threads_count = min(threads_count * 2, max_threads)
+
+
+if __name__ == "__main__":
+    main(os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else "config.ini"))
@@ -0,0 +1,46 @@
+'''
+Lookup latency of utils.simhash.SimhashIndex as the number of stored
+fingerprints grows. Run from the repository root:
+
+    python -m benchmarks.bench_simhash_index
+'''
+import random
+import time
+
+from utils.simhash import SimhashIndex, NUM_BITS
+
+SIZES = [1000, 10000, 100000, 1000000]
+LOOKUPS = 20000
+
+
+def flip_bits(fingerprint, count, rng):
+    for bit in rng.sample(range(NUM_BITS), count):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def main():
+    rng = random.Random(121)
+    index = SimhashIndex()
+    for size in SIZES:
+        while len(index) < size:
+            index.add(rng.getrandbits(NUM_BITS))
+
+        stored = rng.sample(list(index), 100)
+        # half misses, half near-duplicates of a stored fingerprint
+        queries = list()
+        for i in range(LOOKUPS):
+            if i % 2:
+                queries.append(rng.getrandbits(NUM_BITS))
+            else:
+                queries.append(flip_bits(rng.choice(stored), index.distance, rng))
+
+        start = time.perf_counter()
+        hits = sum(1 for q in queries if index.has_near(q))
+        elapsed = time.perf_counter() - start
+        print(f"{size:>9} fingerprints: {elapsed / LOOKUPS * 1e6:8.2f} us/lookup "
+              f"({hits} hits of {LOOKUPS})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+'''
+Time per url of the url-only checks of is_valid: the old regexes against
+utils.url_filter, without and with its memo. Urls come from out.txt and
+valid.txt if they are there (each one repeated, as links are across
+pages), plus a few long paths that make the old backreference regex
+backtrack. Run from the repository root:
+
+    python -m benchmarks.bench_url_filter [files...]
+'''
+import os
+import re
+import sys
+import time
+from urllib.parse import urlparse, urldefrag
+
+from utils.url_filter import UrlFilter, DOMAINS
+
+URL_RE = re.compile(r"https?://[^\s,|]+")
+REPEATS = 5
+
+
+def old_check(url):
+    # the checks is_valid made before utils.url_filter, same order
+    url = urldefrag(url)[0]
+    parsed = urlparse(url)
+    if parsed.scheme not in set(["http", "https"]) or not parsed.hostname:
+        return False
+    if not all(ord(c) < 128 for c in url):
+        return False
+    if re.match(
+        r".*\.(css|js|bmp|gif|jpe?g|ico"
+        + r"|png|tiff?|mid|mp2|mp3|mp4"
+        + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
+        + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
+        + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
+        + r"|epub|dll|cnf|tgz|sha1"
+        + r"|thmx|mso|arff|rtf|jar|csv"
+        + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower()):
+        return False
+    if not re.match(r"(.+\.)?ics\.uci\.edu|(.+\.)?cs\.uci\.edu|(.+\.)?informatics\.uci\.edu|(.+\.)?stat\.uci\.edu", parsed.hostname.lower()):
+        return False
+    if re.match(r"^.*?(/.+?/).*?\1.*$|^.*?/(.+?/)\2.*$", parsed.path.lower()):
+        return False
+    return True
+
+
+def load_urls(paths):
+    urls = list()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", errors="replace") as found:
+                urls.extend(URL_RE.findall(found.read()))
+    return urls
+
+
+def long_paths():
+    # deep paths without a repeat, the worst case for the backreference regex
+    return [f"https://www.ics.uci.edu/" + "/".join(f"d{i}x{j}" for j in range(depth)) + "/page.php"
+            for i, depth in enumerate((20, 40, 80, 120))]
+
+
+def timed(check, urls):
+    start = time.perf_counter()
+    answers = [check(url) for url in urls]
+    return answers, (time.perf_counter() - start) / len(urls) * 1e6
+
+
+def main(paths):
+    urls = load_urls(paths or ["out.txt", "valid.txt"])
+    print(f"{len(urls)} urls, {len(set(urls))} distinct, each checked {REPEATS} times")
+    workload = urls * REPEATS
+
+    old, old_us = timed(old_check, workload)
+    uncached = UrlFilter(DOMAINS, 0)
+    fresh, new_us = timed(lambda url: uncached.check(urldefrag(url)[0])[0] is None, workload)
+    url_filter = UrlFilter(DOMAINS)
+    memo, memo_us = timed(lambda url: url_filter.check(urldefrag(url)[0])[0] is None, workload)
+    print(f"old regexes: {old_us:6.2f} us per url")
+    print(f"url_filter:  {new_us:6.2f} us per url without the memo, {memo_us:6.2f} us with it")
+    print(f"same answer for {sum(a == b == c for a, b, c in zip(old, fresh, memo))} of {len(workload)}")
+
+    for url in long_paths():
+        depth = url.count("/") - 3
+        _, old_us = timed(old_check, [url])
+        _, new_us = timed(lambda url: uncached.check(url)[0] is None, [url])
+        print(f"{depth:4d} directories: old {old_us / 1000:9.2f} ms, url_filter {new_us / 1000:6.3f} ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
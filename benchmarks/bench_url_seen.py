@@ -0,0 +1,88 @@
+'''
+Memory per url and time per add of the url-seen sets: a set of url strings
+(the old going_to_visit/global_site), a set of sha256 hex urlhashes (how the
+frontier save is keyed) and utils.url_seen.UrlSeen, in memory and spilling
+to disk. Run from the repository root:
+
+    python -m benchmarks.bench_url_seen [urls]
+'''
+import sys
+import time
+import tempfile
+import tracemalloc
+
+from utils import get_urlhash
+from utils.url_seen import UrlSeen, url_key
+
+
+def make_urls(count):
+    # shaped like the links the crawler finds: a few hosts, deep paths, queries
+    hosts = ["www.ics.uci.edu", "www.cs.uci.edu", "www.informatics.uci.edu", "www.stat.uci.edu",
+             "wics.ics.uci.edu", "gitlab.ics.uci.edu", "swiki.ics.uci.edu"]
+    for i in range(count):
+        host = hosts[i % len(hosts)]
+        yield f"https://{host}/~user{i % 997}/research/papers/{i // 997}/index.php?id={i * 7919 % 100003}&p={i}"
+
+
+def string_set(urls):
+    seen = set()
+    for url in urls:
+        seen.add(url)
+    return seen
+
+
+def urlhash_set(urls):
+    seen = set()
+    for url in urls:
+        seen.add(get_urlhash(url))
+    return seen
+
+
+def url_seen(urls):
+    seen = UrlSeen()
+    for url in urls:
+        seen.add(url_key(url))
+    return seen
+
+
+def url_seen_spill(urls, directory, max_keys):
+    seen = UrlSeen()
+    seen.set_spill(directory + "/seen", max_keys)
+    for url in urls:
+        seen.add(url_key(url))
+    return seen
+
+
+def measure(name, build, count, baseline=None):
+    # timed on its own, tracemalloc slows the build down a lot
+    start = time.perf_counter()
+    seen = build(make_urls(count))
+    elapsed = time.perf_counter() - start
+    if isinstance(seen, UrlSeen):
+        seen.close()
+    del seen
+
+    tracemalloc.start()
+    seen = build(make_urls(count))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    if isinstance(seen, UrlSeen):
+        seen.close()
+    ratio = f"{baseline / size:6.1f}x smaller" if baseline else ""
+    print(f"{name:>22}: {size / count:7.1f} bytes per url, "
+          f"{elapsed / count * 1e6:6.2f} us per add  {ratio}")
+    return size
+
+
+def main(count=1000000):
+    print(f"{count} urls, {sum(len(url) for url in make_urls(1000)) / 1000:.0f} characters on average")
+    baseline = measure("set of urls", string_set, count)
+    measure("set of urlhashes", urlhash_set, count, baseline)
+    measure("UrlSeen", url_seen, count, baseline)
+    with tempfile.TemporaryDirectory() as directory:
+        measure("UrlSeen, spill at 1/8", lambda urls: url_seen_spill(urls, directory, count // 8),
+                count, baseline)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
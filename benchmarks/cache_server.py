@@ -0,0 +1,98 @@
+'''
+Local stand-in for the spacetime cache server. It answers the same request
+utils.download sends (GET /?q=<url>&u=<useragent>) with a cbor body holding
+the status and a pickled requests.Response, the way the real one does.
+
+    python -m benchmarks.cache_server [port] [--synthetic] [--latency seconds]
+
+--synthetic serves benchmarks/synthetic_site.py instead of one stand-in
+page per url. Point the crawler at it with
+python launch.py --cache_server 127.0.0.1:<port>, which skips the
+registration with the spacetime server.
+'''
+import pickle
+import time
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import urlparse, parse_qs
+
+import cbor
+import requests
+
+
+def make_raw_response(url, status, body, headers=None):
+    raw = requests.models.Response()
+    raw.url = url
+    raw.status_code = status
+    raw._content = body
+    raw.headers.update(headers or {"Content-Type": "text/html; charset=utf-8"})
+    raw.encoding = "utf-8"
+    return raw
+
+
+def default_page(url):
+    # (status, body) for a url, override with the site argument of serve
+    return 200, f"<html><body><p>Stand-in page for {url}</p></body></html>".encode("utf-8")
+
+
+class CacheHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like the real server
+    disable_nagle_algorithm = True
+    site = staticmethod(default_page)
+    latency = 0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if "q" not in query or "u" not in query:
+            self.send_error(400, "expected q and u parameters")
+            return
+        url = query["q"][0]
+        if self.latency:
+            time.sleep(self.latency)
+        status, body = self.site(url)
+        payload = {"url": url, "status": status}
+        if status < 600:
+            payload["response"] = pickle.dumps(make_raw_response(url, status, body))
+        else:
+            payload["error"] = body.decode("utf-8", "replace")
+        data = cbor.dumps(payload)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, site=default_page, latency=0):
+    # starts the server on a daemon thread, returns it (server_address has the port)
+    handler = type("Handler", (CacheHandler,), {"site": staticmethod(site), "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("port", type=int, nargs="?", default=9000)
+    parser.add_argument("--synthetic", action="store_true", default=False)
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=200, help="pages per host")
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every request")
+    args = parser.parse_args()
+    site = default_page
+    if args.synthetic:
+        from benchmarks.synthetic_site import SyntheticSite
+        site = SyntheticSite(args.hosts, args.pages)
+        print("Seed urls: " + ",".join(site.seeds()))
+    server = serve(args.port, site, args.latency)
+    print("Stand-in cache server on %s:%d" % server.server_address)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,167 @@
+'''
+Yield curve of the frontiers over a recorded link graph: how many unique
+pages (the count in result1.txt) the first N fetches find with FRONTIER =
+fifo and with FRONTIER = priority. Run from the repository root:
+
+    python -m benchmarks.simulate_frontier [--store content_store] [--fetches 2000]
+        [--step 100] [--frontiers fifo,priority] [--hosts 8] [--pages 200]
+        [--commits 5000] [--latency 0.1] [--config_file config.ini]
+
+The graph is a content store a crawl recorded (CONTENT_STORE_MODE = record),
+replayed from the seeds of the config file, or without --store
+benchmarks/synthetic_site.py served in this process, with a commit browser
+host of --commits pages. Every frontier crawls it in a process of its own,
+one url at a time like a single worker, on a clock of its own: a fetch takes
+--latency seconds and waiting for POLITENESS takes none, so the order of the
+fetches is the frontier's alone and a run is repeatable. Urls a recorded
+crawl did not fetch come back with status 608 and still count as fetches.
+The rest of config.ini (POLITENESS, trap detector, FRONTIER_SCORERS, ...)
+applies.
+'''
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+
+class VirtualClock(object):
+    # stands in for the time module of crawler/frontier.py
+    perf_counter = staticmethod(time.perf_counter)
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+def make_site(args):
+    from benchmarks.synthetic_site import SyntheticSite
+    return SyntheticSite(args.hosts, args.pages, commit_pages=args.commits)
+
+
+def make_config(args, frontier, directory):
+    from utils.config import Config
+
+    cparser = ConfigParser()
+    cparser.read(args.config_file)
+    local = cparser["LOCAL PROPERTIES"]
+    local["FRONTIER"] = frontier
+    local["THREADCOUNT"] = "1"
+    local["SAVE"] = os.path.join(directory, "frontier.shelve")
+    local["REPORT_INTERVAL"] = "0"
+    local["ROBOTS_CACHE"] = ""
+    local["LINK_LOG"] = ""
+    if args.store:
+        local["CONTENT_STORE"] = os.path.abspath(args.store)
+        local["CONTENT_STORE_MODE"] = "replay"
+    else:
+        cparser["CRAWLER"]["SEEDURL"] = ",".join(make_site(args).seeds())
+        local["CONTENT_STORE_MODE"] = "off"
+    return Config(cparser)
+
+
+def simulate(frontier, args, conn):
+    # body of one frontier's process: sends back [(fetches, unique pages), ...]
+    import scraper
+    import crawler.frontier
+    from utils.download import download, close_store
+    from crawler.frontier import Frontier
+    from crawler.priority_frontier import PriorityFrontier
+    from benchmarks.cache_server import serve
+
+    # the save file, logs and result1.txt go to a directory of their own
+    args.config_file = os.path.abspath(args.config_file)
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    # the frontier prints every url it queues
+    sys.stdout = open(os.devnull, "w")
+    config = make_config(args, frontier, directory)
+    if not args.store:
+        server = serve(site=make_site(args))
+        config.cache_server = server.server_address
+
+    clock = crawler.frontier.time = VirtualClock()
+    scraper.configure(config)
+    frontier = (PriorityFrontier if config.frontier == "priority" else Frontier)(config, True)
+    curve = list()
+    fetches = 0
+    while fetches < args.fetches:
+        url, wait = frontier.poll_tbd_url()
+        if url is None:
+            if wait is None:
+                break
+            # no host may be hit yet, skip to when one may
+            clock.now += wait
+            continue
+        resp = download(url, config)
+        scraper.record_fetch(url, resp.status, args.latency)
+        clock.now += args.latency
+        fetches += 1
+        for link in scraper.scraper(url, resp):
+            frontier.add_url(link)
+        frontier.mark_url_complete(url)
+        if fetches % args.step == 0:
+            curve.append((fetches, scraper.state.unique_pages))
+    if not curve or curve[-1][0] != fetches:
+        curve.append((fetches, scraper.state.unique_pages))
+    conn.send(curve)
+    frontier.close()
+    scraper.shutdown()
+    close_store()
+
+
+def report(curves):
+    names = list(curves)
+    lines = [f"{'fetches':>8} " + " ".join(f"{name:>10}" for name in names)]
+    steps = sorted({fetches for curve in curves.values() for fetches, _ in curve})
+    for step in steps:
+        row = list()
+        for name in names:
+            found = [unique for fetches, unique in curves[name] if fetches <= step]
+            row.append(f"{found[-1] if found else 0:>10}")
+        lines.append(f"{step:>8} " + " ".join(row))
+    # fetches each frontier needed to find half and 90% of what the best one found
+    best = max(curve[-1][1] for curve in curves.values())
+    for share in (0.5, 0.9):
+        needed = list()
+        for name in names:
+            reached = [fetches for fetches, unique in curves[name] if unique >= share * best]
+            needed.append(f"{reached[0] if reached else '-':>10}")
+        lines.append(f"{f'{share:.0%} at':>8} " + " ".join(needed))
+    return "\n".join(lines)
+
+
+def main(args):
+    context = multiprocessing.get_context("spawn")
+    curves = dict()
+    for frontier in args.frontiers.split(","):
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=simulate, args=(frontier, args, child_conn))
+        process.start()
+        while not conn.poll(1):
+            if not process.is_alive():
+                raise SystemExit(f"The {frontier} frontier's process failed.")
+        curves[frontier] = conn.recv()
+        process.join()
+    source = args.store or (
+        f"synthetic site of {args.hosts} hosts x {args.pages} pages and {args.commits} commits")
+    print(f"unique pages found in the first N fetches of {source}")
+    print(report(curves))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--store", type=str, default=None, help="content store of a recorded crawl")
+    parser.add_argument("--fetches", type=int, default=2000, help="fetch budget of every frontier")
+    parser.add_argument("--step", type=int, default=100, help="fetches between points of the curve")
+    parser.add_argument("--frontiers", type=str, default="fifo,priority")
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=200, help="pages per host")
+    parser.add_argument("--commits", type=int, default=5000, help="pages of the commit browser host")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds a fetch takes")
+    parser.add_argument("--config_file", type=str, default="config.ini")
+    main(parser.parse_args())
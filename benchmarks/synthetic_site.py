@@ -0,0 +1,185 @@
+'''
+Deterministic synthetic web graph for the stand-in cache server, so the
+whole crawler can run offline:
+
+    site = SyntheticSite(hosts=8, pages_per_host=200)
+    server = serve(site=site, latency=0.005)
+    site.seeds()        # the SEEDURL list to crawl it from
+
+Every page is generated from its url (and seed), so any process serving
+the same SyntheticSite answers the same way and two crawls see the same
+graph. Hosts are the four seed hosts plus hosts - 4 subdomains of
+ics.uci.edu, each with pages /page0 .. /page<pages_per_host - 1> of
+Zipf distributed words and links_per_page links: mostly to pages of the
+same host, some to other hosts, some the crawler should skip (other
+domains, pdfs, robots.txt disallowed /private/ pages) and some written
+relative or with tracking parameters. On top of that:
+
+- duplicate_rate of the pages repeat the page before them, half exactly
+  and half with a few words changed (near duplicates)
+- large_rate of the pages are 20000-40000 words long, some past the
+  scraper's 30000 word limit
+- error_rate of the pages answer 404 or 500
+- trap_rate of the pages link into a calendar trap: /calendar/<date> of
+  trap_days days, each linking to the next day, week and month; most days
+  are the same boilerplate and some have events of their own
+- with commit_pages, a fifth of the pages also link into a commit browser on
+  gitlab.ics.uci.edu: commit_pages /commit/<hash> pages linking to six
+  others each, only commit_yield of them with much text of their own. Not a
+  trap (the yield is too high for that), just a host worth less of the
+  crawl's time
+'''
+import random
+import datetime
+import hashlib
+from bisect import bisect
+from itertools import accumulate
+from urllib.parse import urlparse
+
+SEED_HOSTS = ["www.ics.uci.edu", "www.cs.uci.edu", "www.informatics.uci.edu", "www.stat.uci.edu"]
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+FIRST_DAY = datetime.date(2020, 1, 1)
+COMMIT_HOST = "gitlab.ics.uci.edu"
+
+
+class SyntheticSite(object):
+    def __init__(self, hosts=8, pages_per_host=200, links_per_page=15, duplicate_rate=0.1,
+                 large_rate=0.02, error_rate=0.03, trap_rate=0.05, trap_days=1000,
+                 vocabulary=20000, seed=0, commit_pages=0, commit_yield=0.3):
+        self.hosts = SEED_HOSTS[:hosts] + [f"sub{i}.ics.uci.edu" for i in range(max(0, hosts - len(SEED_HOSTS)))]
+        self.pages_per_host = pages_per_host
+        self.links_per_page = links_per_page
+        self.duplicate_rate = duplicate_rate
+        self.large_rate = large_rate
+        self.error_rate = error_rate
+        self.trap_rate = trap_rate
+        self.trap_days = trap_days
+        self.seed = seed
+        self.commit_pages = commit_pages
+        self.commit_yield = commit_yield
+
+        rng = random.Random(f"{seed}:vocabulary")
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        self.words = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(vocabulary)]
+        # Zipf: the word of rank r comes up in proportion to 1 / r
+        self.cum_weights = list(accumulate(1 / rank for rank in range(1, vocabulary + 1)))
+
+    def seeds(self):
+        return [f"https://{host}" for host in self.hosts[:len(SEED_HOSTS)]]
+
+    def rng(self, *key):
+        # a random.Random seeded from key, the same in every process
+        return random.Random(":".join(str(part) for part in (self.seed,) + key))
+
+    def text(self, rng, count):
+        total = self.cum_weights[-1]
+        words = self.words
+        cum_weights = self.cum_weights
+        return " ".join(words[bisect(cum_weights, rng.random() * total)] for _ in range(count))
+
+    def __call__(self, url):
+        # (status, body) of url, what serve expects from a site
+        parsed = urlparse(url)
+        host = parsed.hostname
+        path = parsed.path or "/"
+        if host not in self.hosts and not (host == COMMIT_HOST and self.commit_pages):
+            return 404, b"not found"
+        if path == "/robots.txt":
+            return 200, ROBOTS.encode("utf-8")
+        if host == COMMIT_HOST:
+            return self.commit(path[len("/commit/"):] if path.startswith("/commit/") else "")
+        if path == "/":
+            return self.page(host, 0)
+        if path.startswith("/page") and path[5:].isdigit():
+            return self.page(host, int(path[5:]))
+        if path.startswith("/calendar/"):
+            return self.calendar_day(host, path[len("/calendar/"):].strip("/"))
+        if path.startswith("/private/"):
+            return 200, self.html(host, self.text(self.rng(url), 300), [])
+        return 404, b"not found"
+
+    def page(self, host, number):
+        if not 0 <= number < self.pages_per_host:
+            return 404, b"not found"
+        rng = self.rng(host, number)
+        roll = rng.random()
+        if roll < self.error_rate:
+            return (404 if rng.random() < 0.7 else 500), b"error page"
+        roll -= self.error_rate
+
+        if number > 0 and roll < self.duplicate_rate:
+            # the previous page again, exactly or with a few words changed
+            words = self.page_words(host, number - 1).split(" ")
+            if rng.random() < 0.5:
+                for _ in range(max(1, len(words) // 100)):
+                    words[rng.randrange(len(words))] = rng.choice(self.words)
+            text = " ".join(words)
+        else:
+            text = self.page_words(host, number)
+        return 200, self.html(host, text, self.page_links(rng, host))
+
+    def page_words(self, host, number):
+        rng = self.rng(host, number, "words")
+        if rng.random() < self.large_rate:
+            count = rng.randint(20000, 40000)
+        else:
+            count = rng.randint(200, 2000)
+        return self.text(rng, count)
+
+    def page_links(self, rng, host):
+        links = list()
+        for _ in range(self.links_per_page):
+            roll = rng.random()
+            number = rng.randrange(self.pages_per_host)
+            if roll < 0.6:
+                links.append(f"/page{number}" if rng.random() < 0.5 else f"https://{host}/page{number}")
+            elif roll < 0.8:
+                links.append(f"https://{rng.choice(self.hosts)}/page{number}")
+            elif roll < 0.85:
+                links.append(f"https://{host}/page{number}?utm_source=feed#comments")
+            elif roll < 0.9:
+                links.append(f"https://www.example.com/page{number}")
+            elif roll < 0.95:
+                links.append(f"/files/paper{number}.pdf")
+            else:
+                links.append(f"/private/page{number}")
+        if rng.random() < self.trap_rate:
+            links.append(f"/calendar/{FIRST_DAY + datetime.timedelta(days=rng.randrange(self.trap_days))}")
+        if self.commit_pages and rng.random() < 0.2:
+            links.append(f"https://{COMMIT_HOST}/commit/{self.commit_hash(rng.randrange(self.commit_pages))}")
+        return links
+
+    def commit_hash(self, number):
+        return hashlib.sha1(f"{self.seed}:{number}".encode("utf-8")).hexdigest()[:12]
+
+    def commit(self, commit_hash):
+        numbers = getattr(self, "commit_numbers", None)
+        if numbers is None:
+            numbers = self.commit_numbers = {self.commit_hash(i): i for i in range(self.commit_pages)}
+        if commit_hash not in numbers:
+            return 404, b"not found"
+        rng = self.rng(COMMIT_HOST, commit_hash)
+        text = self.text(self.rng(COMMIT_HOST, "commit"), 300) + " " + commit_hash
+        if rng.random() < self.commit_yield:
+            text += " " + self.text(rng, 400)
+        links = [f"/commit/{self.commit_hash(rng.randrange(self.commit_pages))}" for _ in range(6)]
+        return 200, self.html(COMMIT_HOST, text, links)
+
+    def calendar_day(self, host, day):
+        try:
+            date = datetime.date.fromisoformat(day)
+        except ValueError:
+            return 404, b"not found"
+        if not 0 <= (date - FIRST_DAY).days < self.trap_days:
+            return 404, b"not found"
+        text = self.text(self.rng(host, "calendar"), 300) + " " + day
+        rng = self.rng(host, day)
+        if rng.random() < 0.2:
+            text += " " + self.text(rng, 400)
+        links = [f"/calendar/{date + datetime.timedelta(days=days)}" for days in (1, 7, 30)]
+        return 200, self.html(host, text, links)
+
+    def html(self, host, text, links):
+        anchors = "".join(f'<a href="{link}">link</a>' for link in links)
+        return (f"<html><head><title>{host}</title></head><body><p>{text}</p>"
+                f"{anchors}</body></html>").encode("utf-8")
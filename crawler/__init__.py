@@ -1,11 +1,15 @@
-from utils import get_logger
+from utils import get_logger, metrics
+from utils.download import close_store
 from crawler.frontier import Frontier
 from crawler.worker import Worker
+import scraper
 
 class Crawler(object):
     def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker):
         self.config = config
         self.logger = get_logger("CRAWLER")
+        scraper.configure(config)
+        metrics.start(config)
         self.frontier = frontier_factory(config, restart)
         self.workers = list()
         self.worker_factory = worker_factory
@@ -24,3 +28,7 @@ class Crawler(object):
     def join(self):
         for worker in self.workers:
             worker.join()
+        self.frontier.close()
+        scraper.shutdown()
+        close_store()
+        metrics.stop()
@@ -0,0 +1,80 @@
+import time
+import asyncio
+from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import get_logger, metrics
+from utils.async_download import CacheClient
+import scraper
+
+
+class AsyncWorker(Thread):
+    '''
+    Worker that runs an asyncio event loop instead of one fetch at a time.
+    config.async_tasks fetch tasks share the loop: each one polls the
+    frontier for a url whose host is ready, waits with asyncio.sleep when
+    none is, downloads it through the async cache client, and hands the
+    scraping (and the frontier updates that follow) to a thread pool. Polling
+    the frontier runs in a pool of its own, since it waits for the frontier's
+    lock and may fetch a robots.txt to check a resumed url. Use it
+    through Crawler(config, restart, worker_factory=AsyncWorker), usually
+    with THREADCOUNT = 1.
+    '''
+    def __init__(self, worker_id, config, frontier):
+        self.logger = get_logger(f"AsyncWorker-{worker_id}", "Worker")
+        self.worker_name = f"async-{worker_id}"
+        self.config = config
+        self.frontier = frontier
+        super().__init__(daemon=True)
+
+    def run(self):
+        asyncio.run(self.crawl())
+
+    async def crawl(self):
+        self.client = CacheClient(self.config, self.logger)
+        # scraping is cpu bound, keep it off the loop (ANALYZERS moves it to processes)
+        self.executor = ThreadPoolExecutor(max_workers=self.config.async_scrapers)
+        # nothing that can block goes on the loop, the frontier's lock and is_valid included
+        self.poller = ThreadPoolExecutor(max_workers=self.config.async_scrapers)
+        try:
+            await asyncio.gather(*[self.fetch_loop() for _ in range(self.config.async_tasks)])
+        finally:
+            self.client.close()
+            self.executor.shutdown()
+            self.poller.shutdown()
+        self.logger.info("Frontier is empty. Stopping Crawler.")
+
+    async def fetch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            tbd_url, wait = await loop.run_in_executor(self.poller, self.frontier.poll_tbd_url)
+            if tbd_url is None:
+                if wait is None:
+                    return
+                # politeness: sleep until the earliest host may be hit again
+                await asyncio.sleep(wait)
+                continue
+            try:
+                start = time.perf_counter()
+                resp = await self.client.download(tbd_url)
+                seconds = time.perf_counter() - start
+                metrics.record_download(self.worker_name, tbd_url, resp.status, seconds)
+                scraper.record_fetch(tbd_url, resp.status, seconds)
+                self.logger.info(
+                    f"Downloaded {tbd_url}, status <{resp.status}>, "
+                    f"using cache {self.config.cache_server}.")
+                await loop.run_in_executor(self.executor, self.scrape, tbd_url, resp)
+            except Exception:
+                # one bad page must not stop the other tasks of the loop
+                self.logger.exception(f"Failed to crawl {tbd_url}.")
+                metrics.inc("worker_errors_total", worker=self.worker_name)
+            finally:
+                await loop.run_in_executor(self.executor, self.frontier.mark_url_complete, tbd_url)
+
+    def scrape(self, tbd_url, resp):
+        start = time.perf_counter()
+        scraped_urls = scraper.scraper(tbd_url, resp)
+        metrics.observe("worker_stage_seconds", time.perf_counter() - start,
+                        stage="scrape", worker=self.worker_name)
+        for scraped_url in scraped_urls:
+            self.frontier.add_url(scraped_url)
@@ -1,11 +1,25 @@
 import os
 import shelve
-import urllib
-from threading import Thread, Lock
-from queue import Queue, Empty
+import time
+from heapq import heappush, heappop
+from collections import deque
+from threading import Condition
+from queue import Empty
 
-from utils import get_logger, get_urlhash, normalize, hostname_ify
-from scraper import is_valid
+from utils import get_logger, get_urlhash, hostname_ify, metrics
+from utils.canonical import canonicalize, KEY_VERSION
+from scraper import (
+    is_valid, crawl_delay, host_delay, check_url_for_traps, is_trapped, forget_url,
+    robots_known, check_url_for_robots)
+from crawler import frontier_log
+from crawler.frontier_log import FrontierLog
+from utils.url_seen import UrlSeen, urlhash_key
+
+# shelve entry holding the KEY_VERSION of its urlhashes, not a hex urlhash so it never
+# clashes with one; save files without it are from before key_form (utils/canonical.py)
+VERSION_KEY = "key_version"
+# how often poll_tbd_url callers should look again while only in flight hosts are left
+POLL_INTERVAL = 0.05
 
 class Frontier(object):
     def __init__(self, config, restart):
@@ -15,118 +29,328 @@ class Frontier(object):
         # Make to_be_downloaded a dictionary of queues, where the key is the hostname
         self.to_be_downloaded = dict()
 
-        self.domain_locks = dict()
-
-        self.increment_lock = Lock()
-
-
-        DOMAINS = ["ics.uci.edu","cs.uci.edu","informatics.uci.edu","stat.uci.edu"]
-
+        # Min-heap of (next allowed fetch time, hostname) for every host that
+        # has urls waiting and is not being downloaded from right now
+        self.ready_hosts = list()
+        self.scheduled_hosts = set()
+        # Hosts with a url handed out to a worker, and when each host may be hit next
+        self.in_flight_hosts = set()
+        self.next_fetch_time = dict()
 
+        # Guards all of the above and the save file; workers wait on it for a host to become ready
+        # (waits to get it are recorded, see utils/metrics.py)
+        self.condition = Condition(metrics.TimedLock("frontier", reentrant=True))
+        metrics.gauge("frontier_queued_urls", self._queued_urls)
+        metrics.gauge("frontier_queued_hosts", lambda: len(self.to_be_downloaded))
+        metrics.gauge("frontier_ready_hosts", lambda: len(self.ready_hosts))
+        metrics.gauge("frontier_in_flight_hosts", lambda: len(self.in_flight_hosts))
 
-
-        # Make a counter to keep track of which hostname to get from the dictionary
-        self.current_hostname_key_counter = 0
-
-        
-        if not os.path.exists(self.config.save_file) and not restart:
+        save_exists = (
+            frontier_log.exists(self.config.save_file)
+            if self.config.save_format == "log" else
+            os.path.exists(self.config.save_file))
+        if not save_exists and not restart:
             # Save file does not exist, but request to load save.
             self.logger.info(
                 f"Did not find save file {self.config.save_file}, "
                 f"starting from seed.")
-        elif os.path.exists(self.config.save_file) and restart:
+        elif save_exists and restart:
             # Save file does exists, but request to start from seed.
             self.logger.info(
                 f"Found save file {self.config.save_file}, deleting it.")
-            os.remove(self.config.save_file)
+            if self.config.save_format == "log":
+                frontier_log.remove(self.config.save_file)
+            else:
+                os.remove(self.config.save_file)
         # Load existing save file, or create one if it does not exist.
-        self.save = shelve.open(self.config.save_file)
+        if self.config.save_format == "log":
+            # the log commits in groups by itself, no sync per url
+            self.save = FrontierLog(
+                self.config.save_file, self.config.log_flush_records,
+                self.config.log_flush_interval, self.config.log_compact_records)
+            self.sync_every_url = False
+            # the log already keeps its keys in memory
+            self.seen = None
+        else:
+            self.save = shelve.open(self.config.save_file)
+            self.sync_every_url = True
+            if self.save.get(VERSION_KEY) != KEY_VERSION:
+                self._migrate_save_file()
+            # 64 bit keys of everything in the shelve, so add_url does not look up the dbm
+            self.seen = UrlSeen()
+            if config.url_seen_memory_keys:
+                self.seen.set_spill(
+                    os.path.join(config.url_seen_dir, "frontier"), config.url_seen_memory_keys)
         if restart:
             for url in self.config.seed_urls:
                 self.add_url(url)
         else:
             # Set the frontier state with contents of save file.
             self._parse_save_file()
-            if not self.save:
+            if not self._saved_count():
                 for url in self.config.seed_urls:
                     self.add_url(url)
     
-    def add_to_to_be_downloaded(self, url):
+    def add_to_to_be_downloaded(self, url, checked=True):
         print("Adding to to_be_downloaded: " + url)
         hostname = hostname_ify(url)
-        if hostname not in self.to_be_downloaded.keys():
-            self.to_be_downloaded[hostname] = Queue()
-            self.domain_locks[hostname] = Lock()
-        self.to_be_downloaded[hostname].put(url)
+        with self.condition:
+            # is_valid runs when a url is dequeued unless checked says it passed already
+            self._push(hostname, url, checked)
+            self._schedule_host(hostname)
+
+    def _push(self, hostname, url, checked):
+        # with the condition held: queue url behind the other urls of its host
+        if hostname not in self.to_be_downloaded:
+            self.to_be_downloaded[hostname] = deque()
+        self.to_be_downloaded[hostname].append((url, checked))
 
+    def _pop(self, hostname):
+        # with the condition held: (url, checked) of the host to fetch next
+        return self.to_be_downloaded[hostname].popleft()
+
+    def _queued_urls(self):
+        with self.condition:
+            return sum(len(urls) for urls in self.to_be_downloaded.values())
+
+    def _schedule_host(self, hostname):
+        # put the host on the heap if it has urls and nobody is fetching from it
+        if (hostname in self.scheduled_hosts or hostname in self.in_flight_hosts
+                or not self.to_be_downloaded.get(hostname)):
+            return
+        heappush(self.ready_hosts, (self.next_fetch_time.get(hostname, 0), hostname))
+        self.scheduled_hosts.add(hostname)
+        self.condition.notify()
+
+    def _migrate_save_file(self):
+        # rekey a shelve written before the urlhashes changed, every entry has its url
+        entries = dict()
+        old_count = 0
+        for urlhash, value in self.save.items():
+            if urlhash == VERSION_KEY:
+                continue
+            url, completed = value
+            old_count += 1
+            new_hash = get_urlhash(url)
+            # urls that now share a key are one url, done if any of them was
+            completed = completed or entries.get(new_hash, (url, False))[1]
+            entries[new_hash] = (url, completed)
+        if old_count:
+            self.logger.info(
+                f"Rekeying save file {self.config.save_file} from before key version "
+                f"{KEY_VERSION}: {old_count} urls become {len(entries)}.")
+            self.save.clear()
+            for urlhash, value in entries.items():
+                self.save[urlhash] = value
+        self.save[VERSION_KEY] = KEY_VERSION
+        self.save.sync()
+
+    def _saved_count(self):
+        # urls in the save file, the shelve's version entry left out
+        if self.config.save_format == "log":
+            return len(self.save)
+        return len(self.save) - (VERSION_KEY in self.save)
 
     def _parse_save_file(self):
         ''' This function can be overridden for alternate saving techniques. '''
-        total_count = len(self.save)
+        total_count = self._saved_count()
         tbd_count = 0
-        for url, completed in self.save.values():
-            if not completed and is_valid(url):                
-                self.add_to_to_be_downloaded(url)
-                tbd_count += 1
+        if self.config.save_format == "log":
+            # the log snapshot already has the pending urls grouped by host
+            with self.condition:
+                for hostname, urls in self.save.pending_by_host().items():
+                    if urls:
+                        for url in urls:
+                            self._push(hostname, url, False)
+                        self._schedule_host(hostname)
+                        tbd_count += len(urls)
+        else:
+            for urlhash, value in self.save.items():
+                if urlhash == VERSION_KEY:
+                    continue
+                url, completed = value
+                self.seen.add(urlhash_key(urlhash))
+                if not completed:
+                    self.add_to_to_be_downloaded(url, checked=False)
+                    tbd_count += 1
         self.logger.info(
             f"Found {tbd_count} urls to be downloaded from {total_count} "
             f"total urls discovered.")
 
-    def get_tbd_url(self):
-        # if all queues are empty, return None
-        if all([self.to_be_downloaded[hostname].empty() for hostname in self.to_be_downloaded.keys()]):
-            return None
-        try:
-            self.increment_lock.acquire()
-            if len(self.to_be_downloaded.keys()) == 0:
-                return None
-            # Get the index from the dictionary using the counter ran as a modulo of the length of the dictionary
-            index = self.current_hostname_key_counter % len(self.to_be_downloaded.keys())
-
-            # Get the hostname from the dictionary using the counter as the index
-            hostname = list(self.to_be_downloaded.keys())[index]
-            
-            # Initialize the value to None
-            value = None
-            try: 
-                # Try to get the value from the queue
-                value = self.to_be_downloaded[hostname].get_nowait()
-            except:
-                # If the queue is empty, delete the queue and return None
-                self.current_hostname_key_counter += 1
-                # Return another call to get_tbd_url
-                self.increment_lock.release()
-                return self.get_tbd_url()
-
-            
-         
-            self.current_hostname_key_counter += 1
-            self.increment_lock.release()
-            
-            return value
-        except IndexError:
-            return None
+    def get_tbd_url(self, timeout=None):
+        '''
+        Get a url that may be fetched right now without breaking politeness,
+        waiting until the earliest host is ready if none is. The host of the
+        url is held until mark_url_complete is called for it.
+        Returns None once nothing is queued and nothing is being downloaded,
+        raises queue.Empty if timeout seconds pass first.
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            url, checked = self._next_url(deadline)
+            if url is None or self._hand_out(url, checked):
+                return url
+
+    def poll_tbd_url(self):
+        '''
+        Non-blocking get_tbd_url for callers that do their own waiting (the
+        async worker). Returns (url, 0) if a url may be fetched now,
+        (None, seconds) to ask again after at most that long, and
+        (None, None) once the crawl is over.
+        '''
+        while True:
+            with self.condition:
+                item, wait = self._take_ready_url()
+                if item is None:
+                    if wait is None and not self.in_flight_hosts and self._crawl_over():
+                        return None, None
+                    # with only in flight hosts left there is no fetch time to wait for
+                    return None, POLL_INTERVAL if wait is None else wait
+            url, checked = item
+            if self._hand_out(url, checked):
+                return url, 0
+
+    def _hand_out(self, url, checked):
+        # with the url's host held: True if url may be fetched now, else the host
+        # has been released and url dropped, or put back
+        if not checked and not robots_known(url):
+            # the first url of a host: its robots.txt is fetched now, in the host's
+            # politeness slot, and the url waits for the next slot. Whatever the
+            # fetch does, the host is given back, or no worker could ever take it again
+            try:
+                check_url_for_robots(url)
+            except Exception:
+                self.logger.exception(f"Failed to check the robots.txt of {url}.")
+            finally:
+                self.add_to_to_be_downloaded(url, checked=False)
+                self._release_host(hostname_ify(url), self._fetch_delay(url))
+            return False
+        if (checked or is_valid(url)) and not is_trapped(url):
+            return True
+        # resumed url that no longer passes is_valid, or one that turned out to
+        # be part of a trap while it waited; the host was not hit
+        forget_url(url)
+        self._release_host(hostname_ify(url), 0)
+        return False
+
+    def _fetch_delay(self, url):
+        # the host's robots.txt may ask for a longer delay than POLITENESS, and
+        # a host answering with errors or slowly is given one (utils/rate_control.py)
+        return max(self.config.time_delay, crawl_delay(url), host_delay(url))
+
+    def _take_ready_url(self):
+        # with the condition held: ((url, checked), 0) from the next host
+        # that is ready, else (None, seconds until one is) or (None, None) if none are queued
+        hostname, wait = self._ready_host(time.monotonic())
+        if hostname is None:
+            return None, wait
+        self.scheduled_hosts.discard(hostname)
+        self.in_flight_hosts.add(hostname)
+        return self._pop(hostname), 0
+
+    def _ready_host(self, now):
+        # with the condition held: (hostname, 0) taken off the heap for the host
+        # that has waited longest, else (None, seconds until one is ready) or (None, None)
+        if not self.ready_hosts:
+            return None, None
+        fetch_time, hostname = self.ready_hosts[0]
+        if fetch_time > now:
+            return None, fetch_time - now
+        heappop(self.ready_hosts)
+        return hostname, 0
+
+    def _next_url(self, deadline):
+        with self.condition:
+            while True:
+                item, wait = self._take_ready_url()
+                if item is not None:
+                    return item
+                if wait is None and not self.in_flight_hosts:
+                    if self._crawl_over():
+                        # nothing queued, and no worker left that could add more
+                        self.condition.notify_all()
+                        return None, True
+                    # urls may still come from elsewhere, look again in a bit
+                    wait = POLL_INTERVAL
+
+                if deadline is not None:
+                    now = time.monotonic()
+                    if deadline <= now:
+                        raise Empty
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self.condition.wait(wait)
+
+    def _crawl_over(self):
+        # with the condition held, once nothing is queued or in flight here;
+        # a frontier that other processes send urls to says no until they are done too
+        return True
+
+    def _release_host(self, hostname, delay):
+        # the host may be hit again once delay seconds have passed
+        with self.condition:
+            if hostname not in self.in_flight_hosts:
+                return
+            self.in_flight_hosts.discard(hostname)
+            self.next_fetch_time[hostname] = time.monotonic() + delay
+            self._schedule_host(hostname)
+            if not self.in_flight_hosts and not self.ready_hosts:
+                # wake up the workers waiting so they can see the crawl is over
+                self.condition.notify_all()
+
+    def _is_saved(self, urlhash):
+        if self.seen is not None:
+            return urlhash_key(urlhash) in self.seen
+        return urlhash in self.save
 
     def add_url(self, url):
-        url = normalize(url)
+        start = time.perf_counter()
+        url = canonicalize(url)
+        # low yield url templates and hosts are throttled or turned away here, see utils/traps.py
+        if not check_url_for_traps(url):
+            metrics.inc("frontier_trap_rejections_total")
+            forget_url(url)
+            return
         urlhash = get_urlhash(url)
-        hostname = hostname_ify(url)
-        if hostname not in self.domain_locks.keys():
-            print("Adding key to locks: " + hostname)
-            self.domain_locks[hostname] = Lock()
-        if urlhash not in self.save:
-            self.save[urlhash] = (url, False)
-            self.save.sync()
-            self.add_to_to_be_downloaded(url)
-            
+        with self.condition:
+            if self._is_saved(urlhash):
+                # queued or fetched before, by a run this one resumed say
+                forget_url(url)
+            else:
+                if self.seen is not None:
+                    self.seen.add(urlhash_key(urlhash))
+                self.save[urlhash] = (url, False)
+                if self.sync_every_url:
+                    with metrics.timer("stage_seconds", stage="frontier_sync"):
+                        self.save.sync()
+                # is_valid checks it again when it is dequeued: the scraper lets a url through
+                # while its host's robots.txt is unknown, and that may have changed since
+                self.add_to_to_be_downloaded(url, checked=False)
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="frontier_add")
 
-    
     def mark_url_complete(self, url):
+        start = time.perf_counter()
+        forget_url(url)
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            # This should not happen.
-            self.logger.error(
-                f"Completed url {url}, but have not seen it before.")
+        hostname = hostname_ify(url)
+        with self.condition:
+            if not self._is_saved(urlhash):
+                # This should not happen.
+                self.logger.error(
+                    f"Completed url {url}, but have not seen it before.")
+                if self.seen is not None:
+                    self.seen.add(urlhash_key(urlhash))
 
-        self.save[urlhash] = (url, True)
-        self.save.sync()
+            self.save[urlhash] = (url, True)
+            if self.sync_every_url:
+                with metrics.timer("stage_seconds", stage="frontier_sync"):
+                    self.save.sync()
+
+            self._release_host(hostname, self._fetch_delay(url))
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="frontier_complete")
+
+    def close(self):
+        with self.condition:
+            self.save.sync()
+            self.save.close()
+            if self.seen is not None:
+                self.seen.close()
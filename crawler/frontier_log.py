@@ -0,0 +1,224 @@
+import os
+import atexit
+import pickle
+import struct
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from zlib import crc32
+from threading import Thread, Lock, Event
+
+from utils import hostname_ify
+from utils.canonical import KEY_VERSION
+from utils.url_seen import UrlSeen, url_key, urlhash_key
+
+# every record is <payload length><crc32 of payload> then the payload,
+# which is one op byte followed by the utf-8 url
+HEADER = struct.Struct("<II")
+ADD = b"A"
+COMPLETE = b"C"
+
+
+def log_path(save_file):
+    return save_file + ".log"
+
+
+def snapshot_path(save_file):
+    return save_file + ".snapshot"
+
+
+def exists(save_file):
+    return os.path.exists(log_path(save_file)) or os.path.exists(snapshot_path(save_file))
+
+
+def remove(save_file):
+    for path in (log_path(save_file), snapshot_path(save_file)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class FrontierLog(object):
+    '''
+    Append-only, checksummed replacement for the frontier shelve.
+
+    Takes the same {urlhash: (url, completed)} assignments as the shelve the
+    frontier uses, but every change is appended to a log instead of
+    rewriting a dbm entry. Records are buffered and written with one fsync
+    per group: once flush_records records are waiting or flush_interval
+    seconds have passed. When the log holds compact_records records, and on
+    close, it is folded into a snapshot and truncated.
+
+    Urls are only kept by their 64 bit key (utils/url_seen.py). The snapshot
+    only keeps what a restart needs: the pending urls grouped by host, and a
+    sorted array of the keys of the completed ones. So
+    resuming reads the pending set and one flat array instead of every url
+    ever discovered. Opening replays snapshot + log, stopping at the first
+    torn or corrupt record.
+
+    The snapshot records the KEY_VERSION of its keys (utils/canonical.py).
+    Pending urls of an older snapshot are rekeyed from their url, but
+    completed keys have no url to rekey from: such a snapshot is refused,
+    start it over with --restart.
+    '''
+    def __init__(self, save_file, flush_records=256, flush_interval=0.2, compact_records=100000):
+        self.save_file = save_file
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.compact_records = compact_records
+
+        # pending urls by key, and by host in the order they were found
+        self.pending = dict()
+        self.pending_hosts = dict()
+        # completed keys: sorted ones from the snapshot plus the ones since
+        self.completed_base = array("Q")
+        self.completed_new = UrlSeen()
+
+        self.buffer = list()
+        self.log_records = 0
+        self.lock = Lock()
+
+        self._load()
+        self.log_file = open(log_path(save_file), "ab")
+
+        self.closed = Event()
+        self.flusher = Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    def _load(self):
+        if os.path.exists(snapshot_path(self.save_file)):
+            with open(snapshot_path(self.save_file), "rb") as snapshot:
+                state = pickle.load(snapshot)
+            current = state.get("key_version", 1) == KEY_VERSION
+            if not current and state["completed"]:
+                raise RuntimeError(
+                    f"{snapshot_path(self.save_file)} was written before key version {KEY_VERSION}, "
+                    f"its completed urls cannot be rekeyed; resume it with the old code or --restart.")
+            self.completed_base.frombytes(state["completed"])
+            for hostname, entries in state["pending"].items():
+                self.pending_hosts[hostname] = [url for _, url in entries]
+                if current:
+                    self.pending.update(entries)
+                else:
+                    # hex urlhashes before url_seen, other keys before key_form
+                    self.pending.update((url_key(url), url) for _, url in entries)
+        if not os.path.exists(log_path(self.save_file)):
+            return
+        with open(log_path(self.save_file), "rb") as log:
+            data = log.read()
+        offset = 0
+        while offset + HEADER.size <= len(data):
+            length, checksum = HEADER.unpack_from(data, offset)
+            payload = data[offset + HEADER.size:offset + HEADER.size + length]
+            if len(payload) != length or crc32(payload) != checksum:
+                break
+            self._apply(payload[:1], payload[1:].decode("utf-8"))
+            offset += HEADER.size + length
+            self.log_records += 1
+        if offset != len(data):
+            # drop the torn tail left by a crash mid-write
+            with open(log_path(self.save_file), "r+b") as log:
+                log.truncate(offset)
+
+    def _apply(self, op, url):
+        key = url_key(url)
+        if op == COMPLETE:
+            self._complete(key)
+        elif key not in self.pending and not self.is_completed(key):
+            self.pending[key] = url
+            self.pending_hosts.setdefault(hostname_ify(url), list()).append(url)
+
+    def _complete(self, key):
+        self.pending.pop(key, None)
+        if not self.is_completed(key):
+            self.completed_new.add(key)
+
+    def is_completed(self, key):
+        if key in self.completed_new:
+            return True
+        i = bisect_left(self.completed_base, key)
+        return i < len(self.completed_base) and self.completed_base[i] == key
+
+    def pending_by_host(self):
+        # {hostname: [url, ...]} of everything not completed when the log was
+        # opened, only meant to be read once on resume
+        pending_hosts, self.pending_hosts = self.pending_hosts, dict()
+        return {
+            hostname: [url for url in urls if url_key(url) in self.pending]
+            for hostname, urls in pending_hosts.items()}
+
+    # the parts of the shelve interface the frontier uses
+    def __contains__(self, urlhash):
+        key = urlhash_key(urlhash)
+        return key in self.pending or self.is_completed(key)
+
+    def __len__(self):
+        return len(self.pending) + len(self.completed_base) + len(self.completed_new)
+
+    def __setitem__(self, urlhash, value):
+        url, completed = value
+        payload = (COMPLETE if completed else ADD) + url.encode("utf-8")
+        key = urlhash_key(urlhash)
+        with self.lock:
+            if completed:
+                self._complete(key)
+            else:
+                self.pending[key] = url
+            self.buffer.append(HEADER.pack(len(payload), crc32(payload)) + payload)
+            if len(self.buffer) >= self.flush_records:
+                self._flush()
+
+    def _flush(self):
+        # group commit: one write and one fsync for everything buffered
+        if not self.buffer:
+            return
+        self.log_file.write(b"".join(self.buffer))
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+        self.log_records += len(self.buffer)
+        self.buffer = list()
+        if self.log_records >= self.compact_records:
+            self._compact()
+
+    def _compact(self):
+        # a key is never in both, so merging the two sorted lists is enough
+        completed = array("Q", merge(self.completed_base, sorted(self.completed_new)))
+        pending = dict()
+        for key, url in self.pending.items():
+            pending.setdefault(hostname_ify(url), list()).append((key, url))
+
+        # write the snapshot next to the old one and swap it in, then start a new log
+        tmp_path = snapshot_path(self.save_file) + ".tmp"
+        with open(tmp_path, "wb") as snapshot:
+            pickle.dump(
+                {"pending": pending, "completed": completed.tobytes(), "key_version": KEY_VERSION},
+                snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(tmp_path, snapshot_path(self.save_file))
+        self.log_file.close()
+        self.log_file = open(log_path(self.save_file), "wb")
+        self.log_records = 0
+        self.completed_base = completed
+        self.completed_new = UrlSeen()
+
+    def _flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            with self.lock:
+                self._flush()
+
+    def sync(self):
+        with self.lock:
+            if not self.log_file.closed:
+                self._flush()
+
+    def close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        with self.lock:
+            self._flush()
+            if self.log_records:
+                # leave a compact snapshot behind for the next resume
+                self._compact()
+            self.log_file.close()
@@ -0,0 +1,94 @@
+'''
+Best-first frontier, FRONTIER = priority.
+
+Frontier fetches the urls of a host in the order they were found and hands
+out the host that has waited longest. PriorityFrontier keeps the urls of
+each host in a heap by score instead (utils/url_scoring.py, asked through
+scraper.url_priority) and, out of the hosts that may be hit now, hands out
+the one whose own score plus best url score is highest, so a time-boxed
+crawl spends its fetches where new pages have been turning up. Politeness
+is the same: a host is only a candidate once its delay has passed, with one
+url of it in flight at a time.
+
+Scores change while urls wait (more inlinks, templates and hosts that keep
+bringing nothing new), so they are looked at again when they are used:
+
+- when a host is picked, its top FRONTIER_RESCORE urls are scored again
+  and the best of them is fetched
+- a ready host is scored again when it comes to the top, and goes back in
+  if it fell behind the next one
+'''
+from heapq import heappush, heappop
+from itertools import count
+
+from utils import metrics
+from crawler.frontier import Frontier
+from scraper import url_priority, host_priority
+
+
+class PriorityFrontier(Frontier):
+    def __init__(self, config, restart):
+        # set before Frontier.__init__, which adds the seed urls
+        self.rescore = max(1, config.frontier_rescore)
+        # ties go to the url found first
+        self.sequence = count()
+        # max-heap of (-priority, hostname) for the hosts whose delay has passed; an entry
+        # whose priority is not the host's in best_priority is stale and skipped
+        self.best_hosts = list()
+        self.best_priority = dict()
+        super().__init__(config, restart)
+        metrics.gauge("frontier_ready_hosts", lambda: len(self.ready_hosts) + len(self.best_priority))
+
+    def _push(self, hostname, url, checked):
+        urls = self.to_be_downloaded.get(hostname)
+        if urls is None:
+            urls = self.to_be_downloaded[hostname] = list()
+        sequence = next(self.sequence)
+        heappush(urls, (-url_priority(url), sequence, url, checked))
+        if hostname in self.best_priority and urls[0][1] == sequence:
+            # a better url makes a ready host better
+            self._push_best(hostname)
+
+    def _pop(self, hostname):
+        urls = self.to_be_downloaded[hostname]
+        candidates = [heappop(urls) for _ in range(min(self.rescore, len(urls)))]
+        candidates = [(-url_priority(url), sequence, url, checked) for _, sequence, url, checked in candidates]
+        best = min(candidates)
+        for entry in candidates:
+            if entry is not best:
+                heappush(urls, entry)
+        return best[2], best[3]
+
+    def _host_priority(self, hostname):
+        return host_priority(hostname) - self.to_be_downloaded[hostname][0][0]
+
+    def _push_best(self, hostname):
+        priority = self._host_priority(hostname)
+        self.best_priority[hostname] = priority
+        heappush(self.best_hosts, (-priority, hostname))
+
+    def _drop_stale(self):
+        best_hosts = self.best_hosts
+        while best_hosts and self.best_priority.get(best_hosts[0][1]) != -best_hosts[0][0]:
+            heappop(best_hosts)
+
+    def _ready_host(self, now):
+        # every host whose delay has passed competes on priority
+        while self.ready_hosts and self.ready_hosts[0][0] <= now:
+            _, hostname = heappop(self.ready_hosts)
+            self._push_best(hostname)
+        self._drop_stale()
+        while self.best_hosts:
+            _, hostname = heappop(self.best_hosts)
+            priority = self._host_priority(hostname)
+            self._drop_stale()
+            if self.best_hosts and priority < -self.best_hosts[0][0]:
+                # fell behind since it was scored, back in at its new place
+                self.best_priority[hostname] = priority
+                heappush(self.best_hosts, (-priority, hostname))
+                continue
+            del self.best_priority[hostname]
+            return hostname, 0
+        if self.ready_hosts:
+            return None, self.ready_hosts[0][0] - now
+        return None, None
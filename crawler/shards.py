@@ -0,0 +1,193 @@
+'''
+Multi-process crawl, one crawler process per shard of the hosts.
+
+    python launch.py --shards 4
+
+Hosts (hostname_ify, so www.x and x go together) are assigned to shards by
+consistent hashing (utils/hash_ring.py). Every shard process runs its own
+Crawler with a ShardFrontier that keeps only the urls of its own hosts and
+forwards the others to their owner over a multiprocessing queue, so each
+host is scheduled by exactly one frontier and POLITENESS and Crawl-delay
+hold across processes.
+
+Each shard keeps its own save file, robots.txt shelve, link log, content
+store and report (frontier.shard0.shelve, valid.shard0.txt,
+content_store/shard0, result1.shard0.txt, ...).
+When all shards are done their analytics are merged into result1.txt.
+Near duplicates are only caught within a shard, so pages on hosts of two
+shards that one process would have dropped as near duplicates both count
+in the merged report.
+Resume or replay with the same number of shards, the ring decides which
+save file and content store a host's urls are in.
+
+A shard stops once every shard has nothing queued or in flight and no
+forwarded url is on its way: shards mark themselves idle in a shared array
+and count the forwarded urls not yet added on the other side.
+'''
+import os
+import copy
+import multiprocessing
+from threading import Thread
+from queue import Empty
+
+from utils import get_logger, hostname_ify
+from utils.canonical import canonicalize
+from utils.hash_ring import HashRing
+from utils.crawl_state import CrawlState
+from crawler.frontier import Frontier
+from crawler.priority_frontier import PriorityFrontier
+from scraper import forget_url
+
+
+def shard_path(path, shard):
+    # frontier.shelve -> frontier.shard0.shelve, empty stays empty
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard}{ext}"
+
+
+def shard_config(config, shard):
+    # the config of one shard process, with its own files
+    config = copy.copy(config)
+    config.save_file = shard_path(config.save_file, shard)
+    config.robots_cache = shard_path(config.robots_cache, shard)
+    config.link_log = shard_path(config.link_log, shard)
+    config.url_seen_dir = os.path.join(config.url_seen_dir, f"shard{shard}")
+    config.metrics_port = config.metrics_port + shard if config.metrics_port else 0
+    config.metrics_file = shard_path(config.metrics_file, shard)
+    config.content_store = os.path.join(config.content_store, f"shard{shard}")
+    return config
+
+
+class ShardSync(object):
+    # what the shard processes share to tell when the whole crawl is over
+    def __init__(self, context, shards):
+        self.lock = context.Lock()
+        self.in_transit = context.Value("q", 0, lock=False)
+        self.idle = context.Array("b", shards, lock=False)
+
+    def sent(self):
+        with self.lock:
+            self.in_transit.value += 1
+
+    def received(self):
+        with self.lock:
+            self.in_transit.value -= 1
+
+    def busy(self, shard):
+        with self.lock:
+            self.idle[shard] = 0
+
+    def idle_everywhere(self, shard):
+        # marks the shard idle, True if all of them are and nothing is on its way
+        with self.lock:
+            self.idle[shard] = 1
+            return self.in_transit.value == 0 and all(self.idle)
+
+
+class ShardFrontier(Frontier):
+    def __init__(self, config, restart, shard, ring, inboxes, sync):
+        # set before Frontier.__init__, which adds the seed urls
+        self.shard = shard
+        self.ring = ring
+        self.inboxes = inboxes
+        self.sync = sync
+        self.forwarded = 0
+        super().__init__(config, restart)
+        Thread(target=self._receive, daemon=True).start()
+
+    def add_url(self, url):
+        url = canonicalize(url)
+        owner = self.ring.owner(hostname_ify(url))
+        if owner == self.shard:
+            super().add_url(url)
+            return
+        # the owner scores it from scratch
+        forget_url(url)
+        self.sync.sent()
+        self.inboxes[owner].put(url)
+        self.forwarded += 1
+
+    def _receive(self):
+        # adds the urls other shards found for this shard's hosts
+        inbox = self.inboxes[self.shard]
+        while True:
+            url = inbox.get()
+            if url is None:
+                return
+            # busy first, the url still counts as in transit until it is added
+            self.sync.busy(self.shard)
+            try:
+                super().add_url(url)
+            finally:
+                self.sync.received()
+
+    def _crawl_over(self):
+        return self.sync.idle_everywhere(self.shard)
+
+    def close(self):
+        self.inboxes[self.shard].put(None)
+        self.logger.info(f"Forwarded {self.forwarded} urls to other shards.")
+        super().close()
+
+
+class PriorityShardFrontier(ShardFrontier, PriorityFrontier):
+    # FRONTIER = priority, the forwarding of ShardFrontier on top of the heaps of PriorityFrontier
+    pass
+
+
+def run_shard(config, restart, shard, shards, inboxes, sync, summaries):
+    # body of one shard process
+    import scraper
+    from crawler import Crawler
+    from crawler.worker import Worker
+    from crawler.async_worker import AsyncWorker
+
+    config = shard_config(config, shard)
+    scraper.results_file = shard_path(scraper.results_file, shard)
+    ring = HashRing(shards)
+    frontier_class = PriorityShardFrontier if config.frontier == "priority" else ShardFrontier
+    crawler = Crawler(
+        config, restart,
+        frontier_factory=lambda config, restart: frontier_class(config, restart, shard, ring, inboxes, sync),
+        worker_factory=AsyncWorker if config.engine == "async" else Worker)
+    crawler.start_async()
+    for worker in crawler.workers:
+        worker.join()
+    # before join closes the url sets
+    summaries.put(scraper.state.summary())
+    crawler.join()
+
+
+def crawl_sharded(config, restart, shards):
+    # runs the crawl in shards processes and merges their analytics into result1.txt
+    logger = get_logger("SHARDS")
+    context = multiprocessing.get_context("spawn")
+    inboxes = [context.Queue() for _ in range(shards)]
+    sync = ShardSync(context, shards)
+    summaries = context.Queue()
+    processes = [
+        context.Process(target=run_shard, args=(config, restart, shard, shards, inboxes, sync, summaries))
+        for shard in range(shards)]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {shards} crawler processes.")
+
+    state = CrawlState()
+    # read before joining, a process does not exit while its summary is still in the queue
+    merged = 0
+    while merged < shards:
+        try:
+            state.merge(summaries.get(timeout=1))
+            merged += 1
+        except Empty:
+            if not any(process.is_alive() for process in processes):
+                logger.error(f"Only {merged} of {shards} shards sent their analytics.")
+                break
+    for process in processes:
+        process.join()
+    with open("result1.txt", "w+") as file1:
+        file1.write(state.report())
+    state.close()
+    logger.info(f"Merged the reports of {shards} shards into result1.txt.")
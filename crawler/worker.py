@@ -1,11 +1,9 @@
+import time
 from threading import Thread
-from threading import Lock
-import urllib
 from inspect import getsource
 from utils.download import download
-from utils import get_logger, hostname_ify
+from utils import get_logger, metrics
 import scraper
-import time
 
 
 
@@ -13,9 +11,9 @@ import time
 class Worker(Thread):
     def __init__(self, worker_id, config, frontier):
         self.logger = get_logger(f"Worker-{worker_id}", "Worker")
+        self.worker_name = f"worker-{worker_id}"
         self.config = config
         self.frontier = frontier
-        self.lock_dictionary = frontier.domain_locks
         # basic check for requests in scraper
         assert {getsource(scraper).find(req) for req in {"from requests import", "import requests"}} == {-1}, "Do not use requests in scraper.py"
         assert {getsource(scraper).find(req) for req in {"from urllib.request import", "import urllib.request"}} == {-1}, "Do not use urllib.request in scraper.py"
@@ -23,27 +21,36 @@ class Worker(Thread):
         
     def run(self):
         while True:
+            # blocks until a host is past its politeness delay
+            start = time.perf_counter()
             tbd_url = self.frontier.get_tbd_url()
+            waited = time.perf_counter() - start
+            metrics.observe("stage_seconds", waited, stage="frontier_wait")
+            metrics.observe("worker_stage_seconds", waited, stage="frontier_wait", worker=self.worker_name)
             if not tbd_url:
                 self.logger.info("Frontier is empty. Stopping Crawler.")
                 break
-            # parse the hostname from the domain name
-            hostname = hostname_ify(tbd_url)
-            # acquire the lock for the domain
-
-            self.lock_dictionary[hostname].acquire()
-  
-            # download the url
-            resp = download(tbd_url, self.config, self.logger)
-            # release the lock for the domain
-
- 
-            self.logger.info(
-                f"Downloaded {tbd_url}, status <{resp.status}>, "
-                f"using cache {self.config.cache_server}.")
-            scraped_urls = scraper.scraper(tbd_url, resp)
-            for scraped_url in scraped_urls:
-                self.frontier.add_url(scraped_url)
-            self.frontier.mark_url_complete(tbd_url)
-            time.sleep(self.config.time_delay)
-            self.lock_dictionary[hostname].release()
\ No newline at end of file
+            try:
+                # download the url
+                start = time.perf_counter()
+                resp = download(tbd_url, self.config, self.logger)
+                seconds = time.perf_counter() - start
+                metrics.record_download(self.worker_name, tbd_url, resp.status, seconds)
+                # the frontier spaces out the fetches of hosts that fail or slow down
+                scraper.record_fetch(tbd_url, resp.status, seconds)
+                self.logger.info(
+                    f"Downloaded {tbd_url}, status <{resp.status}>, "
+                    f"using cache {self.config.cache_server}.")
+                start = time.perf_counter()
+                scraped_urls = scraper.scraper(tbd_url, resp)
+                metrics.observe("worker_stage_seconds", time.perf_counter() - start,
+                                stage="scrape", worker=self.worker_name)
+                for scraped_url in scraped_urls:
+                    self.frontier.add_url(scraped_url)
+            except Exception:
+                # one bad page must not take the worker down with it
+                self.logger.exception(f"Failed to crawl {tbd_url}.")
+                metrics.inc("worker_errors_total", worker=self.worker_name)
+            finally:
+                # hands the host back to the frontier, which schedules its next fetch
+                self.frontier.mark_url_complete(tbd_url)
@@ -4,14 +4,35 @@ from argparse import ArgumentParser
 from utils.server_registration import get_cache_server
 from utils.config import Config
 from crawler import Crawler
+from crawler.frontier import Frontier
+from crawler.priority_frontier import PriorityFrontier
+from crawler.async_worker import AsyncWorker
+from crawler.shards import crawl_sharded, shard_config
 
 
-def main(config_file, restart):
+def main(config_file, restart, shards=1, cache_server=None):
     cparser = ConfigParser()
     cparser.read(config_file)
     config = Config(cparser)
-    config.cache_server = get_cache_server(config, restart)
-    crawler = Crawler(config, restart)
+    # a replay crawl gets everything from the content store, no cache server
+    register = not cache_server and config.content_store_mode != "replay"
+    if cache_server:
+        # a local stand-in like benchmarks/cache_server.py, no registration
+        host, port = cache_server.rsplit(":", 1)
+        config.cache_server = (host, int(port))
+    if shards > 1:
+        # one crawler process per shard of the hosts, see crawler/shards.py
+        if register:
+            config.cache_server = get_cache_server(shard_config(config, 0), restart)
+        crawl_sharded(config, restart, shards)
+        return
+    if register:
+        config.cache_server = get_cache_server(config, restart)
+    frontier_factory = PriorityFrontier if config.frontier == "priority" else Frontier
+    if config.engine == "async":
+        crawler = Crawler(config, restart, frontier_factory=frontier_factory, worker_factory=AsyncWorker)
+    else:
+        crawler = Crawler(config, restart, frontier_factory=frontier_factory)
     crawler.start()
 
 
@@ -19,5 +40,7 @@ if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("--restart", action="store_true", default=False)
     parser.add_argument("--config_file", type=str, default="config.ini")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--cache_server", type=str, default=None, help="host:port")
     args = parser.parse_args()
-    main(args.config_file, args.restart)
+    main(args.config_file, args.restart, args.shards, args.cache_server)
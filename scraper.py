@@ -3,13 +3,25 @@ This module contains the webscraper which extracts and stores necessary page inf
 to go about crawling in a polite way with respect to site policies (robots.txt)
 '''
 import re
-from urllib.robotparser import RobotFileParser
+import os
 from urllib.parse import urlparse, urldefrag
-from bs4 import BeautifulSoup
-from hashlib import blake2b
-import shelve
 import time
-from threading import RLock
+import atexit
+from threading import Thread, Event
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from utils.simhash import gen_fingerprint
+from utils.crawl_state import CrawlState
+from utils.link_journal import LinkJournal
+from utils.html_extract import extract
+from utils.url_filter import UrlFilter
+from utils.canonical import canonicalize, set_strip_params
+from utils.robots import RobotsCache, fetch_through_cache
+from utils.traps import TrapDetector, NEW, DUPLICATE, LOW, ERROR
+from utils.url_scoring import UrlScoring
+from utils.rate_control import RateControl
+from utils import get_logger, hostname_ify, metrics
+from utils.word_stats import STOPWORDS, count_words, make_word_stats
 
 GOOD_RESP = range(200,400)
 USER_AGENT = 'my-user-agent'
@@ -17,124 +29,211 @@ DOMAINS = ["ics.uci.edu","cs.uci.edu","informatics.uci.edu","stat.uci.edu"]
 LOW_INFO_THRES = 0.1
 
 
-bad_url_count = dict()
-banned_domains = set()
-subdomains = dict()
+# url templates and hosts that keep turning up nothing new, see utils/traps.py
+# (off until configure); banned_domains are the banned hosts and bad_url_count
+# how many urls of each host were turned away
+traps = TrapDetector()
+bad_url_count = traps.rejected
+banned_domains = traps.banned_hosts
 info_value = 0
 
+# what the priority frontier orders urls and hosts by, see utils/url_scoring.py
+# (no scorers until configure, and none unless FRONTIER = priority)
+scoring = UrlScoring()
 
-global_lock = RLock()
 
-going_to_visit = set()
+# urls, fingerprints and analytics shared by the workers, see utils/crawl_state.py
+state = CrawlState()
 
-global_site = set()
-robot_dict = dict()
-longest_page = ""
-total_words = 0
-token_map = {}
-fingerprints = set()
-stopwords = ['a', 'about', 'above', 'after', 'again', 'against', 'all', 'am', 'an', 'and', 'any', 'are', "aren't", 'as', 'at', 'be', 'because', 'been', 'before', 'being', 'below', 'between', 'both', 'but', 'by', "can't", 'cannot', 'could', "couldn't", 'did', "didn't", 'do', 'does', "doesn't", 'doing', "don't", 'down', 'during', 'each', 'few', 'for', 'from', 'further', 'had', "hadn't", 'has', "hasn't", 'have', "haven't", 'having', 'he', "he'd", "he'll", "he's", 'her', 'here', "here's", 'hers', 'herself', 'him', 'himself', 'his', 'how', "how's", 'i', "i'd", "i'll", "i'm", "i've", 'if', 'in', 'into', 'is', "isn't", 'it', "it's", 'its', 'itself', "let's", 'me', 'more', 'most', "mustn't", 'my', 'myself', 'no', 'nor', 'not', 'of', 'off', 'on', 'once', 'only', 'or', 'other', 'ought', 'our', 'ours', 'ourselves', 'out', 'over', 'own', 'same', "shan't", 'she', "she'd", "she'll", "she's", 'should', "shouldn't", 'so', 'some', 'such', 'than', 'that', "that's", 'the', 'their', 'theirs', 'them', 'themselves', 'then', 'there', "there's", 'these', 'they', "they'd", "they'll", "they're", "they've", 'this', 'those', 'through', 'to', 'too', 'under', 'until', 'up', 'very', 'was', "wasn't", 'we', "we'd", "we'll", "we're", "we've", 'were', "weren't", 'what', "what's", 'when', "when's", 'where', "where's", 'which', 'while', 'who', "who's", 'whom', 'why', "why's", 'with', "won't", 'would', "wouldn't", 'you', "you'd", "you'll", "you're", "you've", 'your', 'yours', 'yourself', 'yourselves']
+# what analyze_page sends back: word total, word count dict, fingerprint and outlinks
+# (the last three are None if the page was filtered out)
+PageAnalysis = namedtuple("PageAnalysis", ["word_total", "word_count", "fingerprint", "links"])
+analyzer_pool = None
+report_timer = None
+# where write_results puts the report, each process of a sharded crawl has its own
+results_file = "result1.txt"
+# html parser backend for analyze_page: stream, lxml or bs4
+html_backend = "stream"
+# where every link decision gets logged (valid.txt), set up by configure
+link_journal = LinkJournal(None)
+
+# the checks of is_valid that only look at the url, memoized
+url_filter = UrlFilter(DOMAINS)
+
+# robots.txt rules per host, fetched lazily through the cache server once configure
+# has run (until then everything is allowed), see utils/robots.py
+robots = RobotsCache(None)
+robots_max_delay = 0
+# per host delays that grow when a host answers with errors or slowly, see
+# utils/rate_control.py (off until configure)
+rates = RateControl()
+# stopwords now live in utils/word_stats.py as a frozenset
+stopwords = STOPWORDS
 
 
 DEBUG = False
 def debug(msg):
     if DEBUG:
         print(msg)
-# checks if a string is ascii
-def url_ascii(url):
-    return all(ord(c) < 128 for c in url)
-
-# build a dictionary of {domain:RobotFileParser} -- use to check if urlpath is valid
-def build_robot(domains):
-    global robot_dict
-    for domain in domains:
-        rp = RobotFileParser()
-        rp.set_url('https://www.' + domain + '/robots.txt')
-        rp.read()
-        robot_dict[domain] = rp
-build_robot(DOMAINS)
-
-# check if we can fetch the url (permission from robots.txt)
-def check_url_for_robots(url):
-    global robot_dict
-    parts = urlparse(url)
-    return robot_dict[parts.hostname].can_fetch("*", url)
 
-def gen_hash(token):
-    NUM_BITS = 128
-    digest_size = (NUM_BITS + 7) // 8
+def configure(config):
+    # called by the Crawler before any worker starts
+    global analyzer_pool
+    global report_timer
+    global link_journal
+    global html_backend
+    global robots
+    global robots_max_delay
+    global url_filter
+    global traps
+    global bad_url_count
+    global banned_domains
+    global scoring
+    global rates
+    html_backend = config.html_parser
+    # before the analyzer processes start, they canonicalize links too
+    set_strip_params(config.url_strip_params)
+    if config.analyzers > 0 and analyzer_pool is None:
+        analyzer_pool = ProcessPoolExecutor(max_workers=config.analyzers)
+        # start the processes now, before the link journal and the report timer
+        # start their threads, so this is still the only thread when they fork
+        analyzer_pool.submit(debug, "analyzer pool started").result()
+    url_filter = UrlFilter(DOMAINS, config.url_filter_cache)
+    robots = RobotsCache(
+        fetch_through_cache(config), config.user_agent, config.robots_ttl, config.robots_cache or None)
+    robots_max_delay = config.robots_max_delay
+    traps = TrapDetector(
+        config.trap_min_fetches, config.trap_min_yield, config.trap_throttle, config.trap_ban_fetches,
+        config.trap_host_min_fetches, config.trap_host_min_yield, get_logger("TRAPS"))
+    bad_url_count = traps.rejected
+    banned_domains = traps.banned_hosts
+    rates = RateControl(
+        config.time_delay, config.rate_max_delay, config.rate_backoff, config.rate_recover,
+        config.rate_slow_factor, config.rate_give_up, get_logger("RATE"))
+    scoring = UrlScoring(config.frontier_scorers if config.frontier == "priority" else ())
+    with state.stats_lock:
+        if not state.words:
+            state.words = make_word_stats(config.word_stats, config.word_stats_capacity)
+    if config.url_seen_memory_keys:
+        state.set_spill(os.path.join(config.url_seen_dir, "scraper"), config.url_seen_memory_keys)
+    link_journal = LinkJournal(
+        config.link_log, config.link_log_format, config.link_log_sample,
+        config.link_log_max_bytes, config.link_log_backups)
+    if config.report_interval > 0 and report_timer is None:
+        report_timer = Event()
+        Thread(target=write_results_every, args=(config.report_interval, report_timer), daemon=True).start()
+        # still leave a report behind if the crawl is interrupted
+        atexit.register(write_results)
+
+def shutdown():
+    global analyzer_pool
+    global report_timer
+    if analyzer_pool is not None:
+        analyzer_pool.shutdown()
+        analyzer_pool = None
+    if report_timer is not None:
+        report_timer.set()
+        report_timer = None
+    link_journal.close()
+    write_results()
+    state.close()
+    robots.close()
+
+def write_results_every(interval, stopped):
+    # rewrites result1.txt every interval seconds if anything changed
+    while not stopped.wait(interval):
+        if state.dirty:
+            write_results()
+
+# check if we can fetch the url (permission from the robots.txt of its host),
+# None if the robots.txt is not known yet and fetch is False
+def check_url_for_robots(url, fetch=True):
+    return robots.can_fetch(url, fetch)
+
+# whether is_valid can answer for url without fetching its host's robots.txt
+def robots_known(url):
+    return robots.can_fetch(url, False) is not None
+
+# seconds the robots.txt of the url's host asks between requests, 0 if it does not say
+def crawl_delay(url):
+    delay = robots.crawl_delay(url)
+    if delay is None:
+        return 0
+    return min(delay, robots_max_delay)
+
+# seconds the frontier should leave the host of url alone after fetching it,
+# at least POLITENESS, longer while the host is answering with errors or slowly
+def host_delay(url):
+    return rates.delay(hostname_ify(url))
+
+# how the download of url went, reported by the workers
+def record_fetch(url, status, seconds):
+    rates.fetched(url, status, seconds)
+
+# whether the frontier should queue the url, False for urls of trap templates and hosts,
+# and of hosts that kept failing
+def check_url_for_traps(url):
+    if rates.dropped(hostname_ify(url)):
+        debug("host keeps failing")
+        return False
+    reason = traps.admit(url)
+    if reason is not None:
+        debug(reason)
+        return False
+    return True
+
+# whether a queued url turned out to be part of a trap since, or its host kept failing
+def is_trapped(url):
+    return traps.banned(url) or rates.dropped(hostname_ify(url))
 
-    token_b = token.encode('utf-8')
-    hash_obj = blake2b(token_b, digest_size=digest_size)
-    return int(hash_obj.hexdigest(), 16) # return the hash as an int
+# how the fetch of url went (NEW, DUPLICATE, LOW or ERROR), for the trap detector and the url scoring
+def record_outcome(url, outcome):
+    traps.record(url, outcome)
+    scoring.fetched(url, outcome)
 
-def gen_fingerprint(tokens_dict):
-    NUM_BITS = 128 # number of bits generated for each hash
+# the frontier is done with url (fetched, turned away or sent to another shard),
+# scorers drop what they kept about it
+def forget_url(url):
+    scoring.forget(url)
 
-    hash_list = list() # list of tuples (hash, multiplier)
-    vector_v = list() # to be formed by summing weights 
-    total_count = sum(tokens_dict.values())
-    for token, count in tokens_dict.items():
-        hash_list.append((gen_hash(token), count)) # dividing to normalize counts
+# how soon the priority frontier should fetch url, and pick hostname, higher is sooner
+def url_priority(url):
+    return scoring.url_score(url)
 
-    
-    mask = 1
-    for i in range(NUM_BITS):
-        weight = 0
-        for hash_, multiplier in hash_list:
-            masked_bit = hash_ & mask
-            if masked_bit == 0:
-                multiplier *= -1
-            weight += multiplier
-        mask <<= 1 # shift mask to the left by 1
-        vector_v.append(weight)
-    ret = ""
-    for bit in vector_v:
-        ret += "1" if bit > 0 else "0"
-    return int(ret, 2)
+def host_priority(hostname):
+    return scoring.host_score(hostname)
 
 def check_similarity(fingerprint): # returns a boolean, True if similiar, False if not similar
-    global fingerprints
-    NUM_BITS = 128
-    SIMILARITY_THRESHOLD = 0.95
-    
-    if fingerprint in fingerprints: # Exact Match
-        return True
-    for fp in fingerprints: # Near-Duplication
-        similarity = 1 - (bin(fingerprint ^ fp)[2:].count('1') / NUM_BITS)
-        if similarity >= SIMILARITY_THRESHOLD:
-            return True
-    return False
+    # the index only compares against fingerprints sharing a block with this one
+    return state.fingerprints.has_near(fingerprint)
 
 
 def scraper(url, resp):
-    global going_to_visit
-    global global_site
-    global token_map
-    global fingerprints
-    global global_lock
-
-    global_lock.acquire()
+    # no lock is held here, only the short updates to state take one
     start_time = time.time()
     try:
         links = extract_next_links(url, resp)
-        link_results = []
+        valid_links = []
+        start = time.perf_counter()
         for link in links:
             valid = is_valid(link)
-            if valid and link not in going_to_visit and link not in global_site:
-                link_results.append(link)
-            with open("valid.txt", "a") as file1:
-                file1.write(str(link) + " is " + str(valid) + "\n")
+            if valid:
+                valid_links.append(link)
+            link_journal.record(link, valid)
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="is_valid")
+        start = time.perf_counter()
+        link_results = state.claim_links(valid_links)
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="claim_links")
+        scoring.linked(url, valid_links, link_results)
+        metrics.inc("links_total", len(links))
+        metrics.inc("links_valid_total", len(valid_links))
         end_time = time.time()
+        metrics.observe("stage_seconds", end_time - start_time, stage="scrape")
         debug("Scraping took " + str(end_time - start_time) + " seconds")
-        for link in link_results:
-            going_to_visit.add(link)
         return link_results
     except Exception as e:
         debug("Scraper failed")
         return list()
-    finally:
-        global_lock.release()
 
 
 
@@ -147,64 +246,21 @@ def extract__scheme_and_domain(url):
     return scheme_and_domain
 
 def write_results():
-    global total_words
-    global longest_page
-    global global_site
-    global token_map
-    global subdomains
-
+    # writes result1.txt; called by the report timer and on shutdown, not per page
     debug("Writing results to file")
 
-    
-    with open("result1.txt", "w+") as file1:
-        file1.write("Unique page count: " + str(len(global_site)) + "\n\n" )
-        file1.write("Longest page with " + str(total_words) + " words is " + str(longest_page) + "\n\n")
-        file1.write("50 most recurring words in order from greatest to least:\n")
-        l = list(token_map.items())
-        l = sorted(l, key=lambda z: (-z[1],z[0]))
-        for i in range(0,min(50, len(l))):
-            file1.write(str(l[i]) + "\n")
-        # key= 
-        file1.write("\nSubdomains of ics.uci.edu:\n")
-        for k in sorted(subdomains.keys(), key=lambda z: urlparse(z).hostname):
-            v = subdomains[k]
-            file1.write(k + ": " + str(v) + "\n")
-
-def tokenize(text):
-    # declares list to return and compiles an re expression to match
-    comp = re.compile(r"[a-zA-Z'’-]+")
-    tokens = re.findall(comp, text)
-    tokens = [t.lower() for t in tokens if len(t) > 1]
-    return tokens
-
-def compute_word_count(token_list) -> dict:
-    global stopwords
-
-    wc = dict()
-    for token in token_list:
-        if token not in stopwords:
-            if token in wc:
-                wc[token] += 1
-            else:
-                wc[token] = 1
-    return wc
+    report = state.report()
+    with open(results_file, "w+") as file1:
+        file1.write(report)
+
+# tokenize and compute_word_count moved to utils/word_stats.py with the stopwords
 
 def append_word_count(wc) -> None:
     """Word count wc is appended onto token_map."""
-    global token_map
-
-    for word, count in wc.items():
-        if word in token_map:
-            token_map[word] += count
-        else:
-            token_map[word] = count
+    state.merge_page(wc, None)
 
 
 def extract_next_links(url, resp):
-    global subdomains
-    global longest_page
-    global total_words
-    global fingerprints
     # Implementation required.
     # url: the URL that was used to get the page
     # resp.raw_response.url: the actual url of the page
@@ -238,180 +294,184 @@ def extract_next_links(url, resp):
         # checks to ensure a 200 status
         if resp.status < GOOD_RESP[0] or resp.status > GOOD_RESP[-1]:
             debug("resp status is not 200")
+            # counted against the template admit() sees, that of the canonical url
+            record_outcome(canonicalize(urldefrag(url)[0]), ERROR)
             return list()
 
         # add url after it passes all checks, but remove fragment
-        final_url = urldefrag(resp.raw_response.url)[0]
-        #final_url = normalize(final_url) # NameError: name 'normalize' is not defined
-        
+        final_url = canonicalize(urldefrag(resp.raw_response.url)[0])
+
+        # the cpu heavy part runs in an analyzer process if ANALYZERS is set
+        # (then only the whole of it is measured here, its parts in the other process)
+        start = time.perf_counter()
+        if analyzer_pool is not None:
+            analysis = analyzer_pool.submit(
+                analyze_page, url, final_url, resp.raw_response.content, html_backend).result()
+        else:
+            analysis = analyze_page(url, final_url, resp.raw_response.content, html_backend)
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="analyze")
+        start = time.perf_counter()
+        try:
+            return record_page(final_url, analysis)
+        finally:
+            metrics.observe("stage_seconds", time.perf_counter() - start, stage="record")
+    except Exception as e:
+        debug("Hello im here: ")
+        print(e)
+        return []
 
 
-        # get raw text from the html
-        string_document = BeautifulSoup(resp.raw_response.content, "html.parser") #html.fromstring(resp.content)
+def analyze_page(url, final_url, content, backend="stream"):
+    '''
+    Everything about a page that does not touch shared state: parsing,
+    tokenizing, word count, fingerprint and outlinks. Runs in the worker
+    thread, or in an analyzer process, and returns a small PageAnalysis for
+    record_page to merge.
+    '''
+    # get raw text and the hrefs from the html in one pass, see utils/html_extract.py
+    with metrics.timer("stage_seconds", stage="parse"):
+        raw_text, hrefs = extract(content, backend)
+  
+    # if word count too low or high, disregard file, used link below to determine minimum, and maximum is 100x that
+    # https://whiteboard-mktg.com/blog/how-much-content-is-good-for-seo-rankings/#:~:text=Forbes%20indicates%20that%20an%20average,rank%20as%20highly%20in%20search.
 
-       
-        raw_text = string_document.get_text() #string_document.text_content()
-        # remove whitespace extra whitespace 
-        
-        raw_text = re.sub(r'\s+', ' ', raw_text)
-      
-        # if word count too low or high, disregard file, used link below to determine minimum, and maximum is 100x that
-        # https://whiteboard-mktg.com/blog/how-much-content-is-good-for-seo-rankings/#:~:text=Forbes%20indicates%20that%20an%20average,rank%20as%20highly%20in%20search.
+    
+    
+    # if it is bigger than 4 mb, disregard
+    # using this as a reference for 4mb https://www.seoptimer.com/blog/webpage-size/#:~:text=Fast%20forward%20to%20September%202022,and%201%2C818%20KB%20for%20images
+    # (whitespace is counted collapsed, so only collapse it when the page could be too large)
+    if len(raw_text.encode('utf-8')) > 4000000 and len(re.sub(r'\s+', ' ', raw_text).encode('utf-8')) > 4000000:
+        debug("File size too large")
+        return PageAnalysis(0, None, None, None)
+    
+    # count every token, and the ones that are not stop words, in one pass
+    with metrics.timer("stage_seconds", stage="count_words"):
+        total_count_webpage, wc = count_words(raw_text)
 
-        
-        
-        # if it is bigger than 4 mb, disregard
-        # using this as a reference for 4mb https://www.seoptimer.com/blog/webpage-size/#:~:text=Fast%20forward%20to%20September%202022,and%201%2C818%20KB%20for%20images
-        if len(raw_text.encode('utf-8')) > 4000000:
-            debug("File size too large")
-            return list()
-        
-        # make a list of every token, even if it repeats
-        words = tokenize(raw_text)
+    if not 50 < total_count_webpage < 30000:
+        return PageAnalysis(total_count_webpage, None, None, None)
 
+    if(not (30 < len(wc) < 4000)):
+        debug("Word count too low or high")
+        return PageAnalysis(total_count_webpage, None, None, None)
 
-        total_count_webpage = len(words)
+    with metrics.timer("stage_seconds", stage="fingerprint"):
+        fingerprint = gen_fingerprint(wc)
 
-        if not 50 < total_count_webpage < 30000:
-            return list()
+    try:
+        links = extract_links(url, final_url, hrefs)
+    except Exception as e:
+        print(e)
+        links = None
+    return PageAnalysis(total_count_webpage, wc, fingerprint, links)
+
+
+def extract_links(url, final_url, hrefs):
+    parsed_domain =  urlparse(final_url)
+    sub_scheme = parsed_domain.scheme
+
+    # turn the hrefs of the page into absolute links
+    final_list = list()
+    for link in hrefs:
+        link = urldefrag(link)[0]
+        link = str(link)
+        if link.startswith("/") and not link.startswith("//"):
+            scheme_and_domain = extract__scheme_and_domain(url)
+            link = scheme_and_domain + link
+        elif link.startswith("//"):
+            link = sub_scheme + ":" + link
+        elif link.startswith(".."):
+            new_url = sub_scheme + "://" + parsed_domain.hostname + parsed_domain.path
+            if new_url[-1] != "/":
+                new_url += "/"
+            link = new_url + link
         
-        if total_count_webpage > total_words:
-            total_words = total_count_webpage
-            longest_page = final_url
+        # one spelling per page, so the same page is not queued twice under different urls
+        final_list.append(canonicalize(link))
+    return final_list
 
-        # update token map without stop words
-        wc = compute_word_count(words)
 
-        if(not (30 < len(wc) < 4000)):
-            debug("Word count too low or high")
-            return list()
+def record_page(final_url, analysis):
+    # merges a PageAnalysis into the crawl state, returns the page's outlinks
+    # (or nothing if the page was rejected); the trap detector and the url scoring hear how it went
+    if not 50 < analysis.word_total < 30000:
+        record_outcome(final_url, LOW)
+        return list()
 
-        # Check if duplicate/near-duplicate
-        fingerprint = gen_fingerprint(wc)
-        
-        if check_similarity(fingerprint):
-            debug("Duplicate/near-duplicate detected")
-            return list()
-        
-        append_word_count(wc)
-        fingerprints.add(fingerprint)
-        global_site.add(final_url)
+    state.update_longest(final_url, analysis.word_total)
 
-        
-        parsed_domain =  urlparse(final_url)
-        sub_hostname = parsed_domain.hostname
-        sub_scheme = parsed_domain.scheme
+    if analysis.word_count is None:
+        record_outcome(final_url, LOW)
+        return list()
 
-        if sub_hostname[0:4] == "www.":
-            sub_hostname = sub_hostname[4:]
+    # Check if duplicate/near-duplicate, and keep the fingerprint if not
+    with metrics.timer("stage_seconds", stage="similarity"):
+        unique = state.add_fingerprint(analysis.fingerprint)
+    if not unique:
+        debug("Duplicate/near-duplicate detected")
+        record_outcome(final_url, DUPLICATE)
+        return list()
+    record_outcome(final_url, NEW)
 
-        if re.match(r".+\.ics\.uci\.edu", sub_hostname):
+    parsed_domain =  urlparse(final_url)
+    sub_hostname = parsed_domain.hostname
+    sub_scheme = parsed_domain.scheme
 
-            final_url_domain =  f"{sub_scheme}://{sub_hostname}"
+    if sub_hostname[0:4] == "www.":
+        sub_hostname = sub_hostname[4:]
 
-            if subdomains.get(final_url_domain):
-                subdomains[final_url_domain] += 1
-            else:
-                subdomains[final_url_domain] = 1
+    final_url_domain = None
+    if re.match(r".+\.ics\.uci\.edu", sub_hostname):
 
-        # write results
-        write_results()
+        final_url_domain =  f"{sub_scheme}://{sub_hostname}"
 
-        # retrieve the links from the text and return it
-        links =  string_document.find_all("a") #list(string_document.iterlinks())
- 
-        final_list = list()
-        for link in links:
-            link = link.get("href") #link = link[2]
-            link = urldefrag(link)[0]
-            link = str(link)
-            if link.startswith("/") and not link.startswith("//"):
-                scheme_and_domain = extract__scheme_and_domain(url)
-                link = scheme_and_domain + link
-            elif link.startswith("//"):
-                link = sub_scheme + ":" + link
-            elif link.startswith(".."):
-                new_url = sub_scheme + "://" + parsed_domain.hostname + parsed_domain.path
-                if new_url[-1] != "/":
-                    new_url += "/"
-                link = new_url + link
-            
-            final_list.append(link)
-        return final_list
-    except Exception as e:
-        debug("Hello im here: ")
-        print(e)
-        write_results()
-        return []
+    state.merge_page(analysis.word_count, final_url_domain)
+    state.add_site(final_url)
 
+    if analysis.links is None:
+        return list()
+    return analysis.links
 
-def is_valid(url):
-    global global_site
-    
+
+def is_valid(url, fetch_robots=False):
     # Decide whether to crawl this url or not. 
     # If you decide to crawl it, return True; otherwise return False.
     # There are already some conditions that return False.
+    # The robots.txt of the url's host is only fetched with fetch_robots, by the
+    # frontier holding the host's politeness slot; otherwise a url of a host whose
+    # robots.txt is not known yet passes, and is checked again when it is dequeued.
     try:
         #url = normalize(url) # NameError: name 'normalize' is not defined
 
         # remove the fragment
         url = urldefrag(url)[0]
-       
-
-        # parse string into scheme, domain, path, query, and fragment
-        parsed = urlparse(url)
 
-        # return fals eif not in http or https
-        if parsed.scheme not in set(["http", "https"]) or not parsed.hostname:
-            debug("scheme not in http or https")
+        # scheme, ascii, domain, extension and repeating directory checks, memoized per url,
+        # see utils/url_filter.py
+        reason, hostname = url_filter.check(url)
+        if reason is not None:
+            debug(reason)
             return False
 
-        if parsed.hostname in banned_domains:
+        if hostname in banned_domains:
             debug("hostname in banned domains")
             return False
-        
-        if url_ascii(url) == False:
-            debug("url is not ascii")
-            return False
-        
 
-        if not check_url_for_robots:
-            debug("url is not robots.txt")
-            return False
-        
-        # return false if there is a non text file
-        if re.match(
-            r".*\.(css|js|bmp|gif|jpe?g|ico"
-            + r"|png|tiff?|mid|mp2|mp3|mp4"
-            + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
-            + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
-            + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
-            + r"|epub|dll|cnf|tgz|sha1"
-            + r"|thmx|mso|arff|rtf|jar|csv"
-            + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower()):
-            debug("url is not a text file")
-            return False
-        
-        # check if the url is a valid domain
-        if not re.match(r"(.+\.)?ics\.uci\.edu|(.+\.)?cs\.uci\.edu|(.+\.)?informatics\.uci\.edu|(.+\.)?stat\.uci\.edu", parsed.hostname.lower()):
-            debug("url is not a valid domain")
-            return False
-        
-        # checks if the url has a repeating directory in the path to prevent traps
-        # does not cover pages that may have been revisted before the second occurence of the directory in question
-        if re.match(r"^.*?(/.+?/).*?\1.*$|^.*?/(.+?/)\2.*$", parsed.path.lower()):
-            debug("url has a repeating directory")
+        # checks if the url is already in the global set to prevent traps; pages are
+        # added under their canonical url, a redirect's raw url may be written differently
+        if state.is_visited(canonicalize(url)):
+            debug("url is already in global set")
             return False
 
-        # checks if the url is already in the global set to prevent traps
-        if url in global_site:
-            debug("url is already in global set")
+        # last, since the first url of a host fetches its robots.txt
+        if check_url_for_robots(url, fetch_robots) is False:
+            debug("url is disallowed by robots.txt")
             return False
         
         # return true if nothing fails in the if checks
         return True
 
 
-    except TypeError:
-        print ("TypeError for ", parsed)
+    except (TypeError, ValueError) as e:
+        print ("Could not check ", url, e)
         return False
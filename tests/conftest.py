@@ -0,0 +1,47 @@
+import os
+from configparser import ConfigParser
+
+import pytest
+
+from utils.config import Config
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.ini")
+
+
+class Clock(object):
+    # stands in for the time module of crawler/frontier.py
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def make_config(tmp_path, monkeypatch):
+    # Config of config.ini in a directory of its own (Logs/, save files), nothing fetched
+    monkeypatch.chdir(tmp_path)
+
+    def make(seeds=(), politeness=0, **local):
+        cparser = ConfigParser()
+        cparser.read(CONFIG_FILE)
+        cparser["CRAWLER"]["SEEDURL"] = ",".join(seeds)
+        cparser["CRAWLER"]["POLITENESS"] = str(politeness)
+        cparser["LOCAL PROPERTIES"]["ROBOTS_CACHE"] = ""
+        cparser["LOCAL PROPERTIES"]["LINK_LOG"] = ""
+        cparser["LOCAL PROPERTIES"]["SAVE"] = str(tmp_path / "frontier.shelve")
+        for key, value in local.items():
+            cparser["LOCAL PROPERTIES"][key.upper()] = str(value)
+        return Config(cparser)
+    return make
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    import crawler.frontier
+    clock = Clock()
+    monkeypatch.setattr(crawler.frontier, "time", clock)
+    return clock
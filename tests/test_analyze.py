@@ -0,0 +1,56 @@
+import os
+from multiprocessing import Pool
+
+import analyze
+from utils.content_store import ContentStore, make_raw_response
+from utils.response import Response
+
+WORDS = " ".join(f"topic{chr(97 + i // 26)}{chr(97 + i % 26)}" for i in range(100))
+PAGE = f"<html><body><p>{WORDS}</p><a href='/next'>next</a></body></html>".encode("utf-8")
+
+
+def store_pages(directory, pages):
+    store = ContentStore(str(directory))
+    for url, status, body in pages:
+        resp = Response({"url": url, "status": status})
+        resp.raw_response = make_raw_response(url, status, body, {}, "utf-8")
+        store.put(url, resp)
+    store.close()
+
+
+def test_store_directories(tmp_path):
+    one_page = [("https://www.ics.uci.edu/", 200, PAGE)]
+    store_pages(tmp_path / "plain", one_page)
+    assert analyze.store_directories(str(tmp_path / "plain")) == [str(tmp_path / "plain")]
+    for shard in (10, 2, 0):
+        store_pages(tmp_path / "sharded" / f"shard{shard}", one_page)
+    os.makedirs(tmp_path / "sharded" / "other")
+    assert analyze.store_directories(str(tmp_path / "sharded")) == [
+        str(tmp_path / "sharded" / f"shard{shard}") for shard in (0, 2, 10)]
+
+
+def test_analyze_skips_what_the_crawler_would_not_keep():
+    assert analyze.analyze(None) is None
+    assert analyze.analyze(("https://www.ics.uci.edu/robots.txt", None, 200, b"User-agent: *")) is None
+    assert analyze.analyze(("https://www.example.com/", None, 200, PAGE)) is None
+    assert analyze.analyze(("https://www.ics.uci.edu/gone", None, 404, PAGE)) is None
+    url, final_url, analysis = analyze.analyze(
+        ("https://www.ics.uci.edu/a", "https://WWW.ics.uci.edu/b/#top", 200, PAGE))
+    assert url == "https://WWW.ics.uci.edu/b/#top" and final_url == "https://www.ics.uci.edu/b"
+    assert analysis.word_total == 100 and analysis.links is None
+
+
+def test_stored_pages_map_the_same_in_a_pool(tmp_path):
+    pages = [(f"https://www.ics.uci.edu/p{i}", 200, PAGE) for i in range(5)]
+    pages.append(("https://www.ics.uci.edu/robots.txt", 200, b"User-agent: *"))
+    store_pages(tmp_path, pages)
+    entries = list(analyze.stored_pages(analyze.store_directories(str(tmp_path))))
+    assert len(entries) == 6
+    local = list(map(analyze.analyze_stored, entries))
+    with Pool(2, initializer=analyze.init_process, initargs=((), "stream")) as pool:
+        remote = list(pool.imap(analyze.analyze_stored, entries, 2))
+    assert [result[0] if result else None for result in local] == [url for url, _, _ in pages[:5]] + [None]
+    assert remote == local
+    for store in analyze.stores.values():
+        store.close()
+    analyze.stores.clear()
@@ -0,0 +1,76 @@
+from threading import Lock
+
+import pytest
+
+import scraper
+from crawler import async_worker
+from crawler.async_worker import AsyncWorker
+from utils.response import Response
+
+
+class FakeFrontier(object):
+    # hands out urls after a short wait, like a host coming out of its politeness delay
+    def __init__(self, urls):
+        self.urls = list(urls)
+        self.lock = Lock()
+        self.waited = False
+        self.completed = list()
+        self.added = list()
+
+    def poll_tbd_url(self):
+        with self.lock:
+            if not self.waited:
+                self.waited = True
+                return None, 0.01
+            if self.urls:
+                return self.urls.pop(0), 0
+            return None, None
+
+    def add_url(self, url):
+        with self.lock:
+            self.added.append(url)
+
+    def mark_url_complete(self, url):
+        with self.lock:
+            self.completed.append(url)
+
+
+class FakeClient(object):
+    def __init__(self, config, logger):
+        pass
+
+    async def download(self, url):
+        if url.endswith("/broken"):
+            raise ValueError("cannot download")
+        return Response({"url": url, "status": 200})
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def config(make_config, monkeypatch):
+    monkeypatch.setattr(async_worker, "CacheClient", FakeClient)
+    monkeypatch.setattr(scraper, "record_fetch", lambda url, status, seconds: None)
+    monkeypatch.setattr(scraper, "scraper", lambda url, resp: [url + "/next"])
+    config = make_config()
+    config.cache_server = ("cache", 9000)
+    config.async_tasks = 3
+    config.async_scrapers = 2
+    return config
+
+
+def test_every_url_is_crawled_and_completed(config):
+    urls = [f"https://www.ics.uci.edu/{i}" for i in range(10)]
+    frontier = FakeFrontier(urls)
+    AsyncWorker(0, config, frontier).run()
+    assert sorted(frontier.completed) == sorted(urls)
+    assert sorted(frontier.added) == sorted(url + "/next" for url in urls)
+
+
+def test_a_failed_page_does_not_stop_the_loop(config):
+    urls = ["https://www.ics.uci.edu/broken", "https://www.ics.uci.edu/a", "https://www.ics.uci.edu/b"]
+    frontier = FakeFrontier(urls)
+    AsyncWorker(0, config, frontier).run()
+    assert sorted(frontier.completed) == sorted(urls)
+    assert sorted(frontier.added) == ["https://www.ics.uci.edu/a/next", "https://www.ics.uci.edu/b/next"]
@@ -0,0 +1,61 @@
+import pytest
+
+from utils import get_urlhash
+from utils.canonical import canonicalize, key_form, remove_dot_segments, set_strip_params, STRIP_PARAMS
+
+
+@pytest.mark.parametrize("url, canonical", [
+    ("HTTP://WWW.ics.uci.edu:80/a/./b/../c/?utm_source=x&b=2&a=1#top",
+     "http://www.ics.uci.edu/a/c/?a=1&b=2"),
+    ("https://www.ics.uci.edu:443/", "https://www.ics.uci.edu"),
+    ("https://www.ics.uci.edu:8443/a/", "https://www.ics.uci.edu:8443/a"),
+    ("https://www.ics.uci.edu./%7euser/%2f", "https://www.ics.uci.edu/~user/%2F"),
+    ("https://www.ics.uci.edu/a;jsessionid=123;v=2", "https://www.ics.uci.edu/a;v=2"),
+    ("https://www.ics.uci.edu/a?fbclid=1&PHPSESSID=2", "https://www.ics.uci.edu/a"),
+    ("  https://www.ics.uci.edu/a/b/../../..  ", "https://www.ics.uci.edu"),
+    ("https://www.ics.uci.edu:bad/", "https://www.ics.uci.edu:bad/"),
+])
+def test_canonicalize(url, canonical):
+    assert canonicalize(url) == canonical
+
+
+def test_repeated_parameters_keep_their_order():
+    assert canonicalize("https://ics.uci.edu/s?z=1&a=2&a=1&b=0") == "https://ics.uci.edu/s?a=2&a=1&b=0&z=1"
+    assert canonicalize("https://ics.uci.edu/s?a=1&a=2") != canonicalize("https://ics.uci.edu/s?a=2&a=1")
+
+
+def test_trailing_slash_is_kept_before_a_query():
+    assert canonicalize("https://ics.uci.edu/a/?x=1") == "https://ics.uci.edu/a/?x=1"
+    assert canonicalize("https://ics.uci.edu/a?x=1") == "https://ics.uci.edu/a?x=1"
+    assert canonicalize("https://ics.uci.edu/a/?utm_source=x") == "https://ics.uci.edu/a"
+
+
+def test_canonicalize_is_idempotent():
+    for url in ("HTTP://WWW.ics.uci.edu:80/a/./b/../c/?utm_source=x&b=2&a=1#top",
+                "https://ics.uci.edu/a/?x=1", "https://ics.uci.edu/%7Ea/b/./"):
+        assert canonicalize(canonicalize(url)) == canonicalize(url)
+
+
+def test_remove_dot_segments():
+    assert remove_dot_segments("/a/b/c/./../../g") == "/a/g"
+    assert remove_dot_segments("/a/b/..") == "/a/"
+    assert remove_dot_segments("/../a") == "/a"
+
+
+def test_key_form_ignores_scheme_www_and_index_pages():
+    same = ["https://www.ics.uci.edu/dept", "http://ics.uci.edu/dept",
+            "https://ics.uci.edu/dept/index.php", "http://www.ics.uci.edu/dept/index.html"]
+    assert len({key_form(url) for url in same}) == 1
+    assert len({get_urlhash(url) for url in same}) == 1
+    assert key_form("https://ics.uci.edu/dept/main.php") != key_form("https://ics.uci.edu/dept")
+    assert key_form("https://wwwx.ics.uci.edu/") != key_form("https://x.ics.uci.edu/")
+
+
+def test_set_strip_params():
+    try:
+        set_strip_params(["ref", "trk_*"])
+        assert canonicalize("https://ics.uci.edu/a?ref=1&trk_id=2&utm_source=3") == \
+            "https://ics.uci.edu/a?utm_source=3"
+    finally:
+        set_strip_params(STRIP_PARAMS)
+    assert canonicalize("https://ics.uci.edu/a?ref=1&utm_source=3") == "https://ics.uci.edu/a?ref=1"
@@ -0,0 +1,94 @@
+import os
+
+from utils.content_store import ContentStore, make_raw_response
+from utils.response import Response
+
+
+def response(url, body, status=200):
+    resp = Response({"url": url, "status": status})
+    resp.raw_response = make_raw_response(
+        url + "/", status, body, {"Content-Type": "text/html"}, "utf-8")
+    return resp
+
+
+def record(directory, count, **kw):
+    store = ContentStore(str(directory), **kw)
+    for i in range(count):
+        store.put(f"https://www.ics.uci.edu/page{i}", response(f"https://www.ics.uci.edu/page{i}", b"x" * i))
+    return store
+
+
+def test_put_then_get_after_reopening(tmp_path):
+    record(tmp_path, 20).close()
+    store = ContentStore(str(tmp_path))
+    assert len(store) == 20
+    resp = store.get("https://www.ics.uci.edu/page7")
+    assert resp.status == 200 and resp.url == "https://www.ics.uci.edu/page7"
+    assert resp.raw_response.url == "https://www.ics.uci.edu/page7/"
+    assert resp.raw_response.content == b"x" * 7
+    assert resp.raw_response.headers["Content-Type"] == "text/html"
+    assert store.get("https://www.ics.uci.edu/page20") is None
+    assert [resp.url for resp in store] == [f"https://www.ics.uci.edu/page{i}" for i in range(20)]
+    store.close()
+
+
+def test_errors_without_a_response(tmp_path):
+    store = ContentStore(str(tmp_path))
+    store.put("https://www.ics.uci.edu/gone", Response({"url": "https://www.ics.uci.edu/gone", "status": 604,
+                                                        "error": "timed out"}))
+    store.close()
+    resp = ContentStore(str(tmp_path)).get("https://www.ics.uci.edu/gone")
+    assert resp.status == 604 and resp.error == "timed out" and resp.raw_response is None
+
+
+def test_last_response_of_a_url_wins(tmp_path):
+    store = ContentStore(str(tmp_path))
+    url = "https://www.ics.uci.edu/a"
+    store.put(url, response(url, b"old"))
+    store.put(url, response(url, b"new"))
+    store.close()
+    store = ContentStore(str(tmp_path))
+    assert len(store) == 1 and store.get(url).raw_response.content == b"new"
+    assert [resp.raw_response.content for resp in store] == [b"old", b"new"]
+    store.close()
+
+
+def test_segments_roll_over(tmp_path):
+    record(tmp_path, 30, segment_bytes=200).close()
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("segment-")]) > 1
+    store = ContentStore(str(tmp_path))
+    assert all(store.get(f"https://www.ics.uci.edu/page{i}").raw_response.content == b"x" * i for i in range(30))
+    store.close()
+
+
+def test_index_is_rebuilt_after_a_crash(tmp_path):
+    store = record(tmp_path, 10)
+    # a crash: nothing closed, the index never written, the last record cut short
+    store.segment.flush()
+    store.index_log.flush()
+    segment = store.segment.name
+    os.truncate(segment, os.path.getsize(segment) - 3)
+    with open(tmp_path / "index.log", "ab") as log:
+        log.write(b"\0" * 5)
+    reopened = ContentStore(str(tmp_path))
+    assert len(reopened) == 9
+    assert reopened.get("https://www.ics.uci.edu/page9") is None
+    assert reopened.get("https://www.ics.uci.edu/page8").raw_response.content == b"x" * 8
+    reopened.close()
+    store.segment.close()
+    store.index_log.close()
+
+
+def test_reads_without_pread(tmp_path, monkeypatch):
+    record(tmp_path, 10).close()
+    monkeypatch.delattr(os, "pread")
+    store = ContentStore(str(tmp_path))
+    assert [resp.raw_response.content for resp in store] == [b"x" * i for i in range(10)]
+    assert store.get("https://www.ics.uci.edu/page3").raw_response.content == b"xxx"
+    store.close()
+
+
+def test_empty_store(tmp_path):
+    store = ContentStore(str(tmp_path))
+    assert len(store) == 0 and store.get("https://www.ics.uci.edu/") is None
+    store.close()
@@ -0,0 +1,65 @@
+from threading import Thread
+
+from utils.crawl_state import CrawlState
+
+
+def test_claim_links_hands_each_link_out_once():
+    state = CrawlState()
+    assert state.claim_links(["https://www.ics.uci.edu/a", "https://www.ics.uci.edu/b"]) == [
+        "https://www.ics.uci.edu/a", "https://www.ics.uci.edu/b"]
+    # the same page with www. or an index page is the same link
+    assert state.claim_links(["https://ics.uci.edu/a/index.php", "https://www.ics.uci.edu/c"]) == [
+        "https://www.ics.uci.edu/c"]
+
+
+def test_visited_pages_are_not_claimed():
+    state = CrawlState()
+    state.add_site("https://www.ics.uci.edu/a")
+    state.add_site("https://www.ics.uci.edu/a")
+    assert state.unique_pages == 1
+    assert state.is_visited("https://www.ics.uci.edu/a")
+    assert state.claim_links(["https://www.ics.uci.edu/a"]) == []
+
+
+def test_claims_race_to_one_winner():
+    state = CrawlState(num_shards=4)
+    links = [f"https://www.ics.uci.edu/{i}" for i in range(2000)]
+    claimed = list()
+    threads = [Thread(target=lambda: claimed.extend(state.claim_links(links))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(links)
+
+
+def test_near_duplicate_fingerprints_are_turned_away():
+    state = CrawlState()
+    assert state.add_fingerprint(1 << 100)
+    assert not state.add_fingerprint(1 << 100 | 1)
+    assert state.add_fingerprint((1 << 40) - 1)
+
+
+def test_report_and_dirty():
+    state = CrawlState()
+    state.merge_page({"crawler": 3, "page": 1}, "http://vision.ics.uci.edu")
+    state.update_longest("https://www.ics.uci.edu/a", 120)
+    state.add_site("https://www.ics.uci.edu/a")
+    assert state.dirty
+    report = state.report()
+    assert not state.dirty
+    assert "Unique page count: 1" in report
+    assert "Longest page with 120 words is https://www.ics.uci.edu/a" in report
+    assert report.index("('crawler', 3)") < report.index("('page', 1)")
+    assert "http://vision.ics.uci.edu: 1" in report
+
+
+def test_merge_counts_shared_pages_once():
+    one, two = CrawlState(), CrawlState()
+    one.add_site("https://www.ics.uci.edu/a")
+    two.add_site("https://www.ics.uci.edu/a")
+    two.add_site("https://www.ics.uci.edu/b")
+    two.merge_page({"word": 2}, "http://vision.ics.uci.edu")
+    one.merge(two.summary())
+    assert one.unique_pages == 2
+    assert one.subdomains == {"http://vision.ics.uci.edu": 1}
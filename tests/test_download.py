@@ -0,0 +1,78 @@
+import cbor
+import pytest
+import requests
+
+from utils import download
+
+
+class FakeResponse(object):
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+class FakeSession(object):
+    # raises the given errors in turn, then answers with response
+    def __init__(self, errors, response):
+        self.errors = list(errors)
+        self.response = response
+        self.calls = list()
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params, timeout))
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.response
+
+
+@pytest.fixture
+def config(make_config):
+    config = make_config()
+    config.cache_server = ("cache", 9000)
+    config.retries = 2
+    config.retry_backoff = 0.5
+    return config
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = list()
+    monkeypatch.setattr(download.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def use_session(monkeypatch, session):
+    monkeypatch.setattr(download, "session", session)
+
+
+ANSWER = cbor.dumps({"url": "https://www.ics.uci.edu/", "status": 200, "response": None})
+
+
+def test_retries_with_backoff_then_answers(config, sleeps, monkeypatch):
+    session = FakeSession(
+        [requests.exceptions.ConnectionError("refused"), requests.exceptions.Timeout("slow")],
+        FakeResponse(ANSWER))
+    use_session(monkeypatch, session)
+    resp = download.fetch("https://www.ics.uci.edu/", config)
+    assert resp.status == 200
+    assert sleeps == [0.5, 1.0]
+    url, params, timeout = session.calls[0]
+    assert url == "http://cache:9000/"
+    assert params == [("q", "https://www.ics.uci.edu/"), ("u", config.user_agent)]
+    assert timeout == (config.connect_timeout, config.read_timeout)
+
+
+def test_gives_up_with_the_unreachable_status(config, sleeps, monkeypatch):
+    errors = [requests.exceptions.ConnectionError("refused")] * 3
+    session = FakeSession(errors, FakeResponse(ANSWER))
+    use_session(monkeypatch, session)
+    resp = download.fetch("https://www.ics.uci.edu/", config)
+    assert resp.status == download.UNREACHABLE_STATUS
+    assert len(session.calls) == 3 and sleeps == [0.5, 1.0]
+
+
+def test_undecodable_answer_keeps_the_http_status(config, sleeps, monkeypatch):
+    use_session(monkeypatch, FakeSession([], FakeResponse(b"", status_code=502)))
+    resp = download.fetch("https://www.ics.uci.edu/", config)
+    assert resp.status == 502 and resp.error
+    assert sleeps == []
@@ -0,0 +1,126 @@
+import pytest
+
+import scraper
+from crawler.frontier import Frontier
+from utils.robots import RobotsCache
+
+
+def drain(frontier):
+    # every url get_tbd_url hands out, completing each right away
+    urls = list()
+    while True:
+        url = frontier.get_tbd_url()
+        if url is None:
+            return urls
+        urls.append(url)
+        frontier.mark_url_complete(url)
+
+
+def test_urls_of_a_host_come_in_the_order_they_were_found(make_config, clock):
+    frontier = Frontier(make_config(["https://www.ics.uci.edu/a"]), True)
+    frontier.add_url("https://www.ics.uci.edu/b")
+    frontier.add_url("https://www.ics.uci.edu/c")
+    assert drain(frontier) == [
+        "https://www.ics.uci.edu/a", "https://www.ics.uci.edu/b", "https://www.ics.uci.edu/c"]
+    frontier.close()
+
+
+def test_a_url_is_only_queued_once(make_config, clock):
+    frontier = Frontier(make_config(["https://www.ics.uci.edu/a"]), True)
+    frontier.add_url("https://www.ics.uci.edu/a")
+    assert drain(frontier) == ["https://www.ics.uci.edu/a"]
+    frontier.add_url("https://www.ics.uci.edu/a")
+    assert frontier.get_tbd_url() is None
+    frontier.close()
+
+
+def test_a_host_waits_for_its_delay(make_config, clock):
+    frontier = Frontier(make_config(["https://www.ics.uci.edu/a"], politeness=0.5), True)
+    frontier.add_url("https://www.ics.uci.edu/b")
+    url, wait = frontier.poll_tbd_url()
+    assert url == "https://www.ics.uci.edu/a"
+    # held while in flight: nothing else of the host is handed out
+    assert frontier.poll_tbd_url()[0] is None
+    frontier.mark_url_complete(url)
+    url, wait = frontier.poll_tbd_url()
+    assert url is None and wait == 0.5
+    clock.now += 0.5
+    assert frontier.poll_tbd_url() == ("https://www.ics.uci.edu/b", 0)
+    frontier.close()
+
+
+def test_hosts_take_turns(make_config, clock):
+    frontier = Frontier(make_config(
+        ["https://www.ics.uci.edu/a", "https://www.cs.uci.edu/a"], politeness=1), True)
+    frontier.add_url("https://www.ics.uci.edu/b")
+    frontier.add_url("https://www.cs.uci.edu/b")
+    first = frontier.get_tbd_url()
+    second = frontier.get_tbd_url()
+    # both hosts are ready, one url of each before either is hit again
+    assert {first, second} == {"https://www.ics.uci.edu/a", "https://www.cs.uci.edu/a"}
+    frontier.mark_url_complete(first)
+    clock.now += 0.5
+    frontier.mark_url_complete(second)
+    clock.now += 0.5
+    # the host released first is ready first
+    assert frontier.poll_tbd_url()[0] == first.replace("/a", "/b")
+    frontier.close()
+
+
+def test_resume_queues_what_was_not_completed(make_config, clock):
+    config = make_config(["https://www.ics.uci.edu/a"])
+    frontier = Frontier(config, True)
+    frontier.add_url("https://www.ics.uci.edu/b")
+    frontier.mark_url_complete(frontier.get_tbd_url())
+    frontier.close()
+    frontier = Frontier(config, False)
+    assert drain(frontier) == ["https://www.ics.uci.edu/b"]
+    frontier.close()
+
+
+@pytest.fixture
+def robots(monkeypatch):
+    # robots.txt answers for the frontier to fetch, by host
+    answers = dict()
+    fetched = list()
+
+    def fetch(url):
+        fetched.append(url)
+        answer = answers[url.split("/")[2]]
+        if isinstance(answer, Exception):
+            raise answer
+        return 200, answer
+    monkeypatch.setattr(scraper, "robots", RobotsCache(fetch))
+    return answers, fetched
+
+
+def test_robots_txt_is_fetched_in_the_hosts_slot(make_config, clock, robots):
+    answers, fetched = robots
+    answers["www.ics.uci.edu"] = "User-agent: *\nDisallow: /private\n"
+    frontier = Frontier(make_config(["https://www.ics.uci.edu/a", "https://www.ics.uci.edu/private/x"]), True)
+    assert drain(frontier) == ["https://www.ics.uci.edu/a"]
+    assert fetched == ["https://www.ics.uci.edu/robots.txt"]
+    frontier.close()
+
+
+def test_urls_found_before_the_robots_txt_are_checked_on_dequeue(make_config, clock, robots):
+    answers, _ = robots
+    answers["www.ics.uci.edu"] = "User-agent: *\nDisallow: /private\n"
+    frontier = Frontier(make_config(["https://www.ics.uci.edu/a"]), True)
+    # let through by the scraper while the robots.txt was unknown, known by the time it is queued
+    assert scraper.is_valid("https://www.ics.uci.edu/private/x")
+    scraper.check_url_for_robots("https://www.ics.uci.edu/a")
+    frontier.add_url("https://www.ics.uci.edu/private/x")
+    assert drain(frontier) == ["https://www.ics.uci.edu/a"]
+    frontier.close()
+
+
+def test_a_failed_robots_txt_fetch_gives_the_host_back(make_config, clock, robots):
+    answers, fetched = robots
+    answers["www.ics.uci.edu"] = RuntimeError("no robots.txt today")
+    frontier = Frontier(make_config(["https://www.ics.uci.edu/a"]), True)
+    # the failure is kept like an error answer, everything is allowed for a while
+    assert drain(frontier) == ["https://www.ics.uci.edu/a"]
+    assert fetched == ["https://www.ics.uci.edu/robots.txt"]
+    assert not frontier.in_flight_hosts
+    frontier.close()
@@ -0,0 +1,98 @@
+import os
+
+from utils import get_urlhash
+from utils.url_seen import url_key
+from crawler import frontier_log
+from crawler.frontier_log import FrontierLog
+
+A = "https://www.ics.uci.edu/a"
+B = "https://www.ics.uci.edu/b"
+C = "https://www.cs.uci.edu/c"
+
+
+def write(log, url, completed=False):
+    log[get_urlhash(url)] = (url, completed)
+
+
+def open_log(path, **kwargs):
+    # no compaction unless asked for, so the records stay in the log
+    kwargs.setdefault("compact_records", 1 << 30)
+    return FrontierLog(str(path), flush_interval=60, **kwargs)
+
+
+def test_replays_the_log(tmp_path):
+    log = open_log(tmp_path / "save")
+    for url in (A, B, C):
+        write(log, url)
+    write(log, A, True)
+    log.sync()
+    log.closed.set()
+    # reopened without close, like after a crash: only the log is there
+    assert not os.path.exists(frontier_log.snapshot_path(str(tmp_path / "save")))
+    log = open_log(tmp_path / "save")
+    assert get_urlhash(A) in log and get_urlhash(B) in log
+    assert log.is_completed(url_key(A)) and not log.is_completed(url_key(B))
+    assert log.pending_by_host() == {"ics.uci.edu": [B], "cs.uci.edu": [C]}
+    log.close()
+
+
+def test_drops_a_torn_tail(tmp_path):
+    log = open_log(tmp_path / "save")
+    write(log, A)
+    write(log, B)
+    log.sync()
+    log.closed.set()
+    path = frontier_log.log_path(str(tmp_path / "save"))
+    size = os.path.getsize(path)
+    with open(path, "ab") as torn:
+        torn.write(b"\x20\x00\x00\x00\x01")
+    log = open_log(tmp_path / "save")
+    assert os.path.getsize(path) == size
+    assert log.pending_by_host() == {"ics.uci.edu": [A, B]}
+    log.close()
+
+
+def test_stops_at_a_corrupt_record(tmp_path):
+    log = open_log(tmp_path / "save")
+    write(log, A)
+    write(log, B)
+    log.sync()
+    log.closed.set()
+    path = frontier_log.log_path(str(tmp_path / "save"))
+    with open(path, "r+b") as log_file:
+        data = log_file.read()
+        # flip the last byte of the second record's url
+        log_file.seek(len(data) - 1)
+        log_file.write(bytes([data[-1] ^ 0xff]))
+    log = open_log(tmp_path / "save")
+    assert log.pending_by_host() == {"ics.uci.edu": [A]}
+    log.close()
+
+
+def test_group_commit_waits_for_flush_records(tmp_path):
+    log = open_log(tmp_path / "save", flush_records=3)
+    path = frontier_log.log_path(str(tmp_path / "save"))
+    write(log, A)
+    write(log, B)
+    assert os.path.getsize(path) == 0
+    write(log, C)
+    assert os.path.getsize(path) > 0
+    log.close()
+
+
+def test_compacts_into_a_host_grouped_snapshot(tmp_path):
+    log = open_log(tmp_path / "save", flush_records=1, compact_records=4)
+    for url in (A, B, C):
+        write(log, url)
+    write(log, A, True)
+    # the fourth record folded the log into the snapshot
+    assert os.path.getsize(frontier_log.log_path(str(tmp_path / "save"))) == 0
+    assert list(log.completed_base) == [url_key(A)]
+    write(log, B, True)
+    log.close()
+    log = open_log(tmp_path / "save")
+    assert len(log) == 3
+    assert log.is_completed(url_key(A)) and log.is_completed(url_key(B))
+    assert log.pending_by_host() == {"cs.uci.edu": [C]}
+    log.close()
+
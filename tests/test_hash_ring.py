@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from crawler.shards import shard_path
+from utils.hash_ring import HashRing
+
+HOSTS = [f"host{i}.ics.uci.edu" for i in range(2000)]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_owners_spread_evenly():
+    ring = HashRing(4)
+    owners = Counter(ring.owner(host) for host in HOSTS)
+    assert set(owners) == {0, 1, 2, 3}
+    assert min(owners.values()) > len(HOSTS) / 4 * 0.6
+
+
+def test_same_owner_in_every_process():
+    code = ("from utils.hash_ring import HashRing; ring = HashRing(4); "
+            f"print([ring.owner(f'host{{i}}.ics.uci.edu') for i in range(50)])")
+    env = dict(os.environ, PYTHONHASHSEED="123")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    ring = HashRing(4)
+    assert out.strip() == str([ring.owner(host) for host in HOSTS[:50]])
+
+
+def test_adding_a_process_moves_few_hosts():
+    before = HashRing(4)
+    after = HashRing(5)
+    moved = [host for host in HOSTS if before.owner(host) != after.owner(host)]
+    # the hosts that move all go to the new process
+    assert all(after.owner(host) == 4 for host in moved)
+    assert len(moved) < len(HOSTS) * 0.35
+
+
+def test_shard_path():
+    assert shard_path("frontier.shelve", 2) == "frontier.shard2.shelve"
+    assert shard_path("Logs/valid.txt", 0) == "Logs/valid.shard0.txt"
+    assert shard_path("", 1) == ""
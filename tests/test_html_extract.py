@@ -0,0 +1,26 @@
+import pytest
+
+from utils.html_extract import BACKENDS, extract
+
+PAGES = [
+    b"<html><head><title>Title</title><style>p { color: red }</style></head>"
+    b"<body><p>Hello <b>bold</b> world</p><script>var x = '<a href=\"/no\">';</script>"
+    b"<!-- a comment --><a href=\"/one\">one</a><a name=\"anchor\">no href</a>"
+    b"<template><p>hidden</p></template><a href=\"two#frag\">two</a></body></html>",
+    b"<!DOCTYPE html><p>caf\xc3\xa9 &amp; cr&egrave;me<br>next line</p><a HREF='/UPPER'>x</a>",
+    b"<p>unclosed <a href=/bare>bare<div>tail",
+    b"",
+]
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_backends_agree_with_beautifulsoup(page):
+    expected = extract(page, "bs4")
+    for backend in BACKENDS:
+        assert extract(page, backend) == expected, backend
+
+
+def test_text_and_hrefs():
+    text, hrefs = extract(PAGES[0], "stream")
+    assert text == "TitleHello bold worldoneno hreftwo"
+    assert hrefs == ["/one", None, "two#frag"]
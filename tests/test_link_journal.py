@@ -0,0 +1,52 @@
+from utils.link_journal import LinkJournal
+
+
+def open_journal(path, **kw):
+    # the background flush never fires during a test, flush() and close() do the writing
+    kw.setdefault("flush_interval", 60)
+    return LinkJournal(str(path), **kw)
+
+
+def test_text_lines(tmp_path):
+    journal = open_journal(tmp_path / "valid.txt")
+    journal.record("https://www.ics.uci.edu/a", True)
+    journal.record("https://www.ics.uci.edu/b", False)
+    assert not (tmp_path / "valid.txt").exists()
+    journal.close()
+    assert (tmp_path / "valid.txt").read_text() == (
+        "https://www.ics.uci.edu/a is True\nhttps://www.ics.uci.edu/b is False\n")
+
+
+def test_csv_rows(tmp_path):
+    journal = open_journal(tmp_path / "valid.csv", fmt="csv")
+    journal.record("https://www.ics.uci.edu/a,b", True)
+    journal.close()
+    assert (tmp_path / "valid.csv").read_text() == '"https://www.ics.uci.edu/a,b",1\n'
+
+
+def test_full_buffer_flushes(tmp_path):
+    journal = open_journal(tmp_path / "valid.txt", flush_lines=2)
+    journal.record("a", True)
+    journal.record("b", True)
+    assert (tmp_path / "valid.txt").read_text() == "a is True\nb is True\n"
+    journal.close()
+
+
+def test_rotation_keeps_backups(tmp_path):
+    path = tmp_path / "valid.txt"
+    journal = open_journal(path, max_bytes=20, backups=2)
+    for link in ("first", "second", "third", "fourth"):
+        journal.record(link, True)
+        journal.flush()
+    journal.close()
+    assert path.read_text() == "fourth is True\n"
+    assert (tmp_path / "valid.txt.1").read_text() == "third is True\n"
+    assert (tmp_path / "valid.txt.2").read_text() == "second is True\n"
+    assert not (tmp_path / "valid.txt.3").exists()
+
+
+def test_disabled_journal_writes_nothing(tmp_path):
+    journal = open_journal(tmp_path / "valid.txt", sample=0)
+    journal.record("a", True)
+    journal.close()
+    assert not (tmp_path / "valid.txt").exists()
@@ -0,0 +1,90 @@
+import time
+from threading import Condition, Thread
+
+from utils import metrics
+from utils.metrics import Histogram, Metrics, TimedLock
+
+
+def test_counters_and_labels():
+    registry = Metrics()
+    registry.inc("pages_total")
+    registry.inc("pages_total", 2)
+    registry.inc("errors_total", worker="w1", kind="x")
+    registry.inc("errors_total", kind="x", worker="w1")
+    registry.inc("errors_total", worker="w2")
+    assert registry.counters[("pages_total", ())] == 3
+    assert registry.counters[("errors_total", (("kind", "x"), ("worker", "w1")))] == 2
+    assert registry.counter_total("errors_total") == 3
+
+
+def test_histogram_quantiles():
+    registry = Metrics()
+    for seconds in [0.003] * 90 + [0.2] * 9 + [60.0]:
+        registry.observe("stage_seconds", seconds, stage="parse")
+    histogram = registry.histograms[("stage_seconds", (("stage", "parse"),))]
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.9) == 0.005
+    assert histogram.quantile(0.95) == 0.25
+    assert histogram.quantile(1.0) == float("inf")
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_prometheus_text():
+    registry = Metrics()
+    registry.inc("pages_total", 4)
+    registry.gauge("queued_urls", lambda: 7)
+    registry.gauge("host_delay_seconds", lambda: {(("host", "a"),): 1.5})
+    registry.gauge("broken", lambda: 1 / 0)
+    registry.observe("stage_seconds", 0.002, stage="download")
+    lines = registry.prometheus().splitlines()
+    assert "# TYPE crawler_pages_total counter" in lines
+    assert "crawler_pages_total 4" in lines
+    assert "crawler_queued_urls 7" in lines
+    assert 'crawler_host_delay_seconds{host="a"} 1.5' in lines
+    assert not any("broken" in line for line in lines)
+    assert 'crawler_stage_seconds_bucket{stage="download",le="0.001"} 0' in lines
+    assert 'crawler_stage_seconds_bucket{stage="download",le="0.0025"} 1' in lines
+    assert 'crawler_stage_seconds_bucket{stage="download",le="+Inf"} 1' in lines
+    assert 'crawler_stage_seconds_count{stage="download"} 1' in lines
+
+
+def test_snapshot():
+    registry = Metrics()
+    registry.inc("pages_total")
+    with registry.timer("stage_seconds", stage="parse"):
+        pass
+    snapshot = registry.snapshot()
+    assert snapshot["counters"] == {"pages_total": 1}
+    assert snapshot["histograms"]['stage_seconds{stage="parse"}']["count"] == 1
+
+
+def test_timed_lock_records_contended_waits():
+    key = ("lock_wait_seconds", (("lock", "test-lock"),))
+    metrics.registry.histograms.pop(key, None)
+    lock = TimedLock("test-lock")
+    with lock:
+        pass
+    assert key not in metrics.registry.histograms
+    lock.acquire()
+    waiter = Thread(target=lambda: (lock.acquire(), lock.release()))
+    waiter.start()
+    time.sleep(0.05)
+    lock.release()
+    waiter.join()
+    assert metrics.registry.histograms[key].count == 1
+
+
+def test_reentrant_timed_lock_works_with_a_condition():
+    lock = TimedLock("test-rlock", reentrant=True)
+    condition = Condition(lock)
+    ready = list()
+
+    def notify():
+        with condition:
+            ready.append(True)
+            condition.notify()
+    with lock:
+        with condition:
+            Thread(target=notify).start()
+            assert condition.wait_for(lambda: ready, timeout=5)
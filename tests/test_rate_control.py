@@ -0,0 +1,70 @@
+import pytest
+
+from utils.rate_control import RateControl
+
+URL = "https://www.ics.uci.edu/a"
+# hosts are named as hostname_ify names them, without www.
+HOST = "ics.uci.edu"
+
+
+def test_off_by_default():
+    rates = RateControl(floor=0.5)
+    assert not rates.enabled
+    for _ in range(20):
+        rates.fetched(URL, 500, 1.0)
+    assert rates.delay(HOST) == 0.5 and not rates.dropped(HOST)
+
+
+def test_errors_back_off_and_good_fetches_recover():
+    rates = RateControl(floor=0.5, max_delay=3, backoff=2, recover=0.25)
+    assert rates.delay(HOST) == 0.5
+    rates.fetched(URL, 503, 0.1)
+    assert rates.delay(HOST) == 1.0
+    rates.fetched(URL, 429, 0.1)
+    assert rates.delay(HOST) == 2.0
+    rates.fetched(URL, 604, 0.1)
+    assert rates.delay(HOST) == 3.0 # capped at max_delay
+    rates.fetched(URL, 200, 0.1)
+    assert rates.delay(HOST) == 2.75
+    for _ in range(20):
+        rates.fetched(URL, 404, 0.1)
+    assert rates.delay(HOST) == 0.5
+    # other hosts are not affected
+    assert rates.delay("cs.uci.edu") == 0.5
+
+
+def test_from_a_floor_of_zero():
+    rates = RateControl(floor=0, max_delay=10, recover=0.25)
+    rates.fetched(URL, 500, 0.1)
+    assert rates.delay(HOST) == 0.5
+
+
+def test_slow_fetches_back_off_without_counting_as_errors():
+    rates = RateControl(floor=0.5, max_delay=30, slow_factor=4, give_up=2)
+    for _ in range(5):
+        rates.fetched(URL, 200, 0.5)
+    rates.fetched(URL, 200, 3.0)
+    assert rates.delay(HOST) == 1.0
+    # quicker than SLOW_MIN_SECONDS is never slow
+    rates.fetched(URL, 200, 0.9)
+    assert rates.delay(HOST) == 0.75
+    assert not rates.dropped(HOST)
+
+
+def test_cache_server_failures_are_left_out():
+    rates = RateControl(floor=0.5, max_delay=30, give_up=1)
+    rates.fetched(URL, 607, 30.0)
+    rates.fetched(URL, 608, 0.0)
+    assert rates.delay(HOST) == 0.5 and not rates.dropped(HOST)
+
+
+@pytest.mark.parametrize("statuses, dropped", [
+    ([500, 500, 500], True),
+    ([500, 500, 200, 500], False),
+    ([500, 404, 500, 500, 500], True),
+])
+def test_a_host_of_errors_is_dropped(statuses, dropped):
+    rates = RateControl(floor=0.5, max_delay=30, give_up=3)
+    for status in statuses:
+        rates.fetched(URL, status, 0.1)
+    assert rates.dropped(HOST) == dropped
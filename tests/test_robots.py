@@ -0,0 +1,98 @@
+from utils.robots import RobotsCache, parse, rules_for
+
+ROBOTS = """
+# comments and unknown lines are skipped
+Sitemap: https://www.ics.uci.edu/sitemap.xml
+
+User-agent: other
+Disallow: /
+
+User-agent: *
+Disallow: /private/
+Allow: /private/public
+Disallow: /*.pdf$
+Disallow: /search?
+Crawl-delay: 2
+
+User-agent: IR UW22 12345678
+Disallow: /bots-only
+Crawl-delay: 5
+"""
+
+
+def test_longest_match_wins():
+    rules = parse(ROBOTS, "*")
+    assert rules.can_fetch("/")
+    assert not rules.can_fetch("/private/notes")
+    assert rules.can_fetch("/private/public/notes")
+    assert not rules.can_fetch("/papers/a.pdf")
+    assert rules.can_fetch("/papers/a.pdf.html")
+    assert not rules.can_fetch("/search?q=x")
+    assert rules.can_fetch("/search")
+    assert rules.crawl_delay == 2
+
+
+def test_allow_wins_ties():
+    rules = parse("User-agent: *\nDisallow: /page\nAllow: /page\n", "*")
+    assert rules.can_fetch("/page")
+
+
+def test_named_group_replaces_the_star_group():
+    rules = parse(ROBOTS, "IR UW22 12345678")
+    assert not rules.can_fetch("/bots-only")
+    assert rules.can_fetch("/private/notes")
+    assert rules.crawl_delay == 5
+
+
+def test_error_statuses():
+    assert not rules_for(403, "", "*").can_fetch("/a")
+    assert rules_for(403, "", "*").can_fetch("/robots.txt")
+    assert rules_for(404, "", "*").can_fetch("/a")
+    assert rules_for(500, "User-agent: *\nDisallow: /", "*").can_fetch("/a")
+
+
+class Fetcher(object):
+    def __init__(self, text):
+        self.text = text
+        self.fetched = list()
+
+    def __call__(self, url):
+        self.fetched.append(url)
+        return 200, self.text
+
+
+def test_cache_fetches_each_host_once():
+    fetch = Fetcher(ROBOTS)
+    robots = RobotsCache(fetch)
+    assert robots.crawl_delay("https://www.ics.uci.edu/a") is None
+    assert not robots.can_fetch("https://www.ics.uci.edu/private/a")
+    assert robots.can_fetch("https://www.ics.uci.edu/search")
+    assert not robots.can_fetch("https://www.ics.uci.edu/search?q=x")
+    assert fetch.fetched == ["https://www.ics.uci.edu/robots.txt"]
+    assert robots.crawl_delay("https://www.ics.uci.edu/a") == 2
+
+
+def test_fetch_false_does_not_fetch():
+    fetch = Fetcher(ROBOTS)
+    robots = RobotsCache(fetch)
+    assert robots.can_fetch("https://www.ics.uci.edu/private/a", fetch=False) is None
+    assert fetch.fetched == []
+    robots.can_fetch("https://www.ics.uci.edu/")
+    assert robots.can_fetch("https://www.ics.uci.edu/private/a", fetch=False) is False
+
+
+def test_saved_rules_answer_without_fetching(tmp_path):
+    path = str(tmp_path / "robots")
+    robots = RobotsCache(Fetcher(ROBOTS), path=path)
+    robots.can_fetch("https://www.ics.uci.edu/")
+    robots.close()
+    fetch = Fetcher("")
+    robots = RobotsCache(fetch, path=path)
+    assert robots.can_fetch("https://www.ics.uci.edu/private/a", fetch=False) is False
+    assert not robots.can_fetch("https://www.ics.uci.edu/private/a")
+    assert fetch.fetched == []
+    robots.close()
+
+
+def test_no_fetch_function_allows_everything():
+    assert RobotsCache().can_fetch("https://www.ics.uci.edu/private/a", fetch=False) is True
@@ -0,0 +1,45 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import scraper
+from utils.crawl_state import CrawlState
+
+# tokens are letters only: topicab, topicac, ... and a repeated crawler
+WORDS = " ".join(f"topic{chr(97 + i // 26)}{chr(97 + i % 26)} crawler" for i in range(80))
+PAGE = (
+    "<html><head><title>Crawling</title><script>var ignored = 1;</script></head><body>"
+    f"<p>{WORDS}</p> "
+    '<a href="/about/">about</a> <a href="//www.cs.uci.edu/x#part">cs</a>'
+    "</body></html>").encode("utf-8")
+URL = "https://www.ics.uci.edu/dept/page"
+
+
+def test_analyze_page():
+    analysis = scraper.analyze_page(URL, URL, PAGE)
+    assert analysis.word_total > 50
+    assert analysis.word_count["topicab"] == 1 and analysis.word_count["crawler"] == 80
+    assert "ignored" not in analysis.word_count
+    assert analysis.fingerprint
+    assert analysis.links == [
+        "https://www.ics.uci.edu/about", "https://www.cs.uci.edu/x"]
+
+
+def test_short_pages_are_filtered_out():
+    analysis = scraper.analyze_page(URL, URL, b"<p>too short</p>")
+    assert analysis.word_count is None and analysis.links is None
+
+
+def test_analyzer_process_gives_the_same_analysis():
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        remote = pool.submit(scraper.analyze_page, URL, URL, PAGE).result()
+    assert remote == scraper.analyze_page(URL, URL, PAGE)
+
+
+def test_visited_pages_are_found_however_the_url_is_written(monkeypatch):
+    monkeypatch.setattr(scraper, "state", CrawlState())
+    # record_page adds pages under their canonical url
+    scraper.state.add_site("https://www.ics.uci.edu/dept")
+    scraper.state.add_site("https://www.ics.uci.edu/search?a=1&b=2")
+    for url in ("https://www.ics.uci.edu/dept/", "https://WWW.ICS.uci.edu/dept#top",
+                "http://ics.uci.edu:80/dept/", "https://www.ics.uci.edu/search?b=2&a=1"):
+        assert not scraper.is_valid(url)
+    assert scraper.is_valid("https://www.ics.uci.edu/search?a=2&b=1")
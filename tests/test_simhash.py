@@ -0,0 +1,77 @@
+import random
+
+from utils.simhash import (
+    SimhashIndex, max_distance, popcount, gen_fingerprint, gen_fingerprints, gen_fingerprint_python, NUM_BITS)
+
+
+def flip(fingerprint, bits, rng):
+    for bit in rng.sample(range(NUM_BITS), bits):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def test_max_distance():
+    # 1 - 6 / 128 >= 0.95 > 1 - 7 / 128
+    assert max_distance(128, 0.95) == 6
+    assert max_distance(64, 0.95) == 3
+
+
+def test_finds_every_fingerprint_within_the_distance():
+    rng = random.Random(1)
+    index = SimhashIndex()
+    stored = [rng.getrandbits(NUM_BITS) for _ in range(500)]
+    for fingerprint in stored:
+        index.add(fingerprint)
+    for fingerprint in stored:
+        for bits in range(index.distance + 1):
+            near = flip(fingerprint, bits, rng)
+            found = index.find_near(near)
+            assert found is not None
+            assert popcount(found ^ near) <= index.distance
+
+
+def test_agrees_with_a_linear_scan():
+    rng = random.Random(2)
+    index = SimhashIndex()
+    stored = [rng.getrandbits(NUM_BITS) for _ in range(300)]
+    for fingerprint in stored:
+        index.add(fingerprint)
+    for _ in range(300):
+        query = flip(rng.choice(stored), rng.randrange(12), rng)
+        expected = any(popcount(query ^ fp) <= index.distance for fp in stored)
+        assert index.has_near(query) == expected
+
+
+def test_exact_match_and_duplicates():
+    index = SimhashIndex()
+    index.add(12345)
+    index.add(12345)
+    assert len(index) == 1
+    assert 12345 in index
+    assert index.find_near(12345) == 12345
+    assert index.find_near(12345 ^ ((1 << 20) - 1)) is None
+
+
+def test_buckets_hold_collisions():
+    index = SimhashIndex()
+    # same low blocks, so they share keys in some tables
+    index.add(1 << 127)
+    index.add(1 << 126)
+    assert {1 << 127, 1 << 126} <= index.candidates(0)
+
+
+def test_vectorized_fingerprints_match_the_reference():
+    rng = random.Random(3)
+    words = [f"word{i}" for i in range(200)]
+    pages = [{word: rng.randrange(1, 5) for word in rng.sample(words, rng.randrange(1, 60))} for _ in range(20)]
+    # an empty page in the middle of the batch keeps its place
+    pages.insert(7, {})
+    expected = [gen_fingerprint_python(page) if page else 0 for page in pages]
+    assert gen_fingerprints(pages) == expected
+    assert gen_fingerprint(pages[0]) == expected[0]
+
+
+def test_similar_pages_get_near_fingerprints():
+    page = {f"word{i}": 1 for i in range(300)}
+    changed = dict(page, extra=1)
+    assert popcount(gen_fingerprint(page) ^ gen_fingerprint(changed)) <= max_distance()
@@ -0,0 +1,54 @@
+from benchmarks.cache_server import serve
+from benchmarks.synthetic_site import COMMIT_HOST, SyntheticSite
+from utils import download
+from utils.html_extract import extract
+
+URLS = ["https://www.ics.uci.edu", "https://www.ics.uci.edu/page7", "https://sub0.ics.uci.edu/page150",
+        "https://www.cs.uci.edu/calendar/2020-03-01", "https://www.ics.uci.edu/robots.txt",
+        "https://www.ics.uci.edu/page999", "https://www.example.com/"]
+
+
+def test_same_seed_same_site():
+    first = SyntheticSite(hosts=6, pages_per_host=200)
+    second = SyntheticSite(hosts=6, pages_per_host=200)
+    assert [first(url) for url in URLS] == [second(url) for url in URLS]
+    other = SyntheticSite(hosts=6, pages_per_host=200, seed=1)
+    assert other(URLS[1]) != first(URLS[1])
+
+
+def test_pages_and_links():
+    site = SyntheticSite(hosts=6, pages_per_host=200)
+    assert site.seeds() == ["https://www.ics.uci.edu", "https://www.cs.uci.edu",
+                            "https://www.informatics.uci.edu", "https://www.stat.uci.edu"]
+    assert site("https://www.ics.uci.edu/page999") == (404, b"not found")
+    assert site("https://www.example.com/")[0] == 404
+    assert site("https://www.ics.uci.edu/robots.txt")[1].startswith(b"User-agent: *")
+    statuses = [site(f"https://www.ics.uci.edu/page{i}")[0] for i in range(200)]
+    assert statuses.count(200) > 150 and set(statuses) <= {200, 404, 500}
+    status, body = site("https://www.cs.uci.edu/calendar/2020-03-01")
+    assert status == 200
+    assert extract(body)[1] == ["/calendar/2020-03-02", "/calendar/2020-03-08", "/calendar/2020-03-31"]
+
+
+def test_commit_browser_only_with_commit_pages():
+    assert SyntheticSite()(f"https://{COMMIT_HOST}/commit/x")[0] == 404
+    site = SyntheticSite(commit_pages=50)
+    status, body = site(f"https://{COMMIT_HOST}/commit/{site.commit_hash(3)}")
+    assert status == 200 and len(extract(body)[1]) == 6
+
+
+def test_cache_server_speaks_the_download_protocol(make_config, monkeypatch):
+    site = SyntheticSite(hosts=4, pages_per_host=50)
+    server = serve(site=site)
+    try:
+        monkeypatch.setattr(download, "session", None)
+        config = make_config()
+        config.cache_server = server.server_address
+        for url in ("https://www.ics.uci.edu/page3", "https://www.ics.uci.edu/page999"):
+            status, body = site(url)
+            resp = download.fetch(url, config)
+            assert resp.status == status and resp.url == url
+            assert resp.raw_response.content == body
+    finally:
+        server.shutdown()
+        server.server_close()
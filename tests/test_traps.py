@@ -0,0 +1,74 @@
+import pytest
+
+from utils.traps import DUPLICATE, ERROR, LOW, NEW, TrapDetector, template
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://wics.ics.uci.edu/events/2023-01-05/?ical=1", ("wics.ics.uci.edu", "/events/{d}/*?ical={n}")),
+    ("https://gitlab.ics.uci.edu/a/b/-/blame/9f2c1e0a/src/x.c", ("gitlab.ics.uci.edu", "/a/b/-/blame/{h}/*")),
+    ("https://www.ics.uci.edu/page12.html", ("www.ics.uci.edu", "/page{n}.html")),
+    ("https://www.ics.uci.edu/faculty/", ("www.ics.uci.edu", "/faculty/")),
+    ("https://www.ics.uci.edu/list?page=3&sort=name", ("www.ics.uci.edu", "/list?page={n}&sort=name")),
+    ("https://www.ics.uci.edu/list?sort=name&page=4", ("www.ics.uci.edu", "/list?page={n}&sort=name")),
+    # a plain word made of hex letters is not a hash
+    ("https://www.ics.uci.edu/facade/x", ("www.ics.uci.edu", "/facade/x")),
+])
+def test_template(url, expected):
+    assert template(url) == expected
+
+
+def calendar(day):
+    return f"https://wics.ics.uci.edu/events/2023-01-{day:02d}/"
+
+
+def make_detector(**kw):
+    settings = dict(min_fetches=5, min_yield=0.5, throttle=3, ban_fetches=10,
+                    host_min_fetches=1000, host_min_yield=0.01)
+    settings.update(kw)
+    return TrapDetector(**settings)
+
+
+def test_off_by_default():
+    traps = TrapDetector()
+    for day in range(1, 20):
+        traps.record(calendar(day), DUPLICATE)
+    assert traps.admit(calendar(25)) is None and not traps.banned(calendar(25))
+
+
+def test_low_yield_template_is_throttled_then_banned():
+    traps = make_detector()
+    for day in range(1, 5):
+        traps.record(calendar(day), DUPLICATE)
+    assert traps.admit(calendar(20)) is None
+    traps.record(calendar(5), LOW)
+    # throttled: every third url gets in
+    reasons = [traps.admit(calendar(day)) for day in range(20, 26)]
+    assert reasons.count(None) == 2 and reasons[2] is None
+    assert not traps.banned(calendar(20))
+    for day in range(6, 11):
+        traps.record(calendar(day), ERROR)
+    assert traps.admit(calendar(27)) == "url template is a trap"
+    assert traps.banned(calendar(27))
+    # other templates of the host are not affected
+    assert traps.admit("https://wics.ics.uci.edu/about") is None
+
+
+def test_throttled_template_recovers():
+    traps = make_detector()
+    for day in range(1, 6):
+        traps.record(calendar(day), DUPLICATE)
+    assert traps.templates[template(calendar(1))].state == "throttled"
+    for day in range(6, 12):
+        traps.record(calendar(day), NEW)
+    assert traps.templates[template(calendar(1))].state is None
+    assert all(traps.admit(calendar(day)) is None for day in range(20, 25))
+
+
+def test_low_yield_host_is_banned():
+    traps = make_detector(min_fetches=1000, host_min_fetches=20, host_min_yield=0.2)
+    for i in range(20):
+        traps.record(f"https://junk.ics.uci.edu/p{'x' * i}", NEW if i < 3 else DUPLICATE)
+    assert traps.banned_hosts == {"junk.ics.uci.edu"}
+    assert traps.admit("https://junk.ics.uci.edu/anything") == "host is a trap"
+    assert traps.rejected == {"junk.ics.uci.edu": 1}
+    assert traps.admit("https://www.ics.uci.edu/") is None
@@ -0,0 +1,44 @@
+import pytest
+
+from utils.url_filter import UrlFilter, has_repeated_directory
+
+url_filter = UrlFilter()
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.ics.uci.edu/",
+    "http://ics.uci.edu/about/index.php?tab=1",
+    "https://vision.ics.uci.edu/papers/list.html",
+    "https://www.stat.uci.edu/a/b/c",
+    "https://informatics.uci.edu/a/b/a",
+])
+def test_accepted(url):
+    assert url_filter.check(url) == (None, url.split("/")[2])
+
+
+@pytest.mark.parametrize("url, reason", [
+    ("https://www.ics.uci.edu/café", "url is not ascii"),
+    ("ftp://www.ics.uci.edu/", "scheme not in http or https"),
+    ("mailto:someone@ics.uci.edu", "scheme not in http or https"),
+    ("https://www.uci.edu/", "url is not a valid domain"),
+    ("https://fakeics.uci.edu/", "url is not a valid domain"),
+    ("https://ics.uci.edu.evil.com/", "url is not a valid domain"),
+    ("https://www.ics.uci.edu/slides/talk.PDF", "url is not a text file"),
+    ("https://www.ics.uci.edu/a/b/a/b/page", "url has a repeating directory"),
+    ("https://www.ics.uci.edu/a/a/page", "url has a repeating directory"),
+])
+def test_rejected(url, reason):
+    assert url_filter.check(url)[0] == reason
+
+
+def test_repeated_directory_ignores_the_last_segment():
+    assert not has_repeated_directory("/a/b/a")
+    assert not has_repeated_directory("/a//b/")
+    assert has_repeated_directory("/a/b/a/")
+
+
+def test_answers_are_cached():
+    own = UrlFilter(["ics.uci.edu"], cache_size=8)
+    own.check("https://www.ics.uci.edu/")
+    own.check("https://www.ics.uci.edu/")
+    assert own.check.cache_info().hits == 1
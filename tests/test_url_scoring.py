@@ -0,0 +1,110 @@
+import pytest
+
+import scraper
+from crawler.priority_frontier import PriorityFrontier
+from utils.traps import DUPLICATE, NEW
+from utils.url_scoring import (
+    CountMinSketch, DepthScorer, HostYieldScorer, NoveltyScorer, UrlScoring, parse_weights)
+from utils.url_seen import url_key
+
+SEED = "https://www.ics.uci.edu/"
+
+
+def test_depth_counts_clicks_from_a_seed():
+    depth = DepthScorer()
+    assert depth.url_score(SEED) == 1.0
+    depth.linked(SEED, [SEED + "a"], [SEED + "a"])
+    depth.linked(SEED + "a", [SEED + "b", SEED], [SEED + "b"])
+    assert depth.url_score(SEED + "a") == 1.0 # fetched, its depth is gone
+    assert depth.url_score(SEED + "b") == 1 / 3
+    depth.forget(SEED + "b")
+    assert depth.depths == {}
+
+
+def test_count_min_sketch_never_counts_too_low():
+    sketch = CountMinSketch(width=64, depth=3)
+    for key in range(1, 500):
+        for _ in range(key % 5):
+            sketch.add(key * 0x9e3779b97f4a7c15 & 0xffffffffffffffff)
+    for key in range(1, 500):
+        assert sketch[key * 0x9e3779b97f4a7c15 & 0xffffffffffffffff] >= key % 5
+
+
+def test_yield_scorers_follow_new_content():
+    novelty = NoveltyScorer()
+    hosts = HostYieldScorer()
+    for i in range(10):
+        for scorer in (novelty, hosts):
+            scorer.fetched(f"https://cal.ics.uci.edu/day/{i}", DUPLICATE)
+            scorer.fetched(f"https://cal.ics.uci.edu/news{i}", NEW)
+    assert novelty.url_score("https://cal.ics.uci.edu/day/99") < 0.5
+    assert novelty.url_score("https://cal.ics.uci.edu/news99") == pytest.approx(1.0)
+    assert novelty.url_score("https://other.ics.uci.edu/") == 1.0
+    assert 0.3 < hosts.host_score("cal.ics.uci.edu") < 0.7
+    assert hosts.host_score("other.ics.uci.edu") == 1.0
+
+
+def test_weighted_sum():
+    scoring = UrlScoring(parse_weights("depth:2, host_yield:3,inlinks"))
+    assert [weight for _, weight in scoring.scorers] == [2.0, 3.0, 1.0]
+    scoring.linked(SEED, [SEED + "a"], [SEED + "a"])
+    assert scoring.url_score(SEED + "a") == pytest.approx(2 * 0.5 + 0.5)
+    assert scoring.host_score("www.ics.uci.edu") == 3.0
+    scoring.forget(SEED + "a")
+    assert url_key(SEED + "a") not in scoring.scorers[0][0].depths
+    assert UrlScoring().url_score(SEED) == 0
+
+
+class Scores(object):
+    # fixed scores in place of scraper.scoring
+    def __init__(self, urls, hosts=()):
+        self.urls = dict(urls)
+        self.hosts = dict(hosts)
+
+    def url_score(self, url):
+        return self.urls.get(url, 0)
+
+    def host_score(self, hostname):
+        return self.hosts.get(hostname, 0)
+
+    def forget(self, url):
+        pass
+
+
+def drain(frontier):
+    urls = list()
+    while True:
+        url = frontier.get_tbd_url()
+        if url is None:
+            return urls
+        urls.append(url)
+        frontier.mark_url_complete(url)
+
+
+def test_priority_frontier_fetches_the_best_url_first(make_config, clock, monkeypatch):
+    urls = [SEED + name for name in ("low", "high", "mid", "tie")]
+    monkeypatch.setattr(scraper, "scoring", Scores({urls[0]: 0.1, urls[1]: 0.9, urls[2]: 0.5, urls[3]: 0.1}))
+    frontier = PriorityFrontier(make_config(urls, FRONTIER="priority"), True)
+    # ties go to the url found first
+    assert drain(frontier) == [urls[1], urls[2], urls[0], urls[3]]
+    frontier.close()
+
+
+def test_priority_frontier_picks_the_best_ready_host(make_config, clock, monkeypatch):
+    good = "https://good.ics.uci.edu/"
+    bad = "https://bad.ics.uci.edu/"
+    scores = Scores({}, {"good.ics.uci.edu": 1.0})
+    monkeypatch.setattr(scraper, "scoring", scores)
+    frontier = PriorityFrontier(make_config([bad + "a", good + "a"], politeness=1, FRONTIER="priority"), True)
+    frontier.add_url(bad + "b")
+    frontier.add_url(good + "b")
+    assert frontier.get_tbd_url() == good + "a"
+    assert frontier.get_tbd_url() == bad + "a"
+    frontier.mark_url_complete(bad + "a")
+    frontier.mark_url_complete(good + "a")
+    # the host that scores better goes first once both delays have passed
+    clock.now += 1
+    scores.hosts = {"bad.ics.uci.edu": 2.0}
+    assert frontier.poll_tbd_url() == (bad + "b", 0)
+    assert frontier.poll_tbd_url() == (good + "b", 0)
+    frontier.close()
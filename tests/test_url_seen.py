@@ -0,0 +1,68 @@
+import random
+from array import array
+
+from utils import get_urlhash
+from utils.url_seen import BloomFilter, UrlSeen, url_key, urlhash_key
+
+
+def random_keys(n, seed):
+    rnd = random.Random(seed)
+    return [rnd.getrandbits(64) or 1 for _ in range(n)]
+
+
+def test_url_key_matches_urlhash_key():
+    for url in ("https://www.ics.uci.edu/", "http://ics.uci.edu/index.php", "https://cs.uci.edu/a?b=1"):
+        assert url_key(url) == urlhash_key(get_urlhash(url))
+    assert url_key("https://www.ics.uci.edu/a") == url_key("http://ics.uci.edu/a")
+
+
+def test_add_and_contains_through_growth():
+    seen = UrlSeen(capacity=4)
+    keys = random_keys(5000, 14)
+    for key in keys:
+        assert seen.add(key)
+    for key in keys:
+        assert not seen.add(key) and key in seen
+    assert len(seen) == len(set(keys))
+    assert sorted(seen) == sorted(keys)
+    assert not any(key in seen for key in random_keys(1000, 15))
+
+
+def test_spill_runs_and_merge(tmp_path):
+    seen = UrlSeen()
+    seen.set_spill(str(tmp_path / "seen"), max_keys=100)
+    keys = random_keys(1000, 16)
+    for key in keys:
+        assert seen.add(key)
+    # ten spills with MAX_RUNS 4 merge down to at most 4 runs on disk
+    assert seen.runs and len(seen.runs) <= 4
+    assert len(seen) == 1000
+    for key in keys:
+        assert key in seen and not seen.add(key)
+    assert not any(key in seen for key in random_keys(1000, 17))
+    assert sorted(seen) == sorted(keys)
+    seen.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_set_spill_removes_stale_runs(tmp_path):
+    (tmp_path / "seen.3").write_bytes(b"\0" * 8)
+    (tmp_path / "seen.keep").write_bytes(b"")
+    UrlSeen().set_spill(str(tmp_path / "seen"), max_keys=100)
+    assert [path.name for path in tmp_path.iterdir()] == ["seen.keep"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    keys = random_keys(2000, 18)
+    bloom = BloomFilter(len(keys))
+    bloom.add_many(array("Q", keys[:1000]))
+    for key in keys[1000:]:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    # filling it a key at a time sets the same bits
+    one_by_one = BloomFilter(len(keys))
+    for key in keys:
+        one_by_one.add(key)
+    assert one_by_one.bits == bloom.bits
+    false_positives = sum(key in bloom for key in random_keys(10000, 19))
+    assert false_positives < 300
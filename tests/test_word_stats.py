@@ -0,0 +1,98 @@
+import random
+
+from utils.word_stats import (
+    TopCounts, ExactWordStats, SpaceSavingStats, tokenize, compute_word_count, count_words)
+
+
+def ranked(counts, k):
+    return sorted(counts.items(), key=lambda z: (-z[1], z[0]))[:k]
+
+
+def test_top_counts_matches_a_full_sort():
+    rnd = random.Random(8)
+    words = [f"w{i}" for i in range(300)]
+    counts = dict()
+    top = TopCounts(k=10)
+    for _ in range(5000):
+        word = rnd.choice(words[:rnd.randint(1, len(words))])
+        counts[word] = counts.get(word, 0) + rnd.randint(1, 3)
+        top.update(word, counts[word])
+        assert top.items() == ranked(counts, 10)
+
+
+def test_ties_go_to_the_first_word_alphabetically():
+    top = TopCounts(k=2)
+    for word in ("c", "b", "a"):
+        top.update(word, 5)
+    assert top.items() == [("a", 5), ("b", 5)]
+    top.update("c", 6)
+    assert top.items() == [("c", 6), ("a", 5)]
+
+
+def test_exact_word_stats_adds_pages():
+    stats = ExactWordStats(k=3)
+    stats.add({"crawler": 2, "page": 1})
+    stats.add({"page": 4, "robots": 1, "zebra": 1})
+    assert stats.top() == [("page", 5, 0), ("crawler", 2, 0), ("robots", 1, 0)]
+    assert stats.total == 9 and len(stats) == 4
+
+
+def test_count_words_matches_tokenize():
+    text = "The crawler's crawler-crawler AND a robots.txt, the ROBOTS' x y z don’t 42 stop"
+    total, wc = count_words(text)
+    tokens = tokenize(text)
+    assert total == len(tokens)
+    assert wc == compute_word_count(tokens)
+    assert "the" not in wc and "x" not in wc and wc["robots"] == 1
+
+
+def zipf_pages(rnd, pages, vocabulary):
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    words = [f"w{rank}" for rank in range(vocabulary)]
+    for _ in range(pages):
+        wc = dict()
+        for word in rnd.choices(words, weights, k=50):
+            wc[word] = wc.get(word, 0) + 1
+        yield wc
+
+
+def test_space_saving_bounds():
+    rnd = random.Random(13)
+    exact = ExactWordStats()
+    approx = SpaceSavingStats(capacity=200, k=20)
+    for wc in zipf_pages(rnd, 400, 2000):
+        exact.add(wc)
+        approx.add(wc)
+    assert len(approx) <= 200 and approx.total == exact.total
+    bound = approx.error_bound()
+    for word, count, error in approx.top():
+        real = exact.counts[word]
+        assert real <= count <= real + error and error <= bound
+    # every word seen more than total / capacity times is kept
+    for word, count in exact.counts.items():
+        if count > bound:
+            assert word in approx.counts
+
+
+def test_space_saving_merge():
+    rnd = random.Random(14)
+    pages = list(zipf_pages(rnd, 200, 1000))
+    exact = ExactWordStats()
+    left = SpaceSavingStats(capacity=150)
+    right = SpaceSavingStats(capacity=150)
+    for i, wc in enumerate(pages):
+        exact.add(wc)
+        (left if i % 2 else right).add(wc)
+    left.merge(right)
+    assert left.total == exact.total
+    for word, count in left.counts.items():
+        assert exact.counts[word] <= count <= exact.counts[word] + left.errors[word]
+
+
+def test_space_saving_is_exact_under_capacity():
+    exact = ExactWordStats(k=5)
+    approx = SpaceSavingStats(capacity=100, k=5)
+    for wc in ({"a": 3, "b": 1}, {"b": 4, "c": 2}, {"d": 1}):
+        exact.add(wc)
+        approx.add(wc)
+    assert approx.top() == exact.top()
@@ -1,8 +1,8 @@
 import os
 import logging
 from hashlib import sha256
-from urllib.parse import urlparse
-import urllib
+import urllib.parse
+from utils.canonical import canonicalize, key_form
 
 def get_logger(name, filename=None):
     logger = logging.getLogger(name)
@@ -24,16 +24,11 @@ def get_logger(name, filename=None):
 
 
 def get_urlhash(url):
-    parsed = urlparse(url)
-    # everything other than scheme.
-    return sha256(
-        f"{parsed.netloc}/{parsed.path}/{parsed.params}/"
-        f"{parsed.query}/{parsed.fragment}".encode("utf-8")).hexdigest()
+    # everything other than scheme, www. and a trailing index page, see utils/canonical.py
+    return sha256(key_form(url).encode("utf-8")).hexdigest()
 
 def normalize(url):
-    if url.endswith("/"):
-        return url.rstrip("/")
-    return url
+    return canonicalize(url)
 
 
 def hostname_ify(url):
@@ -0,0 +1,128 @@
+import asyncio
+from urllib.parse import urlencode
+
+import cbor
+
+from utils import metrics
+from utils.response import Response
+from utils.download import UNREACHABLE_STATUS, replay, record
+
+
+class CacheClient(object):
+    '''
+    asyncio version of utils.download for one event loop. Speaks just enough
+    HTTP/1.1 to send the cache server's GET /?q=..&u=.. and read the answer,
+    and keeps the connections alive for reuse. Same timeouts, retries and
+    error responses as utils.download, and the same content store.
+    '''
+    def __init__(self, config, logger=None):
+        self.config = config
+        self.logger = logger
+        self.idle = list() # (reader, writer) pairs ready for another request
+
+    async def download(self, url):
+        if self.config.content_store_mode == "replay":
+            return replay(url, self.config, self.logger)
+        resp = await self._fetch(url)
+        if self.config.content_store_mode == "record":
+            record(url, resp, self.config)
+        return resp
+
+    async def _fetch(self, url):
+        host, port = self.config.cache_server
+        path = "/?" + urlencode([("q", f"{url}"), ("u", f"{self.config.user_agent}")])
+        error = None
+        for attempt in range(self.config.retries + 1):
+            if attempt:
+                metrics.inc("download_retries_total")
+                await asyncio.sleep(self.config.retry_backoff * 2 ** (attempt - 1))
+            try:
+                status, body = await self._get(host, port, path)
+                break
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                error = e
+        else:
+            if self.logger:
+                self.logger.error(f"Could not reach cache server for {url}: {error!r}")
+            return Response({
+                "error": f"Could not reach cache server for {url}: {error!r}",
+                "status": UNREACHABLE_STATUS,
+                "url": url})
+        try:
+            if body:
+                return Response(cbor.loads(body))
+        except (EOFError, ValueError) as e:
+            pass
+        if self.logger:
+            self.logger.error(f"Spacetime Response error <{status}> with url {url}.")
+        return Response({
+            "error": f"Spacetime Response error <{status}> with url {url}.",
+            "status": status,
+            "url": url})
+
+    async def _connect(self, host, port):
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), self.config.connect_timeout)
+        return reader, writer, False
+
+    async def _get(self, host, port, path):
+        reader, writer, reused = await self._connect(host, port)
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                f"Accept: */*\r\nConnection: keep-alive\r\n\r\n".encode("ascii"))
+            status, headers, body = await asyncio.wait_for(
+                self._read_response(reader), self.config.read_timeout)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            writer.close()
+            if reused:
+                # the server dropped an idle connection, try once on a fresh one
+                return await self._get(host, port, path)
+            raise
+        except BaseException:
+            writer.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self.idle.append((reader, writer))
+        return status, body
+
+    async def _read_response(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("iso-8859-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = dict()
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = list()
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    # skip any trailers up to the final empty line
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        return status, headers, body
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = list()
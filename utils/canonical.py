@@ -0,0 +1,154 @@
+'''
+Canonical form of a url, so the same page reached through differently
+written links is only queued and fetched once.
+
+    canonicalize("HTTP://WWW.ics.uci.edu:80/a/./b/../c/?utm_source=x&b=2&a=1#top")
+    -> "http://www.ics.uci.edu/a/c/?a=1&b=2"
+
+canonicalize returns a url that is still fetched as is:
+- scheme and host lowercased, trailing dot of the host and default ports dropped
+- percent-escapes of unreserved characters decoded, the others uppercased
+- "." and ".." segments resolved, empty path and trailing "/" dropped (like
+  the old normalize), unless a query follows: /a/?x and /a?x can be
+  different pages
+- query parameters sorted by name, repeated ones keeping their order
+  (?a=2&a=1 is not ?a=1&a=2 to every server), tracking and session ones
+  dropped (see set_strip_params), fragment dropped
+
+key_form goes further for the urlhash the frontier and the url sets
+dedupe on: besides the scheme (which get_urlhash always ignored), a leading
+"www." and a trailing index page (index.php, index.html, ...) do not count.
+'''
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, urlparse
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+INDEX_PAGES = ("index.html", "index.htm", "index.php")
+# query (and ;path) parameters dropped by default, a trailing * matches any ending
+STRIP_PARAMS = (
+    "utm_*", "fbclid", "gclid", "mc_cid", "mc_eid", "sessionid", "session_id", "sid",
+    "phpsessid", "jsessionid", "share", "replytocom")
+
+UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+ESCAPE_RE = re.compile(r"%([0-9a-fA-F]{2})")
+
+strip_names = frozenset()
+strip_prefixes = tuple()
+
+
+def set_strip_params(params):
+    # which query parameters canonicalize drops, names are matched case-insensitively
+    global strip_names
+    global strip_prefixes
+    params = [param.strip().lower() for param in params if param.strip()]
+    strip_names = frozenset(param for param in params if not param.endswith("*"))
+    strip_prefixes = tuple(param[:-1] for param in params if param.endswith("*"))
+    canonicalize.cache_clear()
+
+def stripped(name):
+    name = name.lower()
+    return name in strip_names or (strip_prefixes and name.startswith(strip_prefixes))
+
+
+def normalize_escapes(text):
+    # %7e -> ~, %2f -> %2F
+    if "%" not in text:
+        return text
+    def fix(match):
+        char = chr(int(match.group(1), 16))
+        return char if char in UNRESERVED else "%" + match.group(1).upper()
+    return ESCAPE_RE.sub(fix, text)
+
+
+def remove_dot_segments(path):
+    # RFC 3986 section 5.2.4, on whole segments
+    if "/." not in path and not path.startswith("."):
+        return path
+    output = list()
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == ".":
+            if last:
+                output.append("")
+        elif segment == "..":
+            if len(output) > 1:
+                output.pop()
+            if last:
+                output.append("")
+        else:
+            output.append(segment)
+    result = "/".join(output)
+    if path.startswith("/") and not result.startswith("/"):
+        result = "/" + result
+    return result
+
+
+@lru_cache(maxsize=65536)
+def canonicalize(url):
+    # memoized, nav bars and footers link to the same urls from every page
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port if ":" in parts.netloc else None
+    except ValueError:
+        # not something we can take apart (bad port, broken ipv6 host), leave it
+        return url
+    scheme = parts.scheme.lower()
+
+    netloc = parts.netloc
+    if ":" in netloc or "@" in netloc:
+        # user@host:port, hostname comes back lowercased and without brackets
+        host = (parts.hostname or "").rstrip(".")
+        if ":" in host:
+            host = "[" + host + "]"
+        if port is not None and str(port) != DEFAULT_PORTS.get(scheme):
+            host += f":{port}"
+        if "@" in netloc:
+            host = netloc.rsplit("@", 1)[0] + "@" + host
+        netloc = host
+    else:
+        netloc = netloc.lower().rstrip(".")
+
+    path = remove_dot_segments(normalize_escapes(parts.path))
+    if ";" in path and strip_names:
+        # session ids in path parameters, like /a;jsessionid=...
+        path = ";".join(
+            [path.split(";")[0]]
+            + [param for param in path.split(";")[1:] if not stripped(param.split("=", 1)[0])])
+
+    query = ""
+    if parts.query:
+        params = [
+            param for param in normalize_escapes(parts.query).split("&")
+            if param and not stripped(param.split("=", 1)[0])]
+        # sorted is stable, repeated parameters stay in the order they came
+        query = "&".join(sorted(params, key=lambda param: param.split("=", 1)[0]))
+    if not query:
+        path = path.rstrip("/")
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+# bumped whenever key_form (or what canonicalize hands it) changes, so save files
+# keyed by the old urlhashes are noticed on resume: 1 hashed the url as it
+# was, 2 is key_form
+KEY_VERSION = 2
+
+
+def key_form(url):
+    # the string get_urlhash hashes: everything but the scheme, without www. or a trailing index page
+    parsed = urlparse(url)
+    netloc = parsed.netloc
+    if netloc[:4].lower() == "www.":
+        netloc = netloc[4:]
+    path = parsed.path
+    if path.rsplit("/", 1)[-1] in INDEX_PAGES:
+        path = path.rsplit("/", 1)[0]
+    return (
+        f"{netloc}/{path}/{parsed.params}/"
+        f"{parsed.query}/{parsed.fragment}")
+
+
+set_strip_params(STRIP_PARAMS)
@@ -1,5 +1,8 @@
 import re
 
+from utils.canonical import STRIP_PARAMS
+from utils.url_scoring import SCORERS, parse_weights
+
 
 class Config(object):
     def __init__(self, config):
@@ -8,12 +11,104 @@ class Config(object):
         assert self.user_agent != "DEFAULT AGENT", "Set useragent in config.ini"
         assert re.match(r"^[a-zA-Z0-9_ ,]+$", self.user_agent), "User agent should not have any special characters outside '_', ',' and 'space'"
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
+        # "threads" runs one fetch per worker thread, "async" runs ASYNC_TASKS fetches per worker on an event loop
+        self.engine = config["LOCAL PROPERTIES"].get("ENGINE", "threads").strip().lower()
+        assert self.engine in ("threads", "async"), "ENGINE should be threads or async"
+        self.async_tasks = int(config["LOCAL PROPERTIES"].get("ASYNC_TASKS", "100"))
+        self.async_scrapers = int(config["LOCAL PROPERTIES"].get("ASYNC_SCRAPERS", "4"))
+        # number of analyzer processes for page parsing, 0 parses in the worker threads
+        self.analyzers = int(config["LOCAL PROPERTIES"].get("ANALYZERS", "0"))
+        # how pages are parsed, see utils/html_extract.py
+        self.html_parser = config["LOCAL PROPERTIES"].get("PARSER", "stream").strip().lower()
+        assert self.html_parser in ("stream", "lxml", "bs4"), "PARSER should be stream, lxml or bs4"
+        # seconds between rewrites of result1.txt, it is also written when the crawl ends
+        self.report_interval = float(config["LOCAL PROPERTIES"].get("REPORT_INTERVAL", "30"))
+        # query parameters the canonical form of a url leaves out (utils/canonical.py), * ends a prefix
+        self.url_strip_params = [
+            param.strip() for param in config["LOCAL PROPERTIES"].get(
+                "URL_STRIP_PARAMS", ",".join(STRIP_PARAMS)).split(",") if param.strip()]
+        # how many urls is_valid remembers the url-only checks for (utils/url_filter.py)
+        self.url_filter_cache = int(config["LOCAL PROPERTIES"].get("URL_FILTER_CACHE", "65536"))
+        # robots.txt answers are kept ROBOTS_TTL seconds, also in the ROBOTS_CACHE shelve if set,
+        # and a Crawl-delay longer than ROBOTS_MAX_DELAY seconds is cut down to it
+        self.robots_cache = config["LOCAL PROPERTIES"].get("ROBOTS_CACHE", "robots.shelve").strip()
+        self.robots_ttl = float(config["LOCAL PROPERTIES"].get("ROBOTS_TTL", "86400"))
+        self.robots_max_delay = float(config["LOCAL PROPERTIES"].get("ROBOTS_MAX_DELAY", "30"))
+        # fifo fetches the urls of a host in the order they were found, priority fetches the best
+        # scoring url of the best scoring ready host first (crawler/priority_frontier.py); the
+        # score is the weighted sum of the FRONTIER_SCORERS, the top FRONTIER_RESCORE urls of a
+        # host are scored again when it is picked
+        self.frontier = config["LOCAL PROPERTIES"].get("FRONTIER", "fifo").strip().lower()
+        assert self.frontier in ("fifo", "priority"), "FRONTIER should be fifo or priority"
+        self.frontier_scorers = parse_weights(
+            config["LOCAL PROPERTIES"].get("FRONTIER_SCORERS", "depth:1,inlinks:1,novelty:1,host_yield:2"))
+        assert all(name in SCORERS for name, _ in self.frontier_scorers), \
+            "FRONTIER_SCORERS should be name:weight pairs of " + ", ".join(SCORERS)
+        self.frontier_rescore = int(config["LOCAL PROPERTIES"].get("FRONTIER_RESCORE", "8"))
+        # url templates that keep bringing no new content are throttled, then banned (utils/traps.py);
+        # TRAP_MIN_FETCHES = 0 turns the detector off
+        self.trap_min_fetches = int(config["LOCAL PROPERTIES"].get("TRAP_MIN_FETCHES", "20"))
+        self.trap_min_yield = float(config["LOCAL PROPERTIES"].get("TRAP_MIN_YIELD", "0.1"))
+        self.trap_throttle = int(config["LOCAL PROPERTIES"].get("TRAP_THROTTLE", "10"))
+        self.trap_ban_fetches = int(config["LOCAL PROPERTIES"].get("TRAP_BAN_FETCHES", "60"))
+        self.trap_host_min_fetches = int(config["LOCAL PROPERTIES"].get("TRAP_HOST_MIN_FETCHES", "200"))
+        self.trap_host_min_yield = float(config["LOCAL PROPERTIES"].get("TRAP_HOST_MIN_YIELD", "0.02"))
+        # hosts answering with errors or slowly wait longer between fetches, up to RATE_MAX_DELAY
+        # seconds, and hosts with RATE_GIVE_UP errors in a row are dropped (utils/rate_control.py);
+        # RATE_MAX_DELAY = 0 turns this off
+        self.rate_max_delay = float(config["LOCAL PROPERTIES"].get("RATE_MAX_DELAY", "30"))
+        self.rate_backoff = float(config["LOCAL PROPERTIES"].get("RATE_BACKOFF", "2"))
+        self.rate_recover = float(config["LOCAL PROPERTIES"].get("RATE_RECOVER", "0.25"))
+        self.rate_slow_factor = float(config["LOCAL PROPERTIES"].get("RATE_SLOW_FACTOR", "4"))
+        self.rate_give_up = int(config["LOCAL PROPERTIES"].get("RATE_GIVE_UP", "10"))
+        # exact keeps every word for the top 50, approx keeps WORD_STATS_CAPACITY of them (utils/word_stats.py)
+        self.word_stats = config["LOCAL PROPERTIES"].get("WORD_STATS", "exact").strip().lower()
+        assert self.word_stats in ("exact", "approx"), "WORD_STATS should be exact or approx"
+        self.word_stats_capacity = int(config["LOCAL PROPERTIES"].get("WORD_STATS_CAPACITY", "100000"))
+        # per stage latencies, counters and queue depths (utils/metrics.py) are served in the
+        # Prometheus format on METRICS_PORT and written to METRICS_FILE every METRICS_INTERVAL seconds
+        self.metrics_port = int(config["LOCAL PROPERTIES"].get("METRICS_PORT", "0"))
+        self.metrics_file = config["LOCAL PROPERTIES"].get("METRICS_FILE", "").strip()
+        self.metrics_interval = float(config["LOCAL PROPERTIES"].get("METRICS_INTERVAL", "10"))
+        # journal of every link decision the scraper makes, an empty LINK_LOG turns it off
+        self.link_log = config["LOCAL PROPERTIES"].get("LINK_LOG", "valid.txt").strip()
+        self.link_log_format = config["LOCAL PROPERTIES"].get("LINK_LOG_FORMAT", "text").strip().lower()
+        self.link_log_sample = float(config["LOCAL PROPERTIES"].get("LINK_LOG_SAMPLE", "1.0"))
+        self.link_log_max_bytes = int(config["LOCAL PROPERTIES"].get("LINK_LOG_MAX_MB", "0")) * 1000000
+        self.link_log_backups = int(config["LOCAL PROPERTIES"].get("LINK_LOG_BACKUPS", "3"))
+        # record appends every response to the content store in CONTENT_STORE (utils/content_store.py),
+        # replay crawls from it instead of the cache server, without politeness delays
+        self.content_store = config["LOCAL PROPERTIES"].get("CONTENT_STORE", "content_store").strip()
+        self.content_store_mode = config["LOCAL PROPERTIES"].get("CONTENT_STORE_MODE", "off").strip().lower()
+        assert self.content_store_mode in ("off", "record", "replay"), "CONTENT_STORE_MODE should be off, record or replay"
+        self.content_store_segment_bytes = int(
+            config["LOCAL PROPERTIES"].get("CONTENT_STORE_SEGMENT_MB", "256")) * 1000000
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"]
+        # urls seen by the frontier and the scraper are kept as 64 bit keys (utils/url_seen.py),
+        # each set keeps at most URL_SEEN_MEMORY_KEYS in memory and spills the rest to URL_SEEN_DIR
+        self.url_seen_memory_keys = int(config["LOCAL PROPERTIES"].get("URL_SEEN_MEMORY_KEYS", "0"))
+        self.url_seen_dir = config["LOCAL PROPERTIES"].get("URL_SEEN_DIR", "url_seen").strip()
+        # "shelve" syncs the save file on every url, "log" group commits to an append-only log
+        self.save_format = config["LOCAL PROPERTIES"].get("SAVE_FORMAT", "shelve").strip().lower()
+        assert self.save_format in ("shelve", "log"), "SAVE_FORMAT should be shelve or log"
+        self.log_flush_records = int(config["LOCAL PROPERTIES"].get("LOG_FLUSH_RECORDS", "256"))
+        self.log_flush_interval = float(config["LOCAL PROPERTIES"].get("LOG_FLUSH_MS", "200")) / 1000
+        self.log_compact_records = int(config["LOCAL PROPERTIES"].get("LOG_COMPACT_RECORDS", "100000"))
 
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
+        # seconds to wait on the cache server, and how often to retry when it cannot be reached
+        self.connect_timeout = float(config["CONNECTION"].get("CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(config["CONNECTION"].get("READ_TIMEOUT", "30"))
+        self.retries = int(config["CONNECTION"].get("RETRIES", "3"))
+        self.retry_backoff = float(config["CONNECTION"].get("RETRY_BACKOFF", "0.5"))
 
         self.seed_urls = config["CRAWLER"]["SEEDURL"].split(",")
         self.time_delay = float(config["CRAWLER"]["POLITENESS"])
+        if self.content_store_mode == "replay":
+            # nothing goes over the network
+            self.time_delay = 0
+            self.robots_max_delay = 0
+            self.rate_max_delay = 0
 
         self.cache_server = None
\ No newline at end of file
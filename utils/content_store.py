@@ -0,0 +1,240 @@
+'''
+Local store of the responses a crawl downloaded, to crawl it again offline.
+
+    store = ContentStore("content_store")
+    store.put(url, resp)        # while crawling, CONTENT_STORE_MODE = record
+    store.get(url)              # a Response again, None if it was not stored
+    for resp in store: ...      # every stored response, in the order they came
+    store.read(*entry)          # the response of one of store.entries()
+
+Each response (url, final url, status, error, headers, body) is cbor
+encoded, compressed with zlib on its own, and appended to the current
+segment file (segment-000000.dat, ...), a new one every segment_bytes.
+index.log gets its (key, segment, offset, length) next to it, the key being
+the first 64 bits of the sha256 of the url exactly as it was requested.
+
+For lookups index.log is sorted by key into index (the last response of a
+url wins), three flat arrays("Q") of keys, offsets and segment << 32 |
+length, searched through an mmap like the spilled runs of utils/url_seen.py.
+The index is written when a recording store is closed, and rebuilt from
+index.log when it is missing or older, after a crash say; entries pointing
+past the end of their segment are left out then.
+
+Recording and reading are thread safe. Reads are one pread, so they do not
+wait for each other; where there is no pread (Windows) they seek and read
+under a lock instead.
+'''
+import os
+import mmap
+import zlib
+from array import array
+from bisect import bisect_left
+from hashlib import sha256
+from threading import Lock
+
+import cbor
+import requests
+
+from utils.response import Response
+
+SEGMENT = "segment-{:06d}.dat"
+INDEX_LOG_ENTRY = 4 # array("Q") items per index.log entry
+
+
+def store_key(url):
+    return int.from_bytes(sha256(url.encode("utf-8")).digest()[:8], "big")
+
+
+def make_raw_response(url, status, body, headers, encoding):
+    # the requests.Response the cache server would have pickled
+    raw = requests.models.Response()
+    raw.url = url
+    raw.status_code = status
+    raw._content = body
+    raw.headers.update(headers)
+    raw.encoding = encoding
+    return raw
+
+
+class ContentStore(object):
+    def __init__(self, directory, segment_bytes=256 * 1000000, compress_level=6):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compress_level = compress_level
+        os.makedirs(directory, exist_ok=True)
+        self.lock = Lock()
+        self.index_lock = Lock()
+        self.read_lock = Lock() # seek and read, without os.pread
+        self.segments = dict() # number -> fd open for reading
+        self.segment = None # the segment being appended to, opened by the first put
+        self.index_log = None
+        self.recorded = 0
+        self.index_file = None
+        self.index_map = None
+        self.columns = self.keys = self.offsets = self.locations = ()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    # recording
+
+    def put(self, url, resp):
+        raw = resp.raw_response
+        record = {
+            "url": url,
+            "status": resp.status,
+            "error": resp.error,
+            "final_url": raw.url if raw is not None else None,
+            "encoding": raw.encoding if raw is not None else None,
+            "headers": dict(raw.headers) if raw is not None else {},
+            "body": raw.content if raw is not None else b""}
+        data = zlib.compress(cbor.dumps(record), self.compress_level)
+        with self.lock:
+            if self.segment is None or self.segment.tell() + len(data) > self.segment_bytes:
+                self._next_segment()
+            offset = self.segment.tell()
+            self.segment.write(data)
+            array("Q", (store_key(url), self.segment_number, offset, len(data))).tofile(self.index_log)
+            self.recorded += 1
+        return len(data)
+
+    def _next_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+        else:
+            self.index_log = open(self._path("index.log"), "ab")
+        numbers = self._segment_numbers()
+        self.segment_number = numbers[-1] + 1 if numbers else 0
+        self.segment = open(self._path(SEGMENT.format(self.segment_number)), "ab")
+
+    def _segment_numbers(self):
+        return sorted(
+            int(name[8:14]) for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.endswith(".dat"))
+
+    # reading
+
+    def get(self, url):
+        if self.index_map is None:
+            self._open_index()
+        key = store_key(url)
+        keys = self.keys
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return None
+        location = self.locations[i]
+        resp = self.read(location >> 32, self.offsets[i], location & 0xffffffff)
+        # two urls sharing a key is a 1 in 2**64 chance, but the record knows its url
+        return resp if resp.url == url else None
+
+    def __iter__(self):
+        # every stored response in the order they were recorded
+        for key, segment, offset, length in self.entries():
+            yield self.read(segment, offset, length)
+
+    def read(self, segment, offset, length):
+        fd = self.segments.get(segment)
+        if fd is None:
+            with self.lock:
+                fd = self.segments.get(segment)
+                if fd is None:
+                    fd = self.segments[segment] = os.open(
+                        self._path(SEGMENT.format(segment)), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        if hasattr(os, "pread"):
+            data = os.pread(fd, length, offset)
+        else:
+            with self.read_lock:
+                os.lseek(fd, offset, os.SEEK_SET)
+                data = os.read(fd, length)
+        record = cbor.loads(zlib.decompress(data))
+        resp = Response({"url": record["url"], "status": record["status"], "error": record["error"]})
+        if record["final_url"] is not None:
+            resp.raw_response = make_raw_response(
+                record["final_url"], record["status"], record["body"], record["headers"],
+                record["encoding"])
+        return resp
+
+    def entries(self):
+        # (key, segment, offset, length) of index.log, the ones past the end of their segment left out
+        with self.lock:
+            if self.index_log is not None:
+                self.segment.flush()
+                self.index_log.flush()
+        entries = array("Q")
+        path = self._path("index.log")
+        if os.path.exists(path):
+            with open(path, "rb") as log:
+                data = log.read()
+            entries.frombytes(data[:len(data) - len(data) % (8 * INDEX_LOG_ENTRY)])
+        sizes = dict()
+        for i in range(0, len(entries), INDEX_LOG_ENTRY):
+            key, segment, offset, length = entries[i:i + INDEX_LOG_ENTRY]
+            if segment not in sizes:
+                segment_path = self._path(SEGMENT.format(segment))
+                sizes[segment] = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+            if offset + length <= sizes[segment]:
+                yield key, segment, offset, length
+
+    def _open_index(self):
+        with self.index_lock:
+            if self.index_map is not None:
+                return
+            path = self._path("index")
+            log_path = self._path("index.log")
+            if (self.index_log is not None or not os.path.exists(path)
+                    or (os.path.exists(log_path) and os.path.getmtime(log_path) > os.path.getmtime(path))):
+                self._write_index()
+            self.index_file = open(path, "rb")
+            if os.path.getsize(path) == 0:
+                # mmap cannot map an empty file, nothing is stored
+                self.index_map = b""
+                return
+            index_map = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.columns = memoryview(index_map).cast("Q")
+            count = len(self.columns) // 3
+            self.keys = self.columns[:count]
+            self.offsets = self.columns[count:2 * count]
+            self.locations = self.columns[2 * count:]
+            # last, get only looks at the columns once this is set
+            self.index_map = index_map
+
+    def _write_index(self):
+        # sorts index.log by key into index, the last entry of a key wins
+        latest = dict()
+        for key, segment, offset, length in self.entries():
+            latest[key] = (offset, segment << 32 | length)
+        keys = array("Q", sorted(latest))
+        offsets = array("Q", (latest[key][0] for key in keys))
+        locations = array("Q", (latest[key][1] for key in keys))
+        path = self._path("index")
+        with open(path + ".tmp", "wb") as index:
+            keys.tofile(index)
+            offsets.tofile(index)
+            locations.tofile(index)
+        os.replace(path + ".tmp", path)
+
+    def __len__(self):
+        if self.index_map is None:
+            self._open_index()
+        return len(self.keys)
+
+    def close(self):
+        with self.lock:
+            recording = self.index_log is not None
+            if recording:
+                self.segment.close()
+                self.index_log.close()
+                self.segment = self.index_log = None
+        if recording:
+            self._write_index()
+        if isinstance(self.index_map, mmap.mmap):
+            for column in (self.keys, self.offsets, self.locations, self.columns):
+                column.release()
+            self.index_map.close()
+        if self.index_file is not None:
+            self.index_file.close()
+        self.index_file = self.index_map = None
+        self.columns = self.keys = self.offsets = self.locations = ()
+        for fd in self.segments.values():
+            os.close(fd)
+        self.segments = dict()
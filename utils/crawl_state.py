@@ -0,0 +1,168 @@
+import os
+from array import array
+from urllib.parse import urlparse
+
+from utils.metrics import TimedLock
+from utils.simhash import SimhashIndex
+from utils.word_stats import ExactWordStats
+from utils.url_seen import UrlSeen, url_key
+
+NUM_SHARDS = 16
+
+
+class UrlShard(object):
+    def __init__(self):
+        self.lock = TimedLock("crawl_state.urls")
+        # 64 bit url keys, see utils/url_seen.py
+        self.going_to_visit = UrlSeen()
+        self.global_site = UrlSeen()
+
+
+class CrawlState(object):
+    '''
+    Everything the scraper shares between worker threads, each part behind
+    its own lock so the per page work (parsing, tokenizing, fingerprinting)
+    runs outside of all of them.
+
+    - urls (going_to_visit, global_site) are kept as 64 bit keys of their
+      canonical form and split into shards by key, each with its own lock
+    - fingerprints have one lock so check-and-add is atomic, two near
+      duplicates can never both get in
+    - the analytics (word stats, subdomains, longest page) share stats_lock,
+      which is only held to merge one page's numbers in; the top words are
+      kept up to date as counts change and dirty marks a report as stale
+
+    words is exact by default, see utils/word_stats.py for the fixed memory one.
+    '''
+    def __init__(self, num_shards=NUM_SHARDS, words=None):
+        self.shards = [UrlShard() for _ in range(num_shards)]
+
+        self.fingerprint_lock = TimedLock("crawl_state.fingerprints")
+        self.fingerprints = SimhashIndex()
+
+        self.stats_lock = TimedLock("crawl_state.stats")
+        self.words = words if words is not None else ExactWordStats()
+        self.subdomains = dict()
+        self.longest_page = ""
+        self.total_words = 0
+        self.unique_pages = 0
+        self.dirty = False
+
+    def set_spill(self, directory, max_keys):
+        # lets each url set spill to disk once it holds more than max_keys keys in memory
+        per_shard = max(1, max_keys // len(self.shards))
+        for i, shard in enumerate(self.shards):
+            shard.going_to_visit.set_spill(os.path.join(directory, f"going_to_visit-{i}"), per_shard)
+            shard.global_site.set_spill(os.path.join(directory, f"global_site-{i}"), per_shard)
+
+    def _shard(self, key):
+        # the low bits of the key pick the table slot, use the high ones here
+        return self.shards[(key >> 32) % len(self.shards)]
+
+    def is_visited(self, url):
+        key = url_key(url)
+        shard = self._shard(key)
+        with shard.lock:
+            return key in shard.global_site
+
+    def claim_links(self, links):
+        # keeps the links nobody has visited or queued yet, and marks them queued
+        claimed = list()
+        for link in links:
+            key = url_key(link)
+            shard = self._shard(key)
+            with shard.lock:
+                if key not in shard.global_site and shard.going_to_visit.add(key):
+                    claimed.append(link)
+        return claimed
+
+    def add_site(self, url):
+        key = url_key(url)
+        shard = self._shard(key)
+        with shard.lock:
+            if shard.global_site.add(key):
+                with self.stats_lock:
+                    self.unique_pages += 1
+                    self.dirty = True
+
+    def add_fingerprint(self, fingerprint):
+        # returns False if the page is a duplicate/near-duplicate of one already kept
+        with self.fingerprint_lock:
+            if self.fingerprints.has_near(fingerprint):
+                return False
+            self.fingerprints.add(fingerprint)
+            return True
+
+    def update_longest(self, url, word_total):
+        with self.stats_lock:
+            if word_total > self.total_words:
+                self.total_words = word_total
+                self.longest_page = url
+                self.dirty = True
+
+    def merge_page(self, wc, subdomain):
+        # folds one accepted page's word counts and subdomain into the totals
+        with self.stats_lock:
+            self.words.add(wc)
+            if subdomain:
+                self.subdomains[subdomain] = self.subdomains.get(subdomain, 0) + 1
+            self.dirty = True
+
+    def report(self):
+        # result1.txt as a string, and marks it written
+        with self.stats_lock:
+            lines = list()
+            lines.append("Unique page count: " + str(self.unique_pages) + "\n\n" )
+            lines.append("Longest page with " + str(self.total_words) + " words is " + str(self.longest_page) + "\n\n")
+            lines.append("50 most recurring words in order from greatest to least:\n")
+            if self.words.approximate:
+                # each count is at most error above the real one
+                lines.append("(approximate, counts are at most " + str(self.words.error_bound())
+                             + " too high, each word's own bound follows it)\n")
+            for word, count, error in self.words.top():
+                if self.words.approximate:
+                    lines.append(str((word, count)) + " error <= " + str(error) + "\n")
+                else:
+                    lines.append(str((word, count)) + "\n")
+            lines.append("\nSubdomains of ics.uci.edu:\n")
+            for k in sorted(self.subdomains.keys(), key=lambda z: urlparse(z).hostname):
+                lines.append(k + ": " + str(self.subdomains[k]) + "\n")
+            self.dirty = False
+            return "".join(lines)
+
+    def summary(self):
+        # what merge needs to fold this state into another one, picklable
+        sites = array("Q")
+        for shard in self.shards:
+            with shard.lock:
+                sites.extend(shard.global_site.keys())
+        with self.stats_lock:
+            return dict(
+                sites=sites, words=self.words, subdomains=dict(self.subdomains),
+                longest_page=self.longest_page, total_words=self.total_words)
+
+    def merge(self, summary):
+        # adds the analytics of another CrawlState's summary, pages both of them kept count once
+        for key in summary["sites"]:
+            shard = self._shard(key)
+            with shard.lock:
+                added = shard.global_site.add(key)
+            if added:
+                with self.stats_lock:
+                    self.unique_pages += 1
+        self.update_longest(summary["longest_page"], summary["total_words"])
+        with self.stats_lock:
+            if not self.words:
+                self.words = summary["words"]
+            else:
+                self.words.merge(summary["words"])
+            for subdomain, count in summary["subdomains"].items():
+                self.subdomains[subdomain] = self.subdomains.get(subdomain, 0) + count
+            self.dirty = True
+
+    def close(self):
+        # removes the spill files, if any
+        for shard in self.shards:
+            with shard.lock:
+                shard.going_to_visit.close()
+                shard.global_site.close()
@@ -1,20 +1,123 @@
 import requests
 import cbor
 import time
+from threading import Lock
+from requests.adapters import HTTPAdapter
 
 from utils.response import Response
+from utils.content_store import ContentStore
+from utils import metrics
+
+# status for a request that never got an answer from the cache server,
+# next to the cache server's own 600-606
+UNREACHABLE_STATUS = 607
+# status for a url a replay crawl has no stored response for
+NOT_STORED_STATUS = 608
+
+session = None
+session_lock = Lock()
+store = None
+store_lock = Lock()
+
+
+def get_session(config):
+    # one keep-alive session shared by the workers, pooling a connection per worker thread
+    global session
+    with session_lock:
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=max(config.threads_count, 1))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return session
+
+
+def get_store(config):
+    # the CONTENT_STORE every worker records to or replays from, None when it is off
+    global store
+    if config.content_store_mode == "off":
+        return None
+    with store_lock:
+        if store is None:
+            store = ContentStore(config.content_store, config.content_store_segment_bytes)
+        return store
+
+
+def close_store():
+    # writes the index of a recording store
+    global store
+    with store_lock:
+        if store is not None:
+            store.close()
+            store = None
+
+
+def replay(url, config, logger=None):
+    # the stored response of url, in place of the cache server's
+    resp = get_store(config).get(url)
+    if resp is None:
+        metrics.inc("content_store_misses_total")
+        if logger:
+            logger.error(f"{url} is not in the content store {config.content_store}.")
+        return Response({
+            "error": f"{url} is not in the content store {config.content_store}.",
+            "status": NOT_STORED_STATUS,
+            "url": url})
+    metrics.inc("content_store_hits_total")
+    return resp
+
+
+def record(url, resp, config):
+    # a url the cache server could not be reached for is fetched again next time
+    if resp.status == UNREACHABLE_STATUS:
+        return
+    size = get_store(config).put(url, resp)
+    metrics.inc("content_store_records_total")
+    metrics.inc("content_store_bytes_total", size)
+
 
 def download(url, config, logger=None):
+    # from the cache server, or the content store with CONTENT_STORE_MODE = replay
+    if config.content_store_mode == "replay":
+        return replay(url, config, logger)
+    resp = fetch(url, config, logger)
+    if config.content_store_mode == "record":
+        record(url, resp, config)
+    return resp
+
+
+def fetch(url, config, logger=None):
     host, port = config.cache_server
-    resp = requests.get(
-        f"http://{host}:{port}/",
-        params=[("q", f"{url}"), ("u", f"{config.user_agent}")])
+    resp = None
+    error = None
+    for attempt in range(config.retries + 1):
+        if attempt:
+            metrics.inc("download_retries_total")
+            # back off before retrying: backoff, 2*backoff, 4*backoff, ...
+            time.sleep(config.retry_backoff * 2 ** (attempt - 1))
+        try:
+            resp = get_session(config).get(
+                f"http://{host}:{port}/",
+                params=[("q", f"{url}"), ("u", f"{config.user_agent}")],
+                timeout=(config.connect_timeout, config.read_timeout))
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+    if resp is None:
+        if logger:
+            logger.error(f"Could not reach cache server for {url}: {error}")
+        return Response({
+            "error": f"Could not reach cache server for {url}: {error}",
+            "status": UNREACHABLE_STATUS,
+            "url": url})
     try:
         if resp and resp.content:
             return Response(cbor.loads(resp.content))
     except (EOFError, ValueError) as e:
         pass
-    logger.error(f"Spacetime Response error {resp} with url {url}.")
+    if logger:
+        logger.error(f"Spacetime Response error {resp} with url {url}.")
     return Response({
         "error": f"Spacetime Response error {resp} with url {url}.",
         "status": resp.status_code,
@@ -0,0 +1,33 @@
+'''
+Consistent hashing of hostnames onto crawl processes.
+
+    ring = HashRing(4)
+    ring.owner("ics.uci.edu")   # 0 .. 3, the same in every process
+
+Every process gets replicas points on a ring of 64 bit md5 values and a
+host belongs to the first point at or after its own value, so hosts spread
+evenly and the owner of a host never depends on Python's per process
+string hashing.
+'''
+from bisect import bisect_left
+from hashlib import md5
+
+
+def ring_hash(text):
+    return int.from_bytes(md5(text.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing(object):
+    def __init__(self, nodes, replicas=64):
+        self.nodes = nodes
+        points = sorted((ring_hash(f"shard-{node}-{i}"), node) for node in range(nodes) for i in range(replicas))
+        self.points = [point for point, _ in points]
+        self.owners = [node for _, node in points]
+        self.memo = dict() # hostname -> owner, hosts come up over and over
+
+    def owner(self, hostname):
+        node = self.memo.get(hostname)
+        if node is None:
+            i = bisect_left(self.points, ring_hash(hostname))
+            node = self.memo[hostname] = self.owners[i % len(self.points)]
+        return node
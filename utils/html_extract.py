@@ -0,0 +1,132 @@
+'''
+Pulls the visible text and the <a href> values out of a page in one pass.
+
+    text, hrefs = extract(content, backend)
+
+backend is "stream" (an html.parser subclass that never builds a tree),
+"lxml" (lxml's parser feeding a target object, also without a tree, falls
+back to "stream" if lxml is not installed) or "bs4" (the original
+BeautifulSoup get_text() + find_all("a")). The text matches
+BeautifulSoup's get_text(): script, style and template contents, comments,
+doctypes and processing instructions are left out. hrefs come back in
+document order with None for an <a> without one, like tag.get("href").
+'''
+from html.parser import HTMLParser
+
+try:
+    from bs4 import BeautifulSoup
+    from bs4.dammit import UnicodeDammit
+except ImportError: # the stream and lxml backends can do without it
+    BeautifulSoup = None
+    UnicodeDammit = None
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+BACKENDS = ("stream", "lxml", "bs4")
+SKIPPED_TAGS = frozenset(["script", "style", "template"])
+
+
+def decode(content):
+    # same encoding detection BeautifulSoup does on bytes
+    if isinstance(content, str):
+        return content
+    if UnicodeDammit is not None:
+        text = UnicodeDammit(content, is_html=True).unicode_markup
+        if text is not None:
+            return text
+    return content.decode("utf-8", "replace")
+
+
+class StreamExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = list()
+        self.hrefs = list()
+        self.skipping = 0 # how many script/style/template tags we are inside
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = None
+            for name, value in attrs:
+                if name == "href":
+                    # BeautifulSoup keeps the last duplicate and turns a bare attribute into ""
+                    href = "" if value is None else value
+            self.hrefs.append(href)
+        elif tag in SKIPPED_TAGS:
+            self.skipping += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # <script/> and friends never get an end tag
+        if tag in SKIPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skipping:
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.chunks.append(data)
+
+    def unknown_decl(self, data):
+        # BeautifulSoup keeps <![CDATA[...]]> sections as text
+        if data.startswith("CDATA[") and not self.skipping:
+            self.chunks.append(data[6:])
+
+
+class LxmlTarget(object):
+    def __init__(self):
+        self.chunks = list()
+        self.hrefs = list()
+        self.skipping = 0
+
+    def start(self, tag, attrib):
+        if tag == "a":
+            self.hrefs.append(attrib.get("href"))
+        elif tag in SKIPPED_TAGS:
+            self.skipping += 1
+
+    def end(self, tag):
+        if tag in SKIPPED_TAGS and self.skipping:
+            self.skipping -= 1
+
+    def data(self, data):
+        if not self.skipping:
+            self.chunks.append(data)
+
+    def close(self):
+        return self
+
+
+def extract_stream(content):
+    parser = StreamExtractor()
+    parser.feed(decode(content))
+    parser.close()
+    return "".join(parser.chunks), parser.hrefs
+
+
+def extract_lxml(content):
+    if etree is None:
+        return extract_stream(content)
+    target = LxmlTarget()
+    parser = etree.HTMLParser(target=target, remove_comments=True, remove_pis=True)
+    parser.feed(decode(content))
+    parser.close()
+    return "".join(target.chunks), target.hrefs
+
+
+def extract_bs4(content):
+    string_document = BeautifulSoup(content, "html.parser")
+    return string_document.get_text(), [link.get("href") for link in string_document.find_all("a")]
+
+
+def extract(content, backend="stream"):
+    if backend == "bs4" and BeautifulSoup is not None:
+        return extract_bs4(content)
+    if backend == "lxml":
+        return extract_lxml(content)
+    return extract_stream(content)
@@ -0,0 +1,91 @@
+import os
+import csv
+import atexit
+import random
+from io import StringIO
+from threading import Thread, Lock, Event
+
+
+class LinkJournal(object):
+    '''
+    Buffered log of the scraper's link decisions (valid.txt).
+
+    record() only appends to an in-memory buffer; a background thread writes
+    the buffer out every flush_interval seconds, or sooner once it holds
+    flush_lines lines. The file is rotated to path.1 .. path.<backups> when
+    it would grow past max_bytes (0 never rotates).
+
+    fmt "text" keeps the old "<link> is <True/False>" lines, "csv" writes
+    "<link>,<0/1>" rows. sample is the fraction of decisions kept, 0
+    disables the journal.
+    '''
+    def __init__(self, path, fmt="text", sample=1.0, max_bytes=0, backups=3,
+                 flush_interval=1.0, flush_lines=4096):
+        assert fmt in ("text", "csv"), "link log format should be text or csv"
+        self.path = path
+        self.fmt = fmt
+        self.sample = sample
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.flush_lines = flush_lines
+
+        self.buffer = list()
+        self.lock = Lock()
+        self.write_lock = Lock()
+        self.closed = Event()
+        if self.enabled:
+            Thread(target=self._flush_loop, daemon=True).start()
+            atexit.register(self.close)
+
+    @property
+    def enabled(self):
+        return bool(self.path) and self.sample > 0
+
+    def record(self, link, valid):
+        if not self.enabled or (self.sample < 1 and random.random() >= self.sample):
+            return
+        with self.lock:
+            self.buffer.append((str(link), valid))
+            full = len(self.buffer) >= self.flush_lines
+        if full:
+            self.flush()
+
+    def _format(self, entries):
+        if self.fmt == "csv":
+            out = StringIO()
+            csv.writer(out, lineterminator="\n").writerows(
+                (link, int(bool(valid))) for link, valid in entries)
+            return out.getvalue()
+        return "".join(link + " is " + str(valid) + "\n" for link, valid in entries)
+
+    def flush(self):
+        with self.lock:
+            entries, self.buffer = self.buffer, list()
+        if not entries:
+            return
+        data = self._format(entries).encode("utf-8")
+        with self.write_lock:
+            if self.max_bytes and os.path.exists(self.path) and \
+                    os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as file1:
+                file1.write(data)
+
+    def _rotate(self):
+        # path -> path.1 -> path.2 ... the oldest one falls off
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.closed.set()
+        self.flush()
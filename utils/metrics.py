@@ -0,0 +1,299 @@
+'''
+Counters, gauges and latency histograms for the crawler's hot paths.
+
+    from utils import metrics
+    metrics.inc("pages_total")
+    metrics.observe("stage_seconds", elapsed, stage="download")
+    with metrics.timer("stage_seconds", stage="parse"):
+        ...
+    metrics.gauge("frontier_queued_urls", lambda: len(queue))
+
+Everything goes to one registry per process. An update is a dict lookup
+and a few additions under one lock, so the stages are always measured; the
+exports are what METRICS_PORT and METRICS_FILE turn on:
+
+- start(config) serves the registry in the Prometheus text format on
+  http://127.0.0.1:METRICS_PORT/metrics and writes a JSON snapshot to
+  METRICS_FILE every METRICS_INTERVAL seconds, with pages/sec over the
+  interval
+- TimedLock is a Lock or RLock (usable in a Condition) that records how long
+  acquiring it had to wait in lock_wait_seconds{lock=...}
+
+Histograms have the fixed BUCKETS, in seconds.
+'''
+import os
+import json
+import time
+from bisect import bisect_left
+from urllib.parse import urlparse
+from threading import Lock, RLock, Thread, Event
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "crawler_"
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram(object):
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def quantile(self, q):
+        # upper bound of the bucket the q-th observation falls in
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return 0.0
+
+
+class Timer(object):
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class Metrics(object):
+    def __init__(self):
+        self.lock = Lock()
+        self.counters = dict() # (name, labels) -> value, labels a sorted tuple of pairs
+        self.histograms = dict() # (name, labels) -> Histogram
+        self.gauges = dict() # name -> function returning a number, or {labels: number}
+        self.started = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.counts[bisect_left(BUCKETS, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def timer(self, name, **labels):
+        return Timer(self, name, labels)
+
+    def gauge(self, name, function):
+        self.gauges[name] = function
+
+    def counter_total(self, name):
+        with self.lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def read_gauges(self):
+        # {(name, labels): value}, a gauge that fails is left out
+        values = dict()
+        for name, function in list(self.gauges.items()):
+            try:
+                value = function()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                for labels, number in value.items():
+                    values[(name, labels)] = number
+            else:
+                values[(name, ())] = value
+        return values
+
+    def prometheus(self):
+        # the registry in the Prometheus text exposition format
+        gauges = self.read_gauges()
+        gauges[("pages_per_second", ())] = self.counter_total("pages_total") / max(time.time() - self.started, 1e-9)
+        lines = list()
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count)) for key, h in self.histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            name = PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            name = PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), (counts, total, count) in histograms:
+            name = PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        # json-able dict of everything, histograms as count, mean and approximate percentiles
+        gauges = self.read_gauges()
+        with self.lock:
+            counters = {name + format_labels(labels): value for (name, labels), value in self.counters.items()}
+            histograms = dict()
+            for (name, labels), h in self.histograms.items():
+                histograms[name + format_labels(labels)] = dict(
+                    count=h.count, mean=h.sum / h.count if h.count else 0.0,
+                    p50=h.quantile(0.5), p90=h.quantile(0.9), p99=h.quantile(0.99))
+        return dict(
+            time=time.time(), uptime=time.time() - self.started, counters=counters,
+            gauges={name + format_labels(labels): value for (name, labels), value in gauges.items()},
+            histograms=histograms)
+
+
+def record_download(worker, url, status, seconds):
+    # one fetch by a worker: pages/sec, the download stage, and per worker and per host numbers
+    host = urlparse(url).hostname
+    with registry.lock:
+        counters = registry.counters
+        for key in (("pages_total", ()), ("worker_pages_total", (("worker", worker),)),
+                    ("host_fetches_total", (("host", host), ("status", f"{status // 100}xx")))):
+            counters[key] = counters.get(key, 0) + 1
+    observe("stage_seconds", seconds, stage="download")
+    observe("worker_stage_seconds", seconds, stage="download", worker=worker)
+    observe("host_download_seconds", seconds, host=host)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class TimedLock(object):
+    '''
+    threading.Lock (RLock if reentrant) that records how long a contended
+    acquire waited. The uncontended path is one non-blocking acquire,
+    nothing is recorded. A reentrant one hands Condition the RLock's own
+    save and restore, so a wait releases it however deep it is held.
+    '''
+    def __init__(self, name, reentrant=False):
+        self.name = name
+        self.lock = RLock() if reentrant else Lock()
+        if reentrant:
+            self._release_save = self.lock._release_save
+            self._acquire_restore = self.lock._acquire_restore
+            self._is_owned = self.lock._is_owned
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self.lock.acquire(False):
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        acquired = self.lock.acquire(True, timeout)
+        registry.observe("lock_wait_seconds", time.perf_counter() - start, lock=self.name)
+        return acquired
+
+    def release(self):
+        self.lock.release()
+
+    def locked(self):
+        return self.lock.locked()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_snapshots(path, interval, stopped):
+    # rewrites path every interval seconds, and once more when stopped is set
+    last_time, last_pages = time.time(), 0
+    while True:
+        done = stopped.wait(interval)
+        snapshot = registry.snapshot()
+        pages = registry.counter_total("pages_total")
+        snapshot["pages_per_second"] = (pages - last_pages) / max(snapshot["time"] - last_time, 1e-9)
+        last_time, last_pages = snapshot["time"], pages
+        with open(path + ".tmp", "w") as file:
+            json.dump(snapshot, file, indent=1, sort_keys=True)
+        # readers never see half a snapshot
+        os.replace(path + ".tmp", path)
+        if done:
+            return
+
+
+registry = Metrics()
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+gauge = registry.gauge
+
+server = None
+snapshot_stopped = None
+snapshot_thread = None
+
+
+def start(config):
+    # the exports METRICS_PORT and METRICS_FILE ask for, collection is always on
+    global server
+    global snapshot_stopped
+    global snapshot_thread
+    if config.metrics_port and server is None:
+        server = ThreadingHTTPServer(("127.0.0.1", config.metrics_port), MetricsHandler)
+        server.daemon_threads = True
+        Thread(target=server.serve_forever, daemon=True).start()
+    if config.metrics_file and snapshot_thread is None:
+        snapshot_stopped = Event()
+        snapshot_thread = Thread(
+            target=write_snapshots, args=(config.metrics_file, config.metrics_interval, snapshot_stopped),
+            daemon=True)
+        snapshot_thread.start()
+
+
+def stop():
+    # writes the last snapshot and stops serving
+    global server
+    global snapshot_thread
+    if snapshot_thread is not None:
+        snapshot_stopped.set()
+        snapshot_thread.join()
+        snapshot_thread = None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        server = None
@@ -0,0 +1,116 @@
+'''
+Per-host fetch delays that follow how each host is doing.
+
+    rates = RateControl(floor=0.5, max_delay=30)
+    rates.fetched(url, status, seconds)    # the worker, after every download
+    rates.delay(hostname)                  # the frontier, when it hands the host back
+    rates.dropped(hostname)                # whether to stop fetching from the host
+
+Every host starts at floor, which is POLITENESS. A fetch is bad when the
+answer is an error, from the host (5xx, 429) or from the cache server on
+its behalf (6xx, 604 when the host timed out), or when it took more than
+slow_factor times the host's usual download time. A bad fetch multiplies
+the delay by backoff, up to max_delay; a good one takes recover seconds off
+it, down to floor again. The host's rate being 1 / delay, that is additive
+increase and multiplicative decrease (AIMD), as in TCP.
+
+A host whose last give_up fetches were all errors is dropped: its queued
+urls are skipped and new ones are not queued. Slow fetches only slow a host
+down. Statuses 607 (cache server unreachable) and 608 (not in the content
+store) say nothing about the host and are left out.
+
+max_delay 0 turns this off, every host then waits floor.
+'''
+from threading import Lock
+
+from utils import hostname_ify, metrics
+
+# weight of the latest good fetch in a host's usual download time
+RECENT = 0.2
+# fetches quicker than this are never slow, whatever the host usually takes
+SLOW_MIN_SECONDS = 1.0
+# statuses of fetches that never reached the host
+NOT_THE_HOSTS = (607, 608)
+
+
+class HostRate(object):
+    __slots__ = ("delay", "latency", "errors")
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.latency = None # moving average of the good fetches' seconds
+        self.errors = 0 # errors in a row
+
+
+class RateControl(object):
+    def __init__(self, floor=0.0, max_delay=0.0, backoff=2.0, recover=0.25, slow_factor=4.0,
+                 give_up=10, logger=None):
+        self.floor = floor
+        self.max_delay = max(max_delay, floor)
+        self.backoff = max(backoff, 1.0)
+        self.recover = recover
+        self.slow_factor = slow_factor
+        self.give_up = give_up
+        self.logger = logger
+
+        self.lock = Lock()
+        self.hosts = dict() # hostname -> HostRate
+        self.dropped_hosts = set()
+        if self.enabled:
+            metrics.gauge("host_delay_seconds", self._slowed_hosts)
+            metrics.gauge("rate_dropped_hosts", lambda: len(self.dropped_hosts))
+
+    @property
+    def enabled(self):
+        return self.max_delay > 0 and self.max_delay > self.floor
+
+    def fetched(self, url, status, seconds):
+        # how a download of url went, seconds being how long it took
+        if not self.enabled or status in NOT_THE_HOSTS:
+            return
+        hostname = hostname_ify(url)
+        error = status >= 500 or status == 429
+        with self.lock:
+            host = self.hosts.get(hostname)
+            if host is None:
+                host = self.hosts[hostname] = HostRate(self.floor)
+            slow = (not error and host.latency is not None and seconds > SLOW_MIN_SECONDS
+                    and seconds > self.slow_factor * host.latency)
+            if not error:
+                host.errors = 0
+                host.latency = seconds if host.latency is None else host.latency + RECENT * (seconds - host.latency)
+            else:
+                host.errors += 1
+            delay = host.delay
+            if error or slow:
+                # from a floor of 0 there is nothing to multiply, start from recover
+                host.delay = min(self.max_delay, max(delay, self.recover) * self.backoff)
+                metrics.inc("rate_backoffs_total", reason="error" if error else "slow")
+                if host.delay != delay:
+                    self._log(f"{hostname} delay {delay:.2f} -> {host.delay:.2f} s after "
+                              + (f"status {status}" if error else f"a {seconds:.1f} s fetch"))
+            elif delay > self.floor:
+                host.delay = max(self.floor, delay - self.recover)
+                if host.delay == self.floor:
+                    self._log(f"{hostname} delay back to {self.floor:.2f} s")
+            if self.give_up > 0 and host.errors >= self.give_up and hostname not in self.dropped_hosts:
+                self.dropped_hosts.add(hostname)
+                self._log(f"dropped host {hostname}: {host.errors} errors in a row, the last one status {status}")
+
+    def delay(self, hostname):
+        # seconds to wait before fetching from hostname again
+        host = self.hosts.get(hostname)
+        return self.floor if host is None else host.delay
+
+    def dropped(self, hostname):
+        return hostname in self.dropped_hosts
+
+    def _slowed_hosts(self):
+        # the hosts waiting longer than floor, for the host_delay_seconds gauge
+        with self.lock:
+            return {(("host", hostname),): host.delay for hostname, host in self.hosts.items()
+                    if host.delay > self.floor}
+
+    def _log(self, msg):
+        if self.logger is not None:
+            self.logger.info(msg)
@@ -0,0 +1,222 @@
+'''
+robots.txt handling for the scraper and the frontier.
+
+    robots = RobotsCache(fetch_through_cache(config), user_agent, ttl, path)
+    robots.can_fetch(url)      # fetches the url's robots.txt the first time its host comes up
+    robots.can_fetch(url, fetch=False)  # None instead of fetching it
+    robots.crawl_delay(url)    # Crawl-delay of the url's host, None if unknown or not set
+
+Every host (subdomains included) gets its own robots.txt, fetched through
+the cache server like any other page and only when a url on that host is
+first checked. The scraper only checks with fetch=False; the frontier does
+the fetching when it hands out the first url of a host, so a robots.txt is
+fetched in the host's politeness slot like a page. Rules are kept for ttl seconds in memory and, if path is
+set, in a shelve so a restarted crawl does not ask again. They are compiled
+once: one regex over all the rule patterns answers most urls (the ones no
+rule matches) in a single match, and only urls some rule does match look
+for the longest matching rule, Allow winning ties, as in RFC 9309.
+'''
+import re
+import time
+import shelve
+from threading import Lock, Event
+from urllib.parse import urlparse
+
+from utils import metrics
+
+# how long to trust an answer that was an error rather than a robots.txt
+ERROR_TTL = 600
+# status kept for a robots.txt whose fetch raised, an error like the cache server's 6xx
+FETCH_FAILED_STATUS = 609
+
+
+class RobotRules(object):
+    def __init__(self, rules=(), crawl_delay=None, disallow_all=False):
+        self.crawl_delay = crawl_delay
+        self.disallow_all = disallow_all
+        # (pattern length, allow, prefix or None, regex or None), longest first, Allow first on ties
+        self.ordered = list()
+        for pattern, allow in rules:
+            if "*" in pattern or pattern.endswith("$"):
+                self.ordered.append((len(pattern), allow, None, re.compile(pattern_regex(pattern))))
+            else:
+                self.ordered.append((len(pattern), allow, pattern, None))
+        self.ordered.sort(key=lambda rule: (-rule[0], not rule[1]))
+        self.any_rule = (
+            re.compile("|".join(pattern_regex(pattern) for pattern, _ in rules))
+            if rules else None)
+
+    def can_fetch(self, path):
+        if self.disallow_all:
+            return path == "/robots.txt"
+        if self.any_rule is None or not self.any_rule.match(path):
+            return True
+        for _, allow, prefix, regex in self.ordered:
+            if regex.match(path) if prefix is None else path.startswith(prefix):
+                return allow
+        return True
+
+
+def pattern_regex(pattern):
+    # robots.txt path pattern to a regex: * is any run of characters, a trailing $ ends the path
+    end = pattern.endswith("$")
+    if end:
+        pattern = pattern[:-1]
+    return "(?:" + ".*".join(re.escape(part) for part in pattern.split("*")) + (r"\Z)" if end else ")")
+
+
+def parse(text, user_agent):
+    # RobotRules for the group naming user_agent, or the * group if none does
+    agent = user_agent.split("/")[0].lower()
+    groups = list() # (agents, rules, crawl delay)
+    in_agents = False
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        key = key.strip().lower()
+        value = value.strip()
+        if key == "user-agent":
+            if not in_agents:
+                groups.append((list(), list(), [None]))
+                in_agents = True
+            groups[-1][0].append(value.lower())
+            continue
+        in_agents = False
+        if not groups:
+            continue
+        if key in ("allow", "disallow"):
+            if value:
+                groups[-1][1].append((value, key == "allow"))
+        elif key == "crawl-delay":
+            try:
+                groups[-1][2][0] = float(value)
+            except ValueError:
+                pass
+
+    chosen = [g for g in groups if any(a != "*" and a in agent for a in g[0])]
+    if not chosen:
+        chosen = [g for g in groups if "*" in g[0]]
+    rules = [rule for g in chosen for rule in g[1]]
+    delays = [g[2][0] for g in chosen if g[2][0] is not None]
+    return RobotRules(rules, max(delays) if delays else None)
+
+
+def rules_for(status, text, user_agent):
+    # like urllib.robotparser: 401/403 forbid everything, other errors allow everything
+    if status in (401, 403):
+        return RobotRules(disallow_all=True)
+    if 200 <= status < 300:
+        return parse(text, user_agent)
+    return RobotRules()
+
+
+def fetch_through_cache(config, logger=None):
+    # fetch function for RobotsCache that goes through the cache server
+    from utils.download import download
+
+    def fetch(url):
+        resp = download(url, config, logger)
+        if resp.raw_response is None:
+            return resp.status, ""
+        return resp.status, resp.raw_response.content.decode("utf-8", "replace")
+    return fetch
+
+
+class RobotsCache(object):
+    '''
+    Compiled robots.txt rules per host. fetch(url) -> (status, text) gets a
+    robots.txt; with fetch None nothing is fetched and everything is
+    allowed. A host's robots.txt is only fetched by one thread at a time,
+    the others checking the same host wait for it. A fetch that raises
+    counts as an error answer (FETCH_FAILED_STATUS, everything allowed) and
+    is tried again after ERROR_TTL.
+    '''
+    def __init__(self, fetch=None, user_agent="*", ttl=86400, path=None):
+        self.fetch = fetch
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.lock = Lock()
+        self.hosts = dict() # (scheme, host) -> (expires, RobotRules)
+        self.fetching = dict() # (scheme, host) -> Event set once its fetch is done
+        self.saved = shelve.open(path) if path else None
+
+    def rules(self, scheme, host, fetch=True):
+        # RobotRules of the host; None if fetch is False and it would take a fetch
+        key = (scheme, host)
+        while True:
+            with self.lock:
+                entry = self.hosts.get(key)
+                if entry is not None and entry[0] > time.time():
+                    return entry[1]
+                if not fetch:
+                    return self._saved_rules(scheme, host)
+                done = self.fetching.get(key)
+                if done is None:
+                    self.fetching[key] = done = Event()
+                    break
+            done.wait()
+        try:
+            return self._load(scheme, host)
+        finally:
+            with self.lock:
+                del self.fetching[key]
+            done.set()
+
+    def _saved_rules(self, scheme, host):
+        # with the lock held: the rules of the shelve if they are fresh enough, else None
+        saved = self.saved.get(f"{scheme}://{host}") if self.saved is not None else None
+        if saved is None or saved[0] + self._ttl(saved[1]) <= time.time():
+            return None
+        fetched, status, text = saved
+        rules = rules_for(status, text, self.user_agent)
+        self.hosts[(scheme, host)] = (fetched + self._ttl(status), rules)
+        return rules
+
+    def _load(self, scheme, host):
+        # from the shelve if it is fresh enough, else fetched
+        name = f"{scheme}://{host}"
+        with self.lock:
+            rules = self._saved_rules(scheme, host)
+        if rules is not None:
+            return rules
+        fetched = time.time()
+        try:
+            status, text = self.fetch(name + "/robots.txt")
+        except Exception:
+            metrics.inc("robots_fetch_errors_total")
+            status, text = FETCH_FAILED_STATUS, ""
+        rules = rules_for(status, text, self.user_agent)
+        with self.lock:
+            if self.saved is not None:
+                self.saved[name] = (fetched, status, text)
+            self.hosts[(scheme, host)] = (fetched + self._ttl(status), rules)
+        return rules
+
+    def _ttl(self, status):
+        return self.ttl if status < 500 else min(self.ttl, ERROR_TTL)
+
+    def can_fetch(self, url, fetch=True):
+        # None if fetch is False and the host's robots.txt is not known yet
+        if self.fetch is None:
+            return True
+        parsed = urlparse(url)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        rules = self.rules(parsed.scheme, parsed.hostname, fetch)
+        return None if rules is None else rules.can_fetch(path)
+
+    def crawl_delay(self, url):
+        # never fetches, only answers for hosts already checked
+        parsed = urlparse(url)
+        with self.lock:
+            entry = self.hosts.get((parsed.scheme, parsed.hostname))
+        return entry[1].crawl_delay if entry is not None else None
+
+    def close(self):
+        with self.lock:
+            if self.saved is not None:
+                self.saved.close()
+                self.saved = None
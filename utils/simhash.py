@@ -0,0 +1,197 @@
+from functools import lru_cache
+from hashlib import blake2b
+
+try:
+    import numpy as np
+except ImportError: # fall back to the pure python fingerprint
+    np = None
+
+NUM_BITS = 128
+DIGEST_SIZE = (NUM_BITS + 7) // 8
+SIMILARITY_THRESHOLD = 0.95
+NUM_BLOCKS = 10
+
+
+def max_distance(num_bits=NUM_BITS, threshold=SIMILARITY_THRESHOLD):
+    # largest hamming distance that still counts as similar:
+    # 1 - (distance / num_bits) >= threshold
+    distance = 0
+    while 1 - ((distance + 1) / num_bits) >= threshold:
+        distance += 1
+    return distance
+
+
+def popcount(n):
+    return bin(n).count('1')
+
+
+# the same tokens show up on page after page, so keep recent digests around
+@lru_cache(maxsize=1 << 16)
+def gen_digest(token):
+    return blake2b(token.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+def gen_hash(token):
+    # the digest read as a big endian int, same as int(hexdigest, 16)
+    return int.from_bytes(gen_digest(token), 'big')
+
+
+def gen_fingerprint_python(tokens_dict):
+    # reference implementation, one weight per bit from the least significant up
+    hash_list = [(gen_hash(token), count) for token, count in tokens_dict.items()]
+    vector_v = list()
+    mask = 1
+    for i in range(NUM_BITS):
+        weight = 0
+        for hash_, multiplier in hash_list:
+            weight += multiplier if hash_ & mask else -multiplier
+        mask <<= 1
+        vector_v.append(weight)
+    # the weight of bit 0 becomes the most significant bit of the fingerprint
+    ret = ""
+    for bit in vector_v:
+        ret += "1" if bit > 0 else "0"
+    return int(ret, 2)
+
+
+def gen_fingerprints(token_dicts):
+    '''
+    Fingerprints a batch of {token: count} dicts in one vectorized pass.
+
+    Every token digest becomes a row of a (tokens x NUM_BITS) bit matrix, the
+    rows are weighted by their counts and summed per page. Output is bit
+    identical to gen_fingerprint_python.
+    '''
+    token_dicts = list(token_dicts)
+    if np is None:
+        return [gen_fingerprint_python(d) for d in token_dicts]
+
+    tokens = list()
+    counts = list()
+    starts = list()
+    for tokens_dict in token_dicts:
+        starts.append(len(tokens))
+        tokens.extend(tokens_dict.keys())
+        counts.extend(tokens_dict.values())
+    if not tokens:
+        return [0] * len(token_dicts)
+
+    digests = np.frombuffer(b"".join(map(gen_digest, tokens)), dtype=np.uint8)
+    digests = digests.reshape(len(tokens), DIGEST_SIZE)
+    # reverse the bytes so column i of bits is bit i of the big endian int
+    bits = np.unpackbits(digests[:, ::-1], axis=1, bitorder='little')
+    counts = np.asarray(counts, dtype=np.int64)
+
+    # weight of a bit = (counts where set) - (counts where not set)
+    weighted = bits * counts[:, None]
+    lengths = np.diff(starts + [len(tokens)])
+    fingerprints = list()
+    non_empty = [start for start, length in zip(starts, lengths) if length]
+    set_sums = np.add.reduceat(weighted, non_empty, axis=0)
+    totals = np.add.reduceat(counts, non_empty)
+    page = 0
+    for length in lengths:
+        if not length:
+            fingerprints.append(0)
+            continue
+        positive = (2 * set_sums[page] - totals[page]) > 0
+        # bit 0's weight is the most significant bit, packbits 'big' does that
+        fingerprints.append(int.from_bytes(np.packbits(positive).tobytes(), 'big'))
+        page += 1
+    return fingerprints
+
+
+def gen_fingerprint(tokens_dict):
+    return gen_fingerprints([tokens_dict])[0]
+
+
+class SimhashIndex(object):
+    '''
+    Hamming-distance index over simhash fingerprints.
+
+    The fingerprint is cut into num_blocks blocks. Two fingerprints within the
+    max distance d can differ in at most d blocks, so they agree exactly on at
+    least (num_blocks - d) of them. The blocks are dealt into
+    (num_blocks - d - 1) groups, and every pair of blocks inside a group gets
+    a table keyed on those two blocks. Any (num_blocks - d) agreeing blocks
+    must put two of them in the same group, so a near-duplicate always shares
+    a key in some table, and a lookup only compares against that bucket.
+
+    With 128 bits, d = 6 and 10 blocks this is 12 tables keyed on ~25 bits,
+    so buckets stay nearly empty well past a million fingerprints.
+    '''
+    def __init__(self, num_bits=NUM_BITS, threshold=SIMILARITY_THRESHOLD, num_blocks=NUM_BLOCKS):
+        self.num_bits = num_bits
+        self.distance = max_distance(num_bits, threshold)
+        num_groups = num_blocks - self.distance - 1
+        assert num_groups >= 1, "num_blocks must be at least distance + 2"
+
+        # split the bits as evenly as possible into block masks
+        blocks = list()
+        shift = 0
+        for i in range(num_blocks):
+            width = num_bits // num_blocks + (1 if i < num_bits % num_blocks else 0)
+            blocks.append(((1 << width) - 1) << shift)
+            shift += width
+
+        # one combined mask per pair of blocks that share a group
+        groups = [blocks[i::num_groups] for i in range(num_groups)]
+        self.masks = list()
+        for group in groups:
+            for i in range(len(group)):
+                for j in range(i + 1, len(group)):
+                    self.masks.append(group[i] | group[j])
+
+        # a bucket holds a single fingerprint, or a list once it collides
+        self.tables = [dict() for _ in self.masks]
+        self.fingerprints = set()
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.fingerprints
+
+    def __iter__(self):
+        return iter(self.fingerprints)
+
+    def add(self, fingerprint):
+        if fingerprint in self.fingerprints:
+            return
+        self.fingerprints.add(fingerprint)
+        for table, mask in zip(self.tables, self.masks):
+            key = fingerprint & mask
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = fingerprint
+            elif type(bucket) is list:
+                bucket.append(fingerprint)
+            else:
+                table[key] = [bucket, fingerprint]
+
+    def candidates(self, fingerprint):
+        # every fingerprint that shares a table key with this one
+        found = set()
+        for table, mask in zip(self.tables, self.masks):
+            bucket = table.get(fingerprint & mask)
+            if type(bucket) is list:
+                found.update(bucket)
+            elif bucket is not None:
+                found.add(bucket)
+        return found
+
+    def find_near(self, fingerprint):
+        # returns a stored fingerprint within the max distance, or None
+        if fingerprint in self.fingerprints: # Exact Match
+            return fingerprint
+        for table, mask in zip(self.tables, self.masks): # Near-Duplication
+            bucket = table.get(fingerprint & mask)
+            if bucket is None:
+                continue
+            for fp in (bucket if type(bucket) is list else (bucket,)):
+                if popcount(fingerprint ^ fp) <= self.distance:
+                    return fp
+        return None
+
+    def has_near(self, fingerprint):
+        return self.find_near(fingerprint) is not None
@@ -0,0 +1,183 @@
+'''
+Crawler trap detection from what fetches actually turn up.
+
+Every url is grouped into a template of its host, path and query, with the
+parts that tend to be generated collapsed:
+
+    template("https://wics.ics.uci.edu/events/2023-01-05/?ical=1")
+    -> ("wics.ics.uci.edu", "/events/{d}/*?ical={n}")
+    template("https://gitlab.ics.uci.edu/a/b/-/blame/9f2c1e0a/src/x.c")
+    -> ("gitlab.ics.uci.edu", "/a/b/-/blame/{h}/*")
+
+numbers become {n}, dates {d} and hex hashes {h}; everything below a
+segment that is only a number, date or hash is one template, since that is
+where calendars and commit browsers generate their endless pages.
+
+The scraper records how every fetch went (new content, near duplicate, too
+little text, error) against its template and host, and the frontier asks
+admit() before queueing a url:
+
+- a template whose first min_fetches fetches brought new content less than
+  min_yield of the time is throttled, only every throttle-th url gets in
+- still below min_yield after ban_fetches fetches, it is banned
+- a host below host_min_yield after host_min_fetches fetches is banned
+  altogether (banned_hosts is the scraper's banned_domains)
+
+min_fetches 0 turns the detector off.
+'''
+import re
+from threading import Lock
+from urllib.parse import urlparse
+
+# how a fetch went, only NEW counts towards the yield
+NEW = "new"
+DUPLICATE = "duplicate"
+LOW = "low"
+ERROR = "error"
+
+VARIABLE = frozenset(["{n}", "{d}", "{h}"])
+DIGITS_RE = re.compile(r"\d+")
+DATE_RE = re.compile(r"(?:19|20)\d\d[-_.](?:0?[1-9]|1[0-2])(?:[-_.](?:0?[1-9]|[12]\d|3[01]))?")
+HASH_RE = re.compile(r"[0-9a-f]{7,64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def shape(part):
+    # a path segment or query value with its generated looking parts collapsed
+    if not part:
+        return part
+    if part.isdigit():
+        return "{n}"
+    lowered = part.lower()
+    if DATE_RE.fullmatch(lowered):
+        return "{d}"
+    if HASH_RE.fullmatch(lowered) and DIGITS_RE.search(lowered):
+        return "{h}"
+    return DIGITS_RE.sub("{n}", part)
+
+
+def template(url):
+    # (hostname, path and query template) of a url
+    parsed = urlparse(url)
+    shapes = list()
+    for segment in parsed.path.split("/")[1:]:
+        shapes.append(shape(segment))
+        if shapes[-1] in VARIABLE:
+            shapes.append("*")
+            break
+    path = "/" + "/".join(shapes)
+    if parsed.query:
+        params = list()
+        for param in parsed.query.split("&"):
+            name, equals, value = param.partition("=")
+            params.append(name + equals + shape(value))
+        path += "?" + "&".join(sorted(params))
+    return parsed.hostname, path
+
+
+class Yield(object):
+    __slots__ = ("fetches", "new", "duplicates", "admitted", "state")
+
+    def __init__(self):
+        self.fetches = 0
+        self.new = 0
+        self.duplicates = 0
+        self.admitted = 0
+        # None, "throttled" or "banned"
+        self.state = None
+
+    def rate(self):
+        return self.new / self.fetches if self.fetches else 1.0
+
+
+class TrapDetector(object):
+    def __init__(self, min_fetches=0, min_yield=0.1, throttle=10, ban_fetches=60,
+                 host_min_fetches=200, host_min_yield=0.02, logger=None):
+        self.min_fetches = min_fetches
+        self.min_yield = min_yield
+        self.throttle = max(1, throttle)
+        self.ban_fetches = max(ban_fetches, min_fetches)
+        self.host_min_fetches = host_min_fetches
+        self.host_min_yield = host_min_yield
+        self.logger = logger
+
+        self.lock = Lock()
+        self.templates = dict() # (hostname, template) -> Yield
+        self.hosts = dict() # hostname -> Yield
+        self.banned_hosts = set()
+        self.rejected = dict() # hostname -> urls turned away
+
+    @property
+    def enabled(self):
+        return self.min_fetches > 0
+
+    def record(self, url, outcome):
+        # how the fetch of url went, one of NEW, DUPLICATE, LOW or ERROR
+        if not self.enabled:
+            return
+        key = template(url)
+        with self.lock:
+            stats = self.templates.get(key)
+            if stats is None:
+                stats = self.templates[key] = Yield()
+            host = self.hosts.get(key[0])
+            if host is None:
+                host = self.hosts[key[0]] = Yield()
+            for counts in (stats, host):
+                counts.fetches += 1
+                counts.new += outcome == NEW
+                counts.duplicates += outcome == DUPLICATE
+            self._judge_template(key, stats)
+            self._judge_host(key[0], host)
+
+    def _judge_template(self, key, stats):
+        if stats.fetches < self.min_fetches or stats.state == "banned":
+            return
+        state = None
+        if stats.rate() < self.min_yield:
+            state = "banned" if stats.fetches >= self.ban_fetches else "throttled"
+        if state != stats.state:
+            stats.state = state
+            self._log(f"{state or 'released'} {key[0]}{key[1]}: {stats.new} new, "
+                      f"{stats.duplicates} near duplicates in {stats.fetches} fetches")
+
+    def _judge_host(self, hostname, host):
+        if (host.fetches < self.host_min_fetches or hostname in self.banned_hosts
+                or host.rate() >= self.host_min_yield):
+            return
+        host.state = "banned"
+        self.banned_hosts.add(hostname)
+        self._log(f"banned host {hostname}: {host.new} new, "
+                  f"{host.duplicates} near duplicates in {host.fetches} fetches")
+
+    def admit(self, url):
+        # None if the url may be queued, else why not
+        if not self.enabled:
+            return None
+        key = template(url)
+        with self.lock:
+            reason = None
+            stats = self.templates.get(key)
+            if key[0] in self.banned_hosts:
+                reason = "host is a trap"
+            elif stats is not None and stats.state == "banned":
+                reason = "url template is a trap"
+            elif stats is not None and stats.state == "throttled":
+                stats.admitted += 1
+                if stats.admitted % self.throttle:
+                    reason = "url template is throttled"
+            if reason is not None:
+                self.rejected[key[0]] = self.rejected.get(key[0], 0) + 1
+            return reason
+
+    def banned(self, url):
+        # whether url became a trap since it was queued, no throttling here
+        if not self.enabled:
+            return False
+        key = template(url)
+        with self.lock:
+            stats = self.templates.get(key)
+            return key[0] in self.banned_hosts or (stats is not None and stats.state == "banned")
+
+    def _log(self, msg):
+        if self.logger is not None:
+            self.logger.info(msg)
@@ -0,0 +1,70 @@
+'''
+The part of is_valid that only depends on the url itself, as a pipeline of
+precompiled checks with the cheapest first:
+
+    url_filter = UrlFilter(DOMAINS)
+    reason, hostname = url_filter.check(url)   # reason is None if the url passes
+
+1. ascii only (str.isascii)
+2. http or https, with a hostname
+3. hostname is one of the domains or a subdomain of one (set lookup and endswith)
+4. path does not end in a non text extension (rsplit on "." and a set lookup)
+5. no directory repeats in the path (one pass over the segments), which
+   catches the /a/b/a/... and /a/a/... traps the old backreference regex did
+
+Answers are memoized per url in an LRU cache, since the same links show up
+on page after page. Anything that changes while crawling (banned hosts,
+visited urls, robots.txt) is left to the caller.
+'''
+from functools import lru_cache
+from urllib.parse import urlparse
+
+DOMAINS = ("ics.uci.edu", "cs.uci.edu", "informatics.uci.edu", "stat.uci.edu")
+SCHEMES = frozenset(["http", "https"])
+EXTENSIONS = frozenset([
+    "css", "js", "bmp", "gif", "jpg", "jpeg", "ico", "png", "tif", "tiff", "mid", "mp2", "mp3", "mp4",
+    "wav", "avi", "mov", "mpeg", "ram", "m4v", "mkv", "ogg", "ogv", "pdf",
+    "ps", "eps", "tex", "ppt", "pptx", "doc", "docx", "xls", "xlsx", "names",
+    "data", "dat", "exe", "bz2", "tar", "msi", "bin", "7z", "psd", "dmg", "iso",
+    "epub", "dll", "cnf", "tgz", "sha1",
+    "thmx", "mso", "arff", "rtf", "jar", "csv",
+    "rm", "smil", "wmv", "swf", "wma", "zip", "rar", "gz"])
+
+
+def has_repeated_directory(path):
+    # True if a directory (a non-empty segment followed by "/") shows up twice in the path
+    seen = set()
+    for segment in path.split("/")[1:-1]:
+        if segment:
+            if segment in seen:
+                return True
+            seen.add(segment)
+    return False
+
+
+class UrlFilter(object):
+    def __init__(self, domains=DOMAINS, cache_size=65536):
+        self.domains = frozenset(domain.lower() for domain in domains)
+        self.suffixes = tuple("." + domain for domain in self.domains)
+        self.check = lru_cache(maxsize=cache_size)(self._check)
+
+    def _check(self, url):
+        # (reason the url is rejected or None, its hostname)
+        if not url.isascii():
+            return "url is not ascii", None
+
+        parsed = urlparse(url)
+        hostname = parsed.hostname
+        if parsed.scheme not in SCHEMES or not hostname:
+            return "scheme not in http or https", hostname
+
+        if hostname not in self.domains and not hostname.endswith(self.suffixes):
+            return "url is not a valid domain", hostname
+
+        path = parsed.path.lower()
+        if "." in path and path.rsplit(".", 1)[1] in EXTENSIONS:
+            return "url is not a text file", hostname
+
+        if has_repeated_directory(path):
+            return "url has a repeating directory", hostname
+        return None, hostname
@@ -0,0 +1,192 @@
+'''
+How promising a queued url is, for the priority frontier (FRONTIER = priority,
+crawler/priority_frontier.py). Higher is fetched first.
+
+    scoring = UrlScoring([("depth", 1.0), ("host_yield", 2.0)])
+    scoring.linked(url, valid_links, new_links)     # the scraper, per page
+    scoring.fetched(url, NEW)                       # the scraper, per fetch
+    scoring.url_score(url)                          # the frontier, order within a host
+    scoring.host_score(hostname)                    # the frontier, which ready host goes next
+
+A score is the weighted sum of the scorers in SCORERS that FRONTIER_SCORERS
+names, each giving a number between 0 and 1:
+
+- depth: 1 / (1 + clicks from a seed); urls the scraper did not see being
+  found (seeds, resumed or forwarded by another shard) count as seeds
+- inlinks: 1 - 1 / (1 + links to the url seen so far), counted in a
+  count-min sketch, so in fixed memory and never too low
+- novelty: the share of recent fetches of the url's template (utils/traps.py)
+  that brought new content, a moving average that gives the latest fetch
+  RECENT of the weight and starts at 1, so templates nobody fetched yet get
+  tried and ones that dried up fall behind
+- host_yield: the same for the url's host, it only orders hosts
+
+A scorer of your own is a Scorer subclass added to SCORERS.
+'''
+from array import array
+from threading import Lock
+
+from utils import hostname_ify
+from utils.traps import template, NEW
+from utils.url_seen import url_key
+
+# weight of the latest fetch in the moving average yields of novelty and host_yield
+RECENT = 0.1
+
+
+class Scorer(object):
+    '''
+    One signal. url_score is asked when a url is queued and again when its
+    host's queue is popped, host_score when the frontier picks the next host.
+    The hooks hear what the crawl does; they are called with the
+    UrlScoring lock held, the scores are read without it.
+    '''
+    def url_score(self, url):
+        return 0.0
+
+    def host_score(self, hostname):
+        return 0.0
+
+    def linked(self, url, valid_links, new_links):
+        '''url was fetched and links to valid_links, new_links of them were not queued before.'''
+
+    def fetched(self, url, outcome):
+        '''How the fetch of url went, see utils/traps.py.'''
+
+    def forget(self, url):
+        '''The frontier is done with url: fetched, turned away or sent to another shard.'''
+
+
+class DepthScorer(Scorer):
+    def __init__(self):
+        # url key -> clicks from a seed, for the urls queued by the scraper and not fetched yet
+        self.depths = dict()
+
+    def url_score(self, url):
+        return 1.0 / (1 + self.depths.get(url_key(url), 0))
+
+    def linked(self, url, valid_links, new_links):
+        depth = self.depths.pop(url_key(url), 0) + 1
+        for link in new_links:
+            self.depths[url_key(link)] = depth
+
+    def forget(self, url):
+        # links the frontier turned away are never fetched, they would stay here for good
+        self.depths.pop(url_key(url), None)
+
+
+class CountMinSketch(object):
+    # counts of 64 bit keys in depth rows of width counters, a count is the smallest of its cells
+    def __init__(self, width=1 << 18, depth=4):
+        self.width = width
+        self.depth = depth
+        self.counts = array("I", bytes(4 * width * depth))
+
+    def _cells(self, key):
+        # double hashing on the two halves of the key, like the Bloom filter of utils/url_seen.py
+        h1 = key & 0xffffffff
+        h2 = key >> 32
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key):
+        counts = self.counts
+        for cell in self._cells(key):
+            if counts[cell] < 0xffffffff:
+                counts[cell] += 1
+
+    def __getitem__(self, key):
+        counts = self.counts
+        return min(counts[cell] for cell in self._cells(key))
+
+
+class InlinkScorer(Scorer):
+    def __init__(self):
+        self.inlinks = CountMinSketch()
+
+    def url_score(self, url):
+        return 1.0 - 1.0 / (1 + self.inlinks[url_key(url)])
+
+    def linked(self, url, valid_links, new_links):
+        for link in valid_links:
+            self.inlinks.add(url_key(link))
+
+
+class YieldScorer(Scorer):
+    # moving average of the fetches that brought new content, per key(url), the host by default
+    def __init__(self):
+        self.rates = dict()
+
+    def key(self, url):
+        return hostname_ify(url)
+
+    def rate(self, key):
+        # 1 for keys with no fetches yet
+        return self.rates.get(key, 1.0)
+
+    def fetched(self, url, outcome):
+        key = self.key(url)
+        rate = self.rates.get(key, 1.0)
+        self.rates[key] = rate + RECENT * ((outcome == NEW) - rate)
+
+
+class NoveltyScorer(YieldScorer):
+    def key(self, url):
+        return template(url)
+
+    def url_score(self, url):
+        return self.rate(template(url))
+
+
+class HostYieldScorer(YieldScorer):
+    def host_score(self, hostname):
+        return self.rate(hostname)
+
+
+SCORERS = {
+    "depth": DepthScorer,
+    "inlinks": InlinkScorer,
+    "novelty": NoveltyScorer,
+    "host_yield": HostYieldScorer,
+}
+
+
+class UrlScoring(object):
+    def __init__(self, weights=()):
+        # weights: (scorer name, weight) pairs, no scorers scores everything 0
+        self.lock = Lock()
+        self.scorers = [(SCORERS[name](), weight) for name, weight in weights]
+
+    def url_score(self, url):
+        return sum(weight * scorer.url_score(url) for scorer, weight in self.scorers)
+
+    def host_score(self, hostname):
+        return sum(weight * scorer.host_score(hostname) for scorer, weight in self.scorers)
+
+    def linked(self, url, valid_links, new_links):
+        with self.lock:
+            for scorer, _ in self.scorers:
+                scorer.linked(url, valid_links, new_links)
+
+    def fetched(self, url, outcome):
+        with self.lock:
+            for scorer, _ in self.scorers:
+                scorer.fetched(url, outcome)
+
+    def forget(self, url):
+        if not self.scorers:
+            return
+        with self.lock:
+            for scorer, _ in self.scorers:
+                scorer.forget(url)
+
+
+def parse_weights(text):
+    # "depth:1,host_yield:2" -> [("depth", 1.0), ("host_yield", 2.0)], a name alone weighs 1
+    weights = list()
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(":")
+        weights.append((name.strip().lower(), float(weight) if weight.strip() else 1.0))
+    return weights
@@ -0,0 +1,254 @@
+'''
+Compact set of urls seen so far, for the frontier and the scraper.
+
+    seen = UrlSeen()
+    seen.add(url_key(url))      # True the first time, False after that
+    url_key(url) in seen
+
+A url is kept as a 64 bit key (the first 64 bits of its get_urlhash, so
+the scheme, www. and index pages do not matter, see utils/canonical.py) in
+an open addressing table backed by a flat array("Q"): about 8 / LOAD bytes
+per url instead of the 100+ bytes a url string costs in a set. Two urls sharing a key is a 1 in
+2**64 chance per pair, which is fine for deciding what to crawl.
+
+With set_spill, a table that grows past max_keys writes its keys to disk as
+a sorted run and starts over empty. Lookups then check the table, then a
+Bloom filter of everything spilled, and only binary search the runs (mmap'd)
+when the Bloom filter says the key might be there. Runs are merged into one
+once there are more than MAX_RUNS of them.
+
+Spilled runs are scratch: they are removed on close and never read back,
+the frontier and the scraper refill their sets from the save file on
+resume. Runs a crashed run left in URL_SEEN_DIR are deleted by set_spill
+rather than reused, they may be keyed the way urls were before key_form
+(KEY_VERSION 1 in utils/canonical.py) and would not match today's keys.
+'''
+import os
+import mmap
+import heapq
+from array import array
+from bisect import bisect_left
+from hashlib import sha256
+
+from utils.canonical import key_form
+
+try:
+    import numpy as np
+except ImportError: # the bloom filter gets filled one key at a time instead
+    np = None
+
+# the table doubles once it is this full
+LOAD = 0.7
+MAX_RUNS = 4
+BLOOM_HASHES = 7
+
+
+def urlhash_key(urlhash):
+    # the key of a url whose get_urlhash is already known
+    return int(urlhash[:16], 16) or 1 # 0 marks an empty slot
+
+
+def url_key(url):
+    # same as urlhash_key(get_urlhash(url)), without the hex round trip
+    digest = sha256(key_form(url).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") or 1 # 0 marks an empty slot
+
+
+class BloomFilter(object):
+    def __init__(self, capacity, bits_per_key=10):
+        self.size = max(64, capacity * bits_per_key)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    # the key is already a hash: double hashing on its two halves gives the bit positions
+    def add(self, key):
+        bits = self.bits
+        size = self.size
+        h1 = key & 0xffffffff
+        h2 = (key >> 32) | 1
+        for i in range(BLOOM_HASHES):
+            p = (h1 + i * h2) % size
+            bits[p >> 3] |= 1 << (p & 7)
+
+    def add_many(self, keys):
+        if np is None:
+            for key in keys:
+                self.add(key)
+            return
+        keys = np.frombuffer(keys, dtype=np.uint64)
+        h1 = keys & np.uint64(0xffffffff)
+        h2 = (keys >> np.uint64(32)) | np.uint64(1)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        for i in range(BLOOM_HASHES):
+            p = (h1 + np.uint64(i) * h2) % np.uint64(self.size)
+            np.bitwise_or.at(bits, p >> np.uint64(3), np.left_shift(1, p & np.uint64(7)).astype(np.uint8))
+
+    def __contains__(self, key):
+        bits = self.bits
+        size = self.size
+        h1 = key & 0xffffffff
+        h2 = (key >> 32) | 1
+        for i in range(BLOOM_HASHES):
+            p = (h1 + i * h2) % size
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+
+class SpillRun(object):
+    # sorted keys in a file, searched through an mmap
+    def __init__(self, path, keys):
+        self.path = path
+        with open(path, "wb") as run:
+            keys.tofile(run)
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.keys = memoryview(self.map).cast("Q")
+
+    def __contains__(self, key):
+        keys = self.keys
+        i = bisect_left(keys, key)
+        return i < len(keys) and keys[i] == key
+
+    def __len__(self):
+        return len(self.keys)
+
+    def close(self):
+        self.keys.release()
+        self.map.close()
+        self.file.close()
+        os.remove(self.path)
+
+
+class UrlSeen(object):
+    '''
+    Set of non-zero 64 bit keys (see url_key). Not thread safe for writers,
+    the callers hold their own locks; a lookup racing an add sees the set
+    either before or after it.
+    '''
+    def __init__(self, capacity=1024):
+        size = 1
+        while size * LOAD < capacity:
+            size *= 2
+        self.slots = array("Q", [0]) * size
+        self.count = 0
+        self.limit = int(size * LOAD)
+
+        # disk spill, off until set_spill is called
+        self.spill_path = None
+        self.max_keys = 0
+        self.bloom_bits = 10
+        self.bloom = None
+        self.bloom_capacity = 0
+        self.runs = list()
+        self.spilled = 0
+        self.run_number = 0
+
+    def set_spill(self, path, max_keys, bloom_bits=10):
+        # spill to path.<n> files once more than max_keys are in memory (0 never spills)
+        self.spill_path = path
+        self.max_keys = max_keys
+        self.bloom_bits = bloom_bits
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # runs left behind by a crash, see the top of this file
+        prefix = os.path.basename(path) + "."
+        for name in os.listdir(directory or "."):
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                os.remove(os.path.join(directory, name))
+
+    def _probe(self, slots, key):
+        mask = len(slots) - 1
+        i = key & mask
+        while True:
+            found = slots[i]
+            if found == key or found == 0:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, key):
+        slots = self.slots
+        if slots[self._probe(slots, key)] == key:
+            return True
+        if self.runs and key in self.bloom:
+            return any(key in run for run in self.runs)
+        return False
+
+    def add(self, key):
+        # adds the key, returns False if it was already there
+        slots = self.slots
+        i = self._probe(slots, key)
+        if slots[i] == key:
+            return False
+        if self.runs and key in self.bloom and any(key in run for run in self.runs):
+            return False
+        slots[i] = key
+        self.count += 1
+        if self.max_keys and self.count >= self.max_keys:
+            self._spill()
+        elif self.count > self.limit:
+            self._grow()
+        return True
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def _grow(self):
+        old = self.slots
+        slots = array("Q", [0]) * (len(old) * 2)
+        probe = self._probe
+        for key in old:
+            if key:
+                slots[probe(slots, key)] = key
+        self.limit = int(len(slots) * LOAD)
+        self.slots = slots
+
+    def _spill(self):
+        keys = array("Q", sorted(key for key in self.slots if key))
+        self.run_number += 1
+        self.runs.append(SpillRun(f"{self.spill_path}.{self.run_number}", keys))
+        self.spilled += len(keys)
+        if self.spilled > self.bloom_capacity:
+            # size the filter for twice what is spilled so far and refill it
+            self.bloom_capacity = 2 * self.spilled
+            self.bloom = BloomFilter(self.bloom_capacity, self.bloom_bits)
+            for run in self.runs:
+                self.bloom.add_many(run.keys)
+        else:
+            self.bloom.add_many(keys)
+        if len(self.runs) > MAX_RUNS:
+            self._merge_runs()
+        # start over with an empty table of the same size
+        self.slots = array("Q", [0]) * len(self.slots)
+        self.count = 0
+
+    def _merge_runs(self):
+        runs = self.runs
+        keys = array("Q", heapq.merge(*[run.keys for run in runs]))
+        self.run_number += 1
+        self.runs = [SpillRun(f"{self.spill_path}.{self.run_number}", keys)]
+        for run in runs:
+            run.close()
+
+    def keys(self):
+        for key in self.slots:
+            if key:
+                yield key
+        for run in self.runs:
+            yield from run.keys
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return self.count + self.spilled
+
+    def memory(self):
+        # bytes held in memory, not counting the mmap'd runs
+        return self.slots.itemsize * len(self.slots) + (len(self.bloom.bits) if self.bloom else 0)
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = list()
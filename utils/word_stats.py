@@ -0,0 +1,209 @@
+'''
+Word statistics for the report: tokenizing and counting a page in one pass,
+and the crawl wide counts the 50 most common words come from.
+
+    total, wc = count_words(text)   # every token, and the non stopword counts
+    stats = make_word_stats(mode, capacity)
+    stats.add(wc)
+    stats.top()                     # [(word, count, error), ...]
+
+mode "exact" keeps every word ever seen (the old token_map), "approx" keeps
+at most capacity words with the Space-Saving algorithm: a word's reported
+count is never below its real count and at most error above it, and every
+word seen more than total / capacity times is guaranteed to be kept.
+'''
+import re
+import heapq
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-zA-Z'’-]+")
+TOP_WORDS = 50
+MODES = ("exact", "approx")
+
+STOPWORDS = frozenset([
+    'a', 'about', 'above', 'after', 'again', 'against', 'all', 'am', 'an', 'and',
+    'any', 'are', "aren't", 'as', 'at', 'be', 'because', 'been', 'before', 'being',
+    'below', 'between', 'both', 'but', 'by', "can't", 'cannot', 'could', "couldn't",
+    'did', "didn't", 'do', 'does', "doesn't", 'doing', "don't", 'down', 'during',
+    'each', 'few', 'for', 'from', 'further', 'had', "hadn't", 'has', "hasn't",
+    'have', "haven't", 'having', 'he', "he'd", "he'll", "he's", 'her', 'here',
+    "here's", 'hers', 'herself', 'him', 'himself', 'his', 'how', "how's", 'i',
+    "i'd", "i'll", "i'm", "i've", 'if', 'in', 'into', 'is', "isn't", 'it', "it's",
+    'its', 'itself', "let's", 'me', 'more', 'most', "mustn't", 'my', 'myself', 'no',
+    'nor', 'not', 'of', 'off', 'on', 'once', 'only', 'or', 'other', 'ought', 'our',
+    'ours', 'ourselves', 'out', 'over', 'own', 'same', "shan't", 'she', "she'd",
+    "she'll", "she's", 'should', "shouldn't", 'so', 'some', 'such', 'than', 'that',
+    "that's", 'the', 'their', 'theirs', 'them', 'themselves', 'then', 'there',
+    "there's", 'these', 'they', "they'd", "they'll", "they're", "they've", 'this',
+    'those', 'through', 'to', 'too', 'under', 'until', 'up', 'very', 'was',
+    "wasn't", 'we', "we'd", "we'll", "we're", "we've", 'were', "weren't", 'what',
+    "what's", 'when', "when's", 'where', "where's", 'which', 'while', 'who',
+    "who's", 'whom', 'why', "why's", 'with', "won't", 'would', "wouldn't", 'you',
+    "you'd", "you'll", "you're", "you've", 'your', 'yours', 'yourself', 'yourselves'])
+
+
+def tokenize(text):
+    # every token longer than one character, lowercased, even if it repeats
+    return [t.lower() for t in TOKEN_RE.findall(text) if len(t) > 1]
+
+
+def compute_word_count(token_list):
+    wc = Counter(token_list)
+    return {word: count for word, count in wc.items() if word not in STOPWORDS}
+
+
+def count_words(text):
+    # tokenize and compute_word_count in one go, without keeping the token list:
+    # returns the number of tokens and the counts of the ones that are not stopwords
+    counts = Counter(t.lower() for t in TOKEN_RE.findall(text) if len(t) > 1)
+    total = sum(counts.values())
+    return total, {word: count for word, count in counts.items() if word not in STOPWORDS}
+
+
+class TopCounts(object):
+    '''
+    Keeps the k words that come first when sorting by (-count, word), updated
+    one word at a time. Counts only ever go up, so a word outside the top k
+    can only get in by passing the current last one, and whatever it pushes
+    out still ranks below everything left in. That keeps the top k exact
+    without sorting the whole vocabulary.
+    '''
+    def __init__(self, k=TOP_WORDS):
+        self.k = k
+        self.top = dict()
+        self.last = None # (-count, word) of the lowest ranked word, None if unknown
+
+    def update(self, word, count):
+        top = self.top
+        if word in top:
+            top[word] = count
+            if self.last is not None and self.last[1] == word:
+                self.last = None
+        elif len(top) < self.k:
+            top[word] = count
+            self.last = None
+        else:
+            last = self._last()
+            if (-count, word) < last:
+                del top[last[1]]
+                top[word] = count
+                self.last = None
+
+    def _last(self):
+        if self.last is None:
+            self.last = max((-count, word) for word, count in self.top.items())
+        return self.last
+
+    def items(self):
+        return sorted(self.top.items(), key=lambda z: (-z[1], z[0]))
+
+
+class ExactWordStats(object):
+    # every word and its count, memory grows with the vocabulary
+    approximate = False
+
+    def __init__(self, k=TOP_WORDS):
+        self.counts = dict()
+        self.top_words = TopCounts(k)
+        self.total = 0
+
+    def add(self, wc):
+        counts = self.counts
+        update_top = self.top_words.update
+        for word, count in wc.items():
+            self.total += count
+            if word in counts:
+                count += counts[word]
+            counts[word] = count
+            update_top(word, count)
+
+    def top(self):
+        return [(word, count, 0) for word, count in self.top_words.items()]
+
+    def merge(self, other):
+        # folds in the counts of another ExactWordStats (another crawl process)
+        self.add(other.counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class SpaceSavingStats(object):
+    '''
+    Space-Saving heavy hitters, with a page's counts added at once. When a
+    new word arrives and all capacity slots are taken, the word with the
+    smallest count is evicted and the new one takes over its count (that
+    count becomes its error). The smallest count is found with a heap that
+    gets an entry on every change and is rebuilt from the counts once it
+    holds too many stale ones, so memory stays proportional to capacity.
+    '''
+    approximate = True
+
+    def __init__(self, capacity, k=TOP_WORDS):
+        self.capacity = capacity
+        self.k = k
+        self.counts = dict()
+        self.errors = dict()
+        self.heap = list() # (count, word), stale if the count has changed since
+        self.total = 0
+
+    def add(self, wc):
+        counts = self.counts
+        errors = self.errors
+        heap = self.heap
+        for word, count in wc.items():
+            self.total += count
+            if word in counts:
+                count += counts[word]
+            elif len(counts) >= self.capacity:
+                floor = self._evict()
+                count += floor
+                errors[word] = floor
+            else:
+                errors[word] = 0
+            counts[word] = count
+            heapq.heappush(heap, (count, word))
+        if len(heap) > 2 * self.capacity + 1000:
+            self._rebuild()
+
+    def _evict(self):
+        # drops the word with the smallest count and returns that count
+        counts = self.counts
+        heap = self.heap
+        while True:
+            count, word = heapq.heappop(heap)
+            if counts.get(word) == count:
+                del counts[word]
+                del self.errors[word]
+                return count
+
+    def _rebuild(self):
+        self.heap = [(count, word) for word, count in self.counts.items()]
+        heapq.heapify(self.heap)
+
+    def top(self):
+        errors = self.errors
+        best = heapq.nsmallest(self.k, self.counts.items(), key=lambda z: (-z[1], z[0]))
+        return [(word, count, errors[word]) for word, count in best]
+
+    def merge(self, other):
+        # folds in another summary, the errors add up like the counts do
+        total = self.total + other.total
+        self.add(other.counts)
+        for word, error in other.errors.items():
+            if word in self.errors:
+                self.errors[word] += error
+        self.total = total
+
+    def error_bound(self):
+        # no count is over by more than this
+        return self.total // self.capacity if self.capacity else self.total
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def make_word_stats(mode="exact", capacity=100000):
+    if mode == "approx":
+        return SpaceSavingStats(capacity)
+    return ExactWordStats()